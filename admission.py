@@ -0,0 +1,138 @@
+# 磁盘空间准入控制：外层任务开始解压前，在目标文件系统上预留估算的解压空间；估算放不下时才读取头部
+# 取得准确大小。空间不足时按提交顺序排队，等其他任务清理暂存目录后再放行；单个任务永远放不下时立即失败
+import collections
+import shutil
+import threading
+
+# 预留之外额外保留的安全余量（字节），避免把磁盘写到完全满
+SAFETY_MARGIN = 256 * 1024 * 1024
+# 排队期间重新检查剩余空间的间隔（秒）；其他程序也可能释放空间
+RECHECK_INTERVAL = 2.0
+
+
+class DiskSpaceError(RuntimeError):
+    """任务需要的空间超过了目标文件系统能提供的上限。"""
+
+
+class _Pending:
+    __slots__ = ('size_fn', 'exact_fn', 'nbytes', 'start', 'fail', 'on_wait', 'waited')
+
+    def __init__(self, size_fn, start, fail, on_wait, exact_fn):
+        self.size_fn = size_fn
+        self.exact_fn = exact_fn
+        self.nbytes = None
+        self.start = start
+        self.fail = fail
+        self.on_wait = on_wait
+        self.waited = False
+
+
+class SpaceAdmission:
+    """按 FIFO 顺序放行任务的空间预留器，由后台线程等待空间。
+
+    可用空间 = 当前剩余空间 - 已预留但尚未释放的字节 - 安全余量。
+    正在运行的任务已写入的部分同时计入了剩余空间的减少与预留，估算偏保守，但不会超额。"""
+
+    def __init__(self, path, margin=SAFETY_MARGIN, disk_usage=shutil.disk_usage):
+        self.path = path
+        self.margin = margin
+        self._disk_usage = disk_usage
+        self._cond = threading.Condition()
+        self._queue = collections.deque()
+        self._reserved = 0
+        self._closed = False
+        self._thread = None
+        self.waited = 0
+        self.rejected = 0
+        self.peak_reserved = 0
+
+    def submit(self, size_fn, start, fail, on_wait=None, exact_fn=None):
+        """登记一个任务：size_fn() 给出需要预留的字节数（在后台线程中计算，应当廉价，例如按压缩大小估算）。
+
+        exact_fn() 给出准确的字节数（可读取压缩包头部），只在估算值放不下时调用一次，之后以准确值为准；
+        空间宽裕时不会调用，准入线程不会因逐个读取头部而成为瓶颈。
+        空间足够时调用 start(nbytes)；永远放不下时调用 fail(DiskSpaceError)；
+        第一次因空间不足而排队时调用 on_wait(nbytes)。"""
+        with self._cond:
+            self._queue.append(_Pending(size_fn, start, fail, on_wait, exact_fn))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def release(self, nbytes):
+        """任务的暂存目录已清理：归还预留的空间并唤醒排队的任务。"""
+        with self._cond:
+            self._reserved = max(0, self._reserved - nbytes)
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=RECHECK_INTERVAL * 2)
+
+    def _free(self):
+        try:
+            return self._disk_usage(self.path).free
+        except OSError:
+            return None
+
+    @staticmethod
+    def _measure(fn):
+        try:
+            return max(0, int(fn()))
+        except Exception:
+            return 0
+
+    def _fits(self, nbytes, free):
+        with self._cond:
+            return nbytes <= free - self._reserved - self.margin
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                item = self._queue[0]
+            if item.nbytes is None:
+                item.nbytes = self._measure(item.size_fn)
+            free = self._free()
+            if item.exact_fn is not None and free is not None and item.nbytes and not self._fits(item.nbytes, free):
+                # 估算值放不下：读取头部取得准确大小（只读取一次），空间紧张时才付出这笔开销
+                item.nbytes = self._measure(item.exact_fn)
+                item.exact_fn = None
+            nbytes = item.nbytes
+            action = None
+            first_wait = False
+            with self._cond:
+                if free is None or nbytes == 0:
+                    action = 'start'
+                elif nbytes + self.margin > free + self._reserved:
+                    # 即使其他任务全部结束、释放全部预留也放不下
+                    action = 'fail'
+                    self.rejected += 1
+                elif nbytes <= free - self._reserved - self.margin:
+                    action = 'start'
+                if action:
+                    self._queue.popleft()
+                    if action == 'start':
+                        self._reserved += nbytes
+                        self.peak_reserved = max(self.peak_reserved, self._reserved)
+                elif not item.waited:
+                    item.waited = first_wait = True
+                    self.waited += 1
+            if action == 'start':
+                item.start(nbytes)
+            elif action == 'fail':
+                need = nbytes + self.margin
+                item.fail(DiskSpaceError(f"需要约 {need / 1048576:.0f} MB 磁盘空间，目标文件系统最多只能提供 "
+                                         f"{(free + self._reserved) / 1048576:.0f} MB"))
+            else:
+                if first_wait and item.on_wait is not None:
+                    item.on_wait(nbytes)
+                with self._cond:
+                    self._cond.wait(RECHECK_INTERVAL)
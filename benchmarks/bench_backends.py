@@ -0,0 +1,88 @@
+# 解压后端对比基准：在同一批语料上分别用各后端执行“外层解压 + 嵌套解压”，比较耗时
+# 用法（仓库根目录）：python -m benchmarks.bench_backends <语料目录> [--password PWD] [--repeat N] [--json OUT]
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractors import BACKENDS, get_extractor
+
+
+def find_inputs(corpus_dir):
+    """与 batch_extract_console 相同的筛选规则：根目录下以 NO 开头的无扩展名文件。"""
+    inputs = []
+    for filename in sorted(os.listdir(corpus_dir)):
+        file_path = os.path.join(corpus_dir, filename)
+        if os.path.isfile(file_path) and filename.startswith('NO') and os.path.splitext(filename)[1] == '':
+            inputs.append(file_path)
+    return inputs
+
+
+def run_backend(extractor, inputs, password, work_dir):
+    """对每个输入执行外层解压和嵌套 .7zz 解压，返回统计信息。"""
+    archives = 0
+    failures = 0
+    t0 = time.perf_counter()
+    for idx, file_path in enumerate(inputs):
+        out_dir = os.path.join(work_dir, f"{idx}_extracted")
+        archives += 1
+        if not extractor.extract(file_path, out_dir, password):
+            failures += 1
+            continue
+        for sub in os.listdir(out_dir):
+            sub_path = os.path.join(out_dir, sub)
+            if os.path.isfile(sub_path) and (sub.lower().endswith('.7zz') or os.path.splitext(sub)[1] == ''):
+                archives += 1
+                if not extractor.extract(sub_path, sub_path + '_extracted', password):
+                    failures += 1
+    elapsed = time.perf_counter() - t0
+    return {'archives': archives, 'failures': failures, 'seconds': elapsed,
+            'archives_per_sec': archives / elapsed if elapsed > 0 else 0.0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='比较各解压后端在同一语料上的耗时')
+    parser.add_argument('corpus', help='包含 NO* 输入文件的目录')
+    parser.add_argument('--password', default='momo.moe')
+    parser.add_argument('--repeat', type=int, default=3, help='每个后端重复次数，取最快一次')
+    parser.add_argument('--backends', default=','.join(sorted(BACKENDS)), help='逗号分隔的后端列表')
+    parser.add_argument('--json', dest='json_path', default=None, help='把结果写入 JSON 文件')
+    args = parser.parse_args(argv)
+
+    inputs = find_inputs(args.corpus)
+    if not inputs:
+        print(f"❌ 语料目录中没有 NO* 输入文件: {args.corpus}")
+        return 1
+
+    results = {}
+    for name in args.backends.split(','):
+        try:
+            extractor = get_extractor(name)
+        except (ValueError, RuntimeError) as e:
+            print(f"⚠️ 跳过后端 {name}: {e}")
+            continue
+        runs = []
+        for _ in range(max(1, args.repeat)):
+            work_dir = tempfile.mkdtemp(prefix=f'titizz_bench_{name}_')
+            try:
+                runs.append(run_backend(extractor, inputs, args.password, work_dir))
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+        best = min(runs, key=lambda r: r['seconds'])
+        results[name] = best
+        print(f"{name:<8} {best['seconds']:8.3f}s  {best['archives']} 个压缩包  "
+              f"{best['archives_per_sec']:8.1f} 个/秒  失败 {best['failures']}")
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump({'inputs': len(inputs), 'results': results}, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+# 流水线基准：在合成语料上运行完整的 batch_extract_console，按阶段（外层解压、嵌套解压、收集、清理）报告吞吐，
+# 结果写为 JSON，可用 --baseline 与另一个提交的结果对比
+# 用法（仓库根目录）：python -m benchmarks.bench_pipeline [--corpus DIR] [--outer N] [--nested M] [--repeat R] [--json OUT]
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from benchmarks.corpus import add_corpus_arguments, ensure_corpus, params_from_args
+from extractors import find_seven_zip
+from phases import PHASE_LABELS, PHASES
+
+import titizz_extract
+
+
+def git_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, encoding='utf-8')
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def count_files(path):
+    files = 0
+    for _root, _dirs, names in os.walk(path):
+        files += len(names)
+    return files
+
+
+def run_once(corpus_dir, password, pipeline_args, verbose=False):
+    """运行一次完整流水线，返回汇总；运行产生的收集目录随后删除，保证各次运行条件相同。"""
+    options = titizz_extract.parse_args([corpus_dir, '--console', '--no-ledger'] + pipeline_args)
+    try:
+        if verbose:
+            summary = titizz_extract.batch_extract_console(corpus_dir, password, options=options)
+        else:
+            with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+                summary = titizz_extract.batch_extract_console(corpus_dir, password, options=options)
+        if summary is None:
+            raise RuntimeError('流水线没有处理任何输入')
+        summary['collected_files'] = count_files(summary['all_images_dir'])
+        return summary
+    finally:
+        for name in os.listdir(corpus_dir):
+            path = os.path.join(corpus_dir, name)
+            if name.startswith('all_images') and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+
+def summarize(runs, totals):
+    """各次运行取中位数：墙钟耗时、各阶段累计耗时与吞吐。
+
+    解压阶段的吞吐按读取的压缩包字节计算；收集与清理阶段按语料中的图片字节/数量计算。"""
+    wall = statistics.median(r['seconds'] for r in runs)
+    summary = {'wall_seconds': wall,
+               'images_per_sec': totals['images'] / wall if wall > 0 else 0.0,
+               'image_bytes_per_sec': totals['image_bytes'] / wall if wall > 0 else 0.0,
+               'phases': {}}
+    for phase in PHASES:
+        seconds = statistics.median(r['phases'][phase]['seconds'] for r in runs)
+        nbytes = runs[0]['phases'][phase]['bytes']
+        entry = {'seconds': seconds, 'count': runs[0]['phases'][phase]['count']}
+        if phase in ('extract', 'nested'):
+            entry['bytes'] = nbytes
+            entry['bytes_per_sec'] = nbytes / seconds if seconds > 0 else 0.0
+        else:
+            entry['images_per_sec'] = totals['images'] / seconds if seconds > 0 else 0.0
+            entry['image_bytes_per_sec'] = totals['image_bytes'] / seconds if seconds > 0 else 0.0
+        summary['phases'][phase] = entry
+    return summary
+
+
+def print_summary(summary, baseline=None):
+    def delta(new, old):
+        # 耗时的变化：负数表示变快
+        if not old:
+            return ''
+        return f"  ({(new - old) / old * 100:+.1f}%)"
+
+    base_phases = (baseline or {}).get('phases', {})
+    print(f"墙钟耗时 {summary['wall_seconds']:8.3f}s{delta(summary['wall_seconds'], (baseline or {}).get('wall_seconds'))}"
+          f"  {summary['images_per_sec']:8.1f} 张/秒  {summary['image_bytes_per_sec'] / 1048576:8.1f} MB/s")
+    for phase in PHASES:
+        entry = summary['phases'][phase]
+        if 'bytes_per_sec' in entry:
+            rate = f"{entry['bytes_per_sec'] / 1048576:8.1f} MB/s（压缩包）"
+        else:
+            rate = f"{entry['images_per_sec']:8.1f} 张/秒"
+        old = base_phases.get(phase, {}).get('seconds')
+        print(f"  {PHASE_LABELS[phase]:<6} {entry['seconds']:8.3f}s{delta(entry['seconds'], old)}  "
+              f"{entry['count']:>5} 次  {rate}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='在合成语料上运行完整流水线，报告各阶段吞吐')
+    parser.add_argument('--corpus', default=None, help='语料目录（默认在临时目录中生成，运行结束后删除）')
+    add_corpus_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=3, help='重复次数，报告中位数')
+    parser.add_argument('--backend', default=None, help='解压后端（默认 7z；找不到 7-Zip 时使用 py7zr）')
+    parser.add_argument('--json', dest='json_path', default=None, help='把结果写入 JSON 文件')
+    parser.add_argument('--baseline', default=None, help='另一次运行写出的 JSON，用于对比各阶段耗时')
+    parser.add_argument('--verbose', action='store_true', help='显示流水线自身的输出')
+    args, pipeline_args = parser.parse_known_args(argv)
+
+    backend = args.backend
+    if backend is None:
+        backend = '7z' if os.path.exists(find_seven_zip()) else 'py7zr'
+        if backend == 'py7zr':
+            print("⚠️ 未找到 7-Zip 可执行文件，使用 py7zr 后端")
+    pipeline_args = pipeline_args + ['--backend', backend]
+
+    params = params_from_args(args)
+    temp_dir = None
+    corpus_dir = args.corpus
+    if corpus_dir is None:
+        temp_dir = tempfile.mkdtemp(prefix='titizz_bench_corpus_')
+        corpus_dir = temp_dir
+    corpus_dir = os.path.abspath(corpus_dir)
+    try:
+        print(f"📦 准备语料: {corpus_dir}")
+        manifest = ensure_corpus(corpus_dir, params)
+        totals = manifest['totals']
+        print(f"   {totals['outer_archives']} 个外层包，{totals['nested_archives']} 个嵌套包，"
+              f"{totals['images']} 张图片（{totals['image_bytes'] / 1048576:.1f} MB）")
+        runs = []
+        for i in range(max(1, args.repeat)):
+            run = run_once(corpus_dir, params['password'], pipeline_args, verbose=args.verbose)
+            runs.append(run)
+            print(f"   第 {i + 1} 次: {run['seconds']:.3f}s，成功 {run['finished']}/{run['total']}，"
+                  f"收集 {run['collected_files']} 个文件")
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    summary = summarize(runs, totals)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f).get('summary')
+    print_summary(summary, baseline)
+
+    if args.json_path:
+        result = {'commit': git_commit(), 'python': platform.python_version(), 'platform': platform.platform(),
+                  'cpu_count': os.cpu_count(), 'backend': backend, 'pipeline_args': pipeline_args,
+                  'corpus': manifest, 'runs': [{k: v for k, v in r.items() if k != 'all_images_dir'} for r in runs],
+                  'summary': summary}
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 0 if all(r['failed'] == 0 for r in runs) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+# 冷启动基准：从启动解释器到第一次真正解压（调用解压后端的解压入口）所用的时间，按运行模式分别统计；
+# 读取头部、探测密码等准备操作不计为解压，--plan 模式不解压，改为统计到第一次读取头部
+# 用法（仓库根目录）：python -m benchmarks.bench_startup <语料目录> [--repeat N] [--modes console,gui] [--json OUT]
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 各模式对应的命令行参数；gui 模式在没有显示器时使用 Qt 的 offscreen 平台
+MODES = {
+    'import': None,
+    'console': ['--console'],
+    'stream': ['--console', '--stream'],
+    'plan': ['--console', '--plan'],
+    'gui': [],
+}
+MARKER = 'TITIZZ_FIRST_EXTRACTION'
+# 视为“第一次解压”的后端方法：落盘解压、批量解压、流式读取成员（-so）与内存中解压
+EXTRACT_METHODS = ('extract', 'extract_batch', 'iter_members', 'extract_fileobj')
+# 各模式改用的标记方法：--plan 只读取头部
+MARK_METHODS = {'plan': ('list_members',)}
+# 被中途结束的运行会在语料目录留下的条目（收集目录、暂存目录、缓存文件）
+_ARTIFACT_PREFIXES = ('all_images', '.titizz')
+
+# 子进程中执行的探针：替换解压后端的解压入口，第一次被调用时打印标记并立即退出，
+# 因此测得的是启动、导入、文件发现、准入与界面构建的开销，不包含实际解压；其余方法（列出成员、探测密码）照常执行
+_PROBE = r'''
+import os, sys
+sys.path.insert(0, {repo!r})
+mode = {mode!r}
+if mode == 'import':
+    import titizz_extract
+    print({marker!r}, flush=True)
+    os._exit(0)
+import extractors
+
+def probe(*args, **kwargs):
+    print({marker!r}, flush=True)
+    os._exit(0)
+
+for cls in (extractors.SevenZipExeExtractor, extractors.Py7zrExtractor):
+    for name in {methods!r}:
+        if hasattr(cls, name):
+            setattr(cls, name, probe)
+import titizz_extract
+sys.argv = ['titizz_extract'] + {argv!r}
+titizz_extract.run_with_console_progress()
+'''
+
+
+def measure(mode, corpus, extra_args, timeout):
+    """运行一次探针，返回从创建子进程到收到标记的秒数；未到达第一次解压（--plan 为第一次读取头部）时返回 None。"""
+    argv = [corpus] + MODES[mode] + extra_args if MODES[mode] is not None else []
+    code = _PROBE.format(repo=REPO_DIR, mode=mode, marker=MARKER, argv=argv,
+                         methods=MARK_METHODS.get(mode, EXTRACT_METHODS))
+    env = dict(os.environ)
+    if mode == 'gui' and not env.get('DISPLAY') and os.name != 'nt':
+        env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-c', code], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL, env=env)
+    marked = threading.Event()
+    result = {}
+
+    def read_output():
+        # 在线程中读取：子进程不输出也不退出（例如挂起）时，主线程仍能按超时结束它
+        for line in iter(proc.stdout.readline, b''):
+            if MARKER.encode() in line:
+                result['elapsed'] = time.perf_counter() - t0
+                marked.set()
+                return
+
+    reader = threading.Thread(target=read_output, daemon=True)
+    reader.start()
+    try:
+        marked.wait(timeout)
+    finally:
+        proc.kill()
+        proc.wait()
+        reader.join(timeout=1.0)
+    return result.get('elapsed')
+
+
+def remove_artifacts(corpus, before):
+    """删除本次运行在语料目录中新建的收集目录、暂存目录与缓存文件。"""
+    import shutil
+    for name in set(os.listdir(corpus)) - before:
+        if name.startswith(_ARTIFACT_PREFIXES) or name.endswith('_extracted'):
+            path = os.path.join(corpus, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='测量各运行模式从启动到第一次解压（--plan 为第一次读取头部）的时间')
+    parser.add_argument('corpus', help='包含 NO* 输入文件的目录')
+    parser.add_argument('--repeat', type=int, default=5, help='每个模式重复次数，报告中位数与最小值')
+    parser.add_argument('--modes', default=','.join(MODES), help='逗号分隔的模式列表')
+    parser.add_argument('--timeout', type=float, default=30.0, help='单次运行的超时（秒）')
+    parser.add_argument('--json', dest='json_path', default=None, help='把结果写入 JSON 文件')
+    args, extra_args = parser.parse_known_args(argv)
+    # 基准不应写入台账，否则第二次运行会把输入当作已完成而跳过
+    extra_args = extra_args + ['--no-ledger']
+
+    results = {}
+    for mode in args.modes.split(','):
+        if mode not in MODES:
+            print(f"⚠️ 跳过未知模式: {mode}")
+            continue
+        runs = []
+        for _ in range(max(1, args.repeat)):
+            before = set(os.listdir(args.corpus))
+            try:
+                runs.append(measure(mode, args.corpus, extra_args, args.timeout))
+            finally:
+                remove_artifacts(args.corpus, before)
+        ok = [r for r in runs if r is not None]
+        if not ok:
+            print(f"{mode:<8}     未到达第一次{'读取头部' if mode in MARK_METHODS else '解压'}")
+            results[mode] = None
+            continue
+        results[mode] = {'median_ms': statistics.median(ok) * 1000, 'min_ms': min(ok) * 1000, 'runs': len(ok)}
+        print(f"{mode:<8} 中位数 {results[mode]['median_ms']:8.1f} ms  最快 {results[mode]['min_ms']:8.1f} ms"
+              f"  ({len(ok)}/{len(runs)} 次)")
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump({'corpus': args.corpus, 'results': results}, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
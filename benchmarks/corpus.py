@@ -0,0 +1,159 @@
+# 合成语料生成器：N 个外层 NO* 压缩包，每个包含 M 个嵌套 .7zz，嵌套包内为图片文件；
+# 内容由随机种子完全决定，并按比例制造与其他压缩包同名的目录（一部分内容相同、一部分内容不同）
+# 用法（仓库根目录）：python -m benchmarks.corpus <输出目录> [--outer N] [--nested M] [--images K] [--image-size BYTES]
+import argparse
+import io
+import json
+import os
+import random
+import struct
+import sys
+import zlib
+
+MANIFEST_NAME = '.bench_corpus.json'
+# 同名冲突使用的共享目录数：冲突的嵌套包从中选择目录名，与其他外层输入的嵌套包撞名
+SHARED_DIRS = 4
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def corpus_params(outer=8, nested=4, images=16, image_size=64 * 1024, collisions=0.25, corrupt=0.0, seed=1,
+                  password='momo.moe'):
+    """生成参数；与清单中的参数一致时可以直接复用已有语料。"""
+    return {'outer': outer, 'nested': nested, 'images': images, 'image_size': image_size,
+            'collisions': collisions, 'corrupt': corrupt, 'seed': seed, 'password': password}
+
+
+def _png_chunk(chunk_type, data):
+    return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data))
+
+
+def _image_bytes(rng, mean_size, corrupt=False):
+    """结构完整的 PNG（数据块与 CRC 正确），IDAT 为随机内容（不可压缩，接近真实图片的压缩率），
+    大小在均值的 ±50% 内；corrupt=True 时截去末尾，模拟损坏压缩包中的截断图片。"""
+    size = max(64, int(mean_size * rng.uniform(0.5, 1.5)))
+    ihdr = _png_chunk(b'IHDR', struct.pack('>IIBBBBB', 256, 256, 8, 2, 0, 0, 0))
+    iend = _png_chunk(b'IEND', b'')
+    payload = size - len(PNG_SIGNATURE) - len(ihdr) - len(iend) - 12
+    data = PNG_SIGNATURE + ihdr + _png_chunk(b'IDAT', rng.randbytes(max(0, payload))) + iend
+    if corrupt:
+        data = data[:len(data) // 2]
+    return data
+
+
+def _write_7z(target, files, password):
+    """把 [(arcname, bytes)] 写为 7z；target 为路径或可写的文件对象。"""
+    import py7zr
+    kwargs = {}
+    if password:
+        kwargs = {'password': password,
+                  'filters': [{'id': py7zr.FILTER_LZMA2, 'preset': 1}, {'id': py7zr.FILTER_CRYPTO_AES256_SHA256}]}
+    with py7zr.SevenZipFile(target, 'w', **kwargs) as archive:
+        for arcname, data in files:
+            archive.writestr(data, arcname)
+
+
+def plan_corpus(params):
+    """按参数确定性地生成语料描述：[(外层文件名, [(嵌套包名, 目录名, [(图片名, 种子, 是否损坏)])])]。"""
+    rng = random.Random(params['seed'])
+    layout = []
+    for i in range(params['outer']):
+        nested = []
+        for j in range(params['nested']):
+            if rng.random() < params['collisions']:
+                folder = f"shared_{rng.randrange(SHARED_DIRS)}"
+                # 一半冲突的内容与其他同名目录完全一致（应被去重），另一半内容不同（应被重命名保留）
+                same_content = rng.random() < 0.5
+            else:
+                folder = f"set_{i:04d}_{j:03d}"
+                same_content = False
+            images = []
+            for k in range(params['images']):
+                name = f"img_{k:04d}.png"
+                seed = f"{params['seed']}/{folder}/{name}" if same_content else f"{params['seed']}/{i}/{j}/{k}"
+                # 内容相同的冲突目录不做截断，保证它们确实可以被去重
+                images.append((name, seed, rng.random() < params['corrupt'] and not same_content))
+            nested.append((f"pack_{j:03d}.7zz", folder, images))
+        layout.append((f"NO{i:04d}", nested))
+    return layout
+
+
+def generate(out_dir, params):
+    """在 out_dir 中生成语料并写出清单，返回清单；需要 py7zr。"""
+    os.makedirs(out_dir, exist_ok=True)
+    totals = {'outer_archives': 0, 'nested_archives': 0, 'images': 0, 'image_bytes': 0, 'corrupt_images': 0,
+              'input_bytes': 0}
+    for outer_name, nested in plan_corpus(params):
+        members = []
+        for nested_name, folder, images in nested:
+            files = []
+            for name, seed, corrupt in images:
+                data = _image_bytes(random.Random(seed), params['image_size'], corrupt)
+                files.append((f"{folder}/{name}", data))
+                totals['images'] += 1
+                totals['corrupt_images'] += corrupt
+                totals['image_bytes'] += len(data)
+            buf = io.BytesIO()
+            _write_7z(buf, files, params['password'])
+            members.append((nested_name, buf.getvalue()))
+            totals['nested_archives'] += 1
+        # 外层包中除嵌套包外还有一个说明文件，与真实输入一致（解压后随暂存目录清理）
+        members.append(('readme.txt', f"{outer_name}\n".encode()))
+        outer_path = os.path.join(out_dir, outer_name)
+        _write_7z(outer_path, members, params['password'])
+        totals['outer_archives'] += 1
+        totals['input_bytes'] += os.path.getsize(outer_path)
+    manifest = {'params': params, 'totals': totals}
+    with open(os.path.join(out_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def ensure_corpus(out_dir, params):
+    """清单参数与请求一致时复用已有语料，否则重新生成。"""
+    manifest = load_manifest(out_dir)
+    if manifest is not None and manifest.get('params') == params:
+        return manifest
+    return generate(out_dir, params)
+
+
+def add_corpus_arguments(parser):
+    defaults = corpus_params()
+    parser.add_argument('--outer', type=int, default=defaults['outer'], help='外层 NO* 压缩包数量')
+    parser.add_argument('--nested', type=int, default=defaults['nested'], help='每个外层包中的嵌套 .7zz 数量')
+    parser.add_argument('--images', type=int, default=defaults['images'], help='每个嵌套包中的图片数量')
+    parser.add_argument('--image-size', type=int, default=defaults['image_size'], help='图片平均大小（字节）')
+    parser.add_argument('--collisions', type=float, default=defaults['collisions'],
+                        help='与其他外层包的嵌套包使用同名目录的比例（0~1）')
+    parser.add_argument('--corrupt', type=float, default=defaults['corrupt'],
+                        help='截断的图片比例（0~1），用于测试 --validate 的隔离')
+    parser.add_argument('--seed', type=int, default=defaults['seed'], help='随机种子')
+    parser.add_argument('--password', default=defaults['password'], help='压缩包密码（空字符串表示不加密）')
+
+
+def params_from_args(args):
+    return corpus_params(outer=args.outer, nested=args.nested, images=args.images, image_size=args.image_size,
+                         collisions=args.collisions, corrupt=args.corrupt, seed=args.seed, password=args.password or None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='生成确定性的嵌套压缩包合成语料')
+    parser.add_argument('out_dir', help='输出目录')
+    add_corpus_arguments(parser)
+    args = parser.parse_args(argv)
+    manifest = ensure_corpus(args.out_dir, params_from_args(args))
+    totals = manifest['totals']
+    print(f"✅ 语料: {totals['outer_archives']} 个外层包，{totals['nested_archives']} 个嵌套包，"
+          f"{totals['images']} 张图片（{totals['image_bytes'] / 1048576:.1f} MB）")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
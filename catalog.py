@@ -0,0 +1,157 @@
+# 图片清单（--catalog）：收集时为每张移入 all_images 的图片追加一条记录（格式、宽高、字节数、内容哈希、来源压缩包）；
+# 宽高只解析文件头，不解码像素；哈希复用去重索引的缓存
+import csv
+import json
+import os
+import struct
+import threading
+
+from validate import IMAGE_EXTENSIONS
+
+CATALOG_FORMATS = ('jsonl', 'csv')
+CATALOG_FIELDS = ('path', 'format', 'width', 'height', 'bytes', 'blake2b', 'source')
+# 解析 JPEG 时最多跳过的段数，防止损坏文件导致长时间扫描
+_JPEG_MAX_SEGMENTS = 256
+# 带尺寸信息的 JPEG 帧起始段（SOF0~SOF15，不含 DHT/JPG/DAC）
+_JPEG_SOF = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _jpeg_size(f):
+    if f.read(2) != b'\xff\xd8':
+        return None
+    for _ in range(_JPEG_MAX_SEGMENTS):
+        byte = f.read(1)
+        while byte == b'\xff':
+            byte = f.read(1)
+        if not byte:
+            return None
+        marker = byte[0]
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            continue
+        header = f.read(2)
+        if len(header) < 2:
+            return None
+        length = struct.unpack('>H', header)[0]
+        if marker in _JPEG_SOF:
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack('>xHH', data)
+            return width, height
+        if marker == 0xDA:
+            return None
+        f.seek(length - 2, os.SEEK_CUR)
+    return None
+
+
+def _png_size(f):
+    head = f.read(24)
+    if len(head) < 24 or head[:8] != b'\x89PNG\r\n\x1a\n' or head[12:16] != b'IHDR':
+        return None
+    return struct.unpack('>II', head[16:24])
+
+
+def _gif_size(f):
+    head = f.read(10)
+    if len(head) < 10 or head[:6] not in (b'GIF87a', b'GIF89a'):
+        return None
+    return struct.unpack('<HH', head[6:10])
+
+
+def _bmp_size(f):
+    head = f.read(26)
+    if len(head) < 26 or head[:2] != b'BM':
+        return None
+    dib_size = struct.unpack('<I', head[14:18])[0]
+    if dib_size == 12:
+        return struct.unpack('<HH', head[18:22])
+    width, height = struct.unpack('<ii', head[18:26])
+    return width, abs(height)
+
+
+_PARSERS = {
+    '.jpg': ('jpeg', _jpeg_size),
+    '.jpeg': ('jpeg', _jpeg_size),
+    '.png': ('png', _png_size),
+    '.gif': ('gif', _gif_size),
+    '.bmp': ('bmp', _bmp_size),
+}
+
+
+def image_header_info(path):
+    """从文件头读取 (格式, 宽, 高)；无法解析时宽高为 None。非图片扩展名返回 None。"""
+    entry = _PARSERS.get(os.path.splitext(path)[1].lower())
+    if entry is None:
+        return None
+    kind, parser = entry
+    try:
+        with open(path, 'rb') as f:
+            size = parser(f)
+    except (OSError, struct.error):
+        size = None
+    if size is None:
+        return kind, None, None
+    return kind, size[0], size[1]
+
+
+class ImageCatalog:
+    """随收集过程增量写出的清单文件（JSON Lines 或 CSV），记录的路径相对于收集目录。
+
+    on_moved(source, src, dst) 作为 move_images_console 的移动回调使用；整个文件夹被移动时逐个记录其中的图片。
+    线程安全；同一路径的文件已存在时（监视模式重复运行）以追加方式续写。"""
+
+    def __init__(self, path, collect_dir, fmt, dedup_index):
+        if fmt not in CATALOG_FORMATS:
+            raise ValueError(f"未知的清单格式: {fmt}（可选: {', '.join(CATALOG_FORMATS)}）")
+        self.path = path
+        self.collect_dir = collect_dir
+        self.fmt = fmt
+        self.dedup_index = dedup_index
+        self._lock = threading.Lock()
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'a', encoding='utf-8', newline='')
+        self._csv = None
+        if fmt == 'csv':
+            self._csv = csv.writer(self._file)
+            if new_file:
+                self._csv.writerow(CATALOG_FIELDS)
+        self.entries = 0
+
+    def on_moved(self, source, src, dst):
+        paths = []
+        if os.path.isdir(dst):
+            for root, dirs, files in os.walk(dst):
+                for fname in files:
+                    if fname.lower().endswith(IMAGE_EXTENSIONS):
+                        path = os.path.join(root, fname)
+                        # 整个文件夹被移动时，把去重索引中按暂存路径缓存的哈希转到新路径
+                        self.dedup_index.moved(os.path.join(src, os.path.relpath(path, dst)), path)
+                        paths.append(path)
+        elif dst.lower().endswith(IMAGE_EXTENSIONS):
+            paths.append(dst)
+        if not paths:
+            return
+        try:
+            digests = self.dedup_index.digest_many(paths)
+        except OSError:
+            digests = {}
+        rows = []
+        for path in paths:
+            kind, width, height = image_header_info(path)
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            rel = os.path.relpath(path, self.collect_dir).replace(os.sep, '/')
+            rows.append((rel, kind, width, height, size, digests.get(path), source))
+        with self._lock:
+            for row in rows:
+                if self._csv is not None:
+                    self._csv.writerow(['' if value is None else value for value in row])
+                else:
+                    self._file.write(json.dumps(dict(zip(CATALOG_FIELDS, row)), ensure_ascii=False) + '\n')
+            self.entries += len(rows)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
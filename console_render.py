@@ -0,0 +1,113 @@
+# 控制台进度渲染：只重写发生变化的行，行数受终端高度限制；非终端输出时降级为限频的单行摘要
+import os
+import shutil
+import sys
+import time
+
+# 终端模式的默认刷新间隔与上限（秒）；渲染开销超出预算时自动放慢
+REFRESH_INTERVAL = 0.2
+MAX_REFRESH_INTERVAL = 2.0
+# 渲染（含汇总状态）允许占用的时间比例
+RENDER_BUDGET = 0.05
+# 非终端输出（重定向到文件/管道）时摘要行的最短间隔（秒）
+LINE_INTERVAL = 5.0
+
+
+def _enable_windows_vt():
+    """在 Windows 控制台启用 ANSI 转义序列；失败时返回 False。"""
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+        mode = ctypes.c_uint32()
+        if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            return False
+        # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+        return bool(kernel32.SetConsoleMode(handle, mode.value | 0x0004))
+    except Exception:
+        return False
+
+
+class ConsoleRenderer:
+    """差量刷新的进度区域。
+
+    refresh(build) 调用 build(rows) 生成各行（第一行为汇总），与上一帧逐行比较，
+    只重写变化的行并一次性写出；rows 为最多显示的任务行数（由终端高度或 max_rows 决定）。
+    stdout 不是终端（或 Windows 控制台不支持 ANSI）时，只按 LINE_INTERVAL 输出变化了的汇总行。"""
+
+    def __init__(self, stream=None, max_rows=None):
+        self.stream = stream or sys.stdout
+        try:
+            self.tty = self.stream.isatty()
+        except Exception:
+            self.tty = False
+        if self.tty and os.name == 'nt':
+            self.tty = _enable_windows_vt()
+        if max_rows:
+            self.rows = max_rows
+        else:
+            # 汇总行、“另有 N 个”提示行与光标所在行之外的终端高度
+            self.rows = max(5, shutil.get_terminal_size((80, 24)).lines - 3)
+        # 调用方两次 refresh 之间的等待时间；非终端模式下输出另按 LINE_INTERVAL 限频
+        self.interval = REFRESH_INTERVAL
+        self._prev = []
+        self._last_line = None
+        self._last_line_time = 0.0
+        self.frames = 0
+        self.lines_written = 0
+        self.render_seconds = 0.0
+
+    def refresh(self, build, force=False):
+        """生成并输出一帧；force=True 时忽略非终端模式的限频（用于最后一帧）。"""
+        started = time.perf_counter()
+        lines = build(self.rows)
+        if self.tty:
+            self._draw(lines)
+        else:
+            self._draw_line(lines[0] if lines else '', force)
+        cost = time.perf_counter() - started
+        self.frames += 1
+        self.render_seconds += cost
+        if self.tty:
+            # 超出预算时放慢刷新，预算充裕时逐步恢复
+            if cost > self.interval * RENDER_BUDGET:
+                self.interval = min(MAX_REFRESH_INTERVAL, self.interval * 2)
+            elif self.interval > REFRESH_INTERVAL and cost < self.interval * RENDER_BUDGET / 4:
+                self.interval = max(REFRESH_INTERVAL, self.interval / 2)
+
+    def _draw(self, lines):
+        out = []
+        prev = self._prev
+        if prev:
+            # 回到上一帧第一行的行首
+            out.append(f"\033[{len(prev)}F")
+        for i, line in enumerate(lines):
+            if i < len(prev) and prev[i] == line:
+                out.append("\033[1E")
+            else:
+                out.append(f"{line}\033[K\n")
+                self.lines_written += 1
+        # 新一帧更短：清除多出的旧行，并保持它们作为空行属于本帧
+        extra = len(prev) - len(lines)
+        if extra > 0:
+            out.append("\033[K\n" * extra)
+            lines = list(lines) + [''] * extra
+        self.stream.write(''.join(out))
+        self.stream.flush()
+        self._prev = list(lines)
+
+    def _draw_line(self, line, force):
+        now = time.monotonic()
+        if line == self._last_line or (not force and now - self._last_line_time < LINE_INTERVAL):
+            return
+        self.stream.write(line + '\n')
+        self.stream.flush()
+        self.lines_written += 1
+        self._last_line = line
+        self._last_line_time = now
+
+    def describe(self):
+        """统计信息中的一行描述。"""
+        mode = '终端差量刷新' if self.tty else '非终端摘要'
+        average = self.render_seconds / self.frames * 1000 if self.frames else 0.0
+        return f"{mode} {self.frames} 帧，写出 {self.lines_written} 行，平均 {average:.1f} ms/帧"
@@ -0,0 +1,110 @@
+# CPU 密集阶段（哈希等）的进程池：与解压线程池分开，避免与等待 7z 的线程和进度渲染争夺 GIL。
+# 工作进程按路径自行读取文件，只返回很小的结果（例如十六进制哈希），大块数据不经过进程间管道
+import concurrent.futures
+import multiprocessing
+import os
+import threading
+
+# 每个工作进程允许排队的任务数；超过时提交方阻塞，形成有界队列
+PENDING_PER_WORKER = 4
+
+
+def pool_context():
+    """进程池的启动方式：进程池在解压线程、准入线程与渲染线程都已运行后才创建，
+    此时 fork 一个多线程进程可能让子进程卡在其他线程持有的锁上，因此不使用 fork：
+    有 forkserver 时使用它（从单线程的服务进程派生），否则使用 spawn（Windows 的默认方式）。"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def default_workers(cpu_count=None):
+    """默认进程数：CPU 核数的一半（至少 1 个，最多 4 个），其余核心留给 7z 进程。"""
+    cpu_count = cpu_count or os.cpu_count() or 4
+    return max(1, min(4, cpu_count // 2))
+
+
+class CpuPool:
+    """延迟启动的进程池，提交数受有界信号量限制。
+
+    workers 为 0 时不创建进程，任务在调用线程中直接执行；
+    进程池无法启动或中途损坏时同样回退到在调用线程中执行，结果不受影响。"""
+
+    def __init__(self, workers, max_pending=None):
+        self.workers = max(0, workers)
+        self._slots = threading.BoundedSemaphore(max_pending or max(1, self.workers) * PENDING_PER_WORKER)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._broken = False
+        self.submitted = 0
+        self.fallbacks = 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None and not self._broken and self.workers:
+                try:
+                    self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers,
+                                                                            mp_context=pool_context())
+                except (OSError, ValueError, NotImplementedError) as e:
+                    print(f"⚠️ 无法启动 CPU 进程池，改为在工作线程中计算: {e}")
+                    self._broken = True
+            return None if self._broken else self._executor
+
+    def submit(self, fn, *args):
+        """提交 fn(*args)（必须可在子进程中导入），返回 Future；排队已满时阻塞等待。"""
+        executor = self._get_executor()
+        if executor is not None:
+            self._slots.acquire()
+            try:
+                future = executor.submit(fn, *args)
+            except Exception:
+                self._slots.release()
+                with self._lock:
+                    self._broken = True
+            else:
+                future.add_done_callback(lambda _f: self._slots.release())
+                with self._lock:
+                    self.submitted += 1
+                return future
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+    def result(self, future, fn, *args):
+        """取回结果；进程池损坏（例如工作进程被杀）时在当前线程重新计算。"""
+        try:
+            return future.result()
+        except concurrent.futures.BrokenExecutor:
+            with self._lock:
+                self._broken = True
+                self.fallbacks += 1
+            return fn(*args)
+
+    def map(self, fn, items):
+        """对每个参数提交 fn(item)，按顺序返回结果列表；单个任务的异常原样返回（不抛出）。"""
+        futures = [(item, self.submit(fn, item)) for item in items]
+        results = []
+        for item, future in futures:
+            try:
+                results.append(self.result(future, fn, item))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def describe(self):
+        if not self.workers:
+            return '未启用（在工作线程中计算）'
+        if self._broken and not self.submitted:
+            return '启动失败，已在工作线程中计算'
+        text = f"{self.workers} 个进程，处理 {self.submitted} 个任务"
+        if self.fallbacks:
+            text += f"，回退 {self.fallbacks} 次"
+        return text
@@ -0,0 +1,164 @@
+# 收集阶段的去重索引：先按大小分桶，大小相同才做流式 BLAKE2 哈希，并缓存每个文件的哈希
+import hashlib
+import os
+import threading
+
+import tracing
+
+# 流式哈希的读取缓冲区大小（有界，避免整文件读入内存）
+HASH_BUFFER_SIZE = 1024 * 1024
+# 交给 CPU 进程池计算哈希的最小文件大小；更小的文件在当前线程计算比进程间往返更快
+POOL_MIN_BYTES = 512 * 1024
+
+
+def file_digest(path, buffer_size=HASH_BUFFER_SIZE):
+    """以固定大小的缓冲区流式计算文件的 BLAKE2b 哈希（十六进制）。"""
+    h = hashlib.blake2b(digest_size=32)
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(buffer_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class DedupIndex:
+    """按路径缓存 (大小, 修改时间, 哈希)，同一次运行中每个文件最多读取一次。
+
+    线程安全：缓存读写受锁保护，哈希计算在锁外进行。
+    pool 为 cpu_pool.CpuPool 时，较大文件的哈希在子进程中计算（子进程按路径读取，只返回哈希）。"""
+
+    def __init__(self, pool=None):
+        self.pool = pool
+        self._lock = threading.Lock()
+        self._cache = {}  # path -> (size, mtime_ns, digest or None)
+        self.hashed_files = 0
+        self.hashed_bytes = 0
+
+    def _stat(self, path):
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns
+
+    def size(self, path):
+        """返回文件大小；缓存中已有且未变化时不再访问内容。"""
+        return self._stat(path)[0]
+
+    def _cached(self, path):
+        """返回 (缓存键, 大小, 修改时间, 缓存的哈希或 None)。"""
+        size, mtime_ns = self._stat(path)
+        key = os.path.abspath(path)
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached and cached[0] == size and cached[1] == mtime_ns and cached[2] is not None:
+            return key, size, mtime_ns, cached[2]
+        return key, size, mtime_ns, None
+
+    def _store(self, key, size, mtime_ns, value):
+        with self._lock:
+            self._cache[key] = (size, mtime_ns, value)
+            self.hashed_files += 1
+            self.hashed_bytes += size
+
+    def digest(self, path):
+        """返回文件哈希；文件未变化时复用缓存。"""
+        return self.digest_many([path])[path]
+
+    def digest_many(self, paths):
+        """批量返回 {路径: 哈希}：未缓存的较大文件同时提交到进程池，其余在当前线程计算。
+
+        任一文件无法读取时抛出 OSError。"""
+        result = {}
+        pending = []
+        for path in paths:
+            key, size, mtime_ns, value = self._cached(path)
+            if value is not None:
+                result[path] = value
+            elif self.pool is not None and size >= POOL_MIN_BYTES:
+                pending.append((path, key, size, mtime_ns, self.pool.submit(file_digest, path)))
+            else:
+                value = file_digest(path)
+                self._store(key, size, mtime_ns, value)
+                result[path] = value
+        for path, key, size, mtime_ns, future in pending:
+            value = self.pool.result(future, file_digest, path)
+            self._store(key, size, mtime_ns, value)
+            result[path] = value
+        return result
+
+    def files_equal(self, path1, path2):
+        """判断两个文件内容是否一致：大小不同直接判定不同，大小相同再比较哈希。"""
+        with tracing.span('dedup', path=path2):
+            return self._files_equal(path1, path2)
+
+    def _files_equal(self, path1, path2):
+        try:
+            if self.size(path1) != self.size(path2):
+                return False
+            return self.digest(path1) == self.digest(path2)
+        except OSError:
+            return False
+
+    def dir_content_equal(self, dir1, dir2):
+        """递归判断两个文件夹内容是否完全一致（文件比较走大小 + 哈希）。"""
+        with tracing.span('dedup', path=dir2):
+            return self._dir_content_equal(dir1, dir2)
+
+    def _dir_content_equal(self, dir1, dir2):
+        import filecmp
+        cmp = filecmp.dircmp(dir1, dir2)
+        if cmp.left_only or cmp.right_only or cmp.funny_files:
+            return False
+        # 先比较大小（只需 stat），全部相同再批量计算哈希，使进程池可以并行处理同一目录中的文件
+        pairs = [(os.path.join(dir1, fname), os.path.join(dir2, fname)) for fname in cmp.common_files]
+        try:
+            if any(self.size(a) != self.size(b) for a, b in pairs):
+                return False
+            digests = self.digest_many([path for pair in pairs for path in pair])
+        except OSError:
+            return False
+        if any(digests[a] != digests[b] for a, b in pairs):
+            return False
+        for subdir in cmp.common_dirs:
+            if not self._dir_content_equal(os.path.join(dir1, subdir), os.path.join(dir2, subdir)):
+                return False
+        return True
+
+    def moved(self, src, dst):
+        """文件被移动后把缓存的哈希转到新路径，目标文件以后无需重新读取。"""
+        src_key = os.path.abspath(src)
+        dst_key = os.path.abspath(dst)
+        with self._lock:
+            cached = self._cache.pop(src_key, None)
+            if cached is not None:
+                self._cache[dst_key] = cached
+
+
+# 采样指纹读取的头尾字节数
+SAMPLE_SIZE = 64 * 1024
+
+
+def sample_fingerprint(path, sample_size=SAMPLE_SIZE):
+    """大小 + 头尾采样的 BLAKE2b 哈希，作为大文件的廉价内容指纹。"""
+    size = os.path.getsize(path)
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        h.update(f.read(sample_size))
+        if size > sample_size * 2:
+            f.seek(-sample_size, os.SEEK_END)
+            h.update(f.read(sample_size))
+        elif size > sample_size:
+            h.update(f.read())
+    return f"{size}:{h.hexdigest()}"
+
+
+def bytes_fingerprint(data, sample_size=SAMPLE_SIZE):
+    """与 sample_fingerprint 相同格式的内存数据指纹。"""
+    size = len(data)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(data[:sample_size])
+    if size > sample_size * 2:
+        h.update(data[-sample_size:])
+    elif size > sample_size:
+        h.update(data[sample_size:])
+    return f"{size}:{h.hexdigest()}"
@@ -0,0 +1,92 @@
+# 输入发现：基于 os.scandir 的流式生成器（复用目录项缓存的类型信息），可选递归，按文件头签名识别压缩包
+import os
+
+# 压缩格式签名：(偏移, 魔数, 格式名)
+ARCHIVE_SIGNATURES = (
+    (0, b'7z\xbc\xaf\x27\x1c', '7z'),
+    (0, b'PK\x03\x04', 'zip'),
+    (0, b'PK\x05\x06', 'zip'),
+    (0, b'PK\x07\x08', 'zip'),
+    (0, b'Rar!\x1a\x07', 'rar'),
+    (0, b'\xfd7zXZ\x00', 'xz'),
+    (0, b'\x1f\x8b', 'gzip'),
+    (0, b'BZh', 'bzip2'),
+    (0, b'\x28\xb5\x2f\xfd', 'zstd'),
+    (0, b'MSCF', 'cab'),
+    (257, b'ustar', 'tar'),
+)
+# 识别签名需要读取的文件头字节数
+SNIFF_SIZE = 512
+
+# 输入匹配方式：name 为根目录下以 NO 开头的无扩展名文件；magic 为任意带压缩包签名的文件
+MATCH_MODES = ('name', 'magic')
+
+# 发现与递归时跳过的目录名前缀/后缀（收集目录、暂存目录、虚拟环境与隐藏目录）
+_SKIP_DIR_PREFIXES = ('.', 'all_images')
+_SKIP_DIR_SUFFIXES = ('_extracted',)
+
+
+def sniff_bytes(head):
+    """按文件头字节判断压缩格式，返回格式名；不是已知压缩包时返回 None。"""
+    for offset, magic, kind in ARCHIVE_SIGNATURES:
+        if head[offset:offset + len(magic)] == magic:
+            return kind
+    return None
+
+
+def sniff_archive(path):
+    """读取文件头判断压缩格式；无法读取或不是已知压缩包时返回 None。"""
+    try:
+        with open(path, 'rb') as f:
+            return sniff_bytes(f.read(SNIFF_SIZE))
+    except OSError:
+        return None
+
+
+def is_input_candidate(filename):
+    """根目录中需要处理的输入：以 NO 开头的无扩展名文件。"""
+    return os.path.splitext(filename)[1] == '' and filename.startswith('NO')
+
+
+def input_matches(path, filename, match='name'):
+    """按匹配方式判断一个文件是否为待处理的输入。"""
+    if match == 'magic':
+        return not filename.startswith('.') and sniff_archive(path) is not None
+    return is_input_candidate(filename)
+
+
+def skip_dir(name):
+    """递归扫描（发现与监视）时是否跳过该子目录。"""
+    return name.startswith(_SKIP_DIR_PREFIXES) or name.endswith(_SKIP_DIR_SUFFIXES)
+
+
+def iter_inputs(root_dir, recursive=False, match='name'):
+    """逐个产出待处理的输入 (path, filename)，边扫描边产出，调用方可以在扫描完成前开始解压。
+
+    文件类型判断使用 scandir 目录项自带的信息，不对每个条目额外调用 stat；
+    match='name' 时完全不读取文件内容，match='magic' 时只读取文件头。"""
+    pending = [root_dir]
+    while pending:
+        current = pending.pop()
+        try:
+            it = os.scandir(current)
+        except OSError:
+            if current == root_dir:
+                raise
+            continue
+        subdirs = []
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive and not skip_dir(entry.name):
+                            subdirs.append(entry.path)
+                        continue
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                except OSError:
+                    continue
+                if input_matches(entry.path, entry.name, match):
+                    yield entry.path, entry.name
+        # 逆序入栈，保持子目录按扫描顺序处理
+        pending.extend(reversed(subdirs))
@@ -0,0 +1,559 @@
+# 可插拔的解压后端：默认调用外部 7z.exe，可选进程内 py7zr 实现
+import importlib.util
+import lzma
+import os
+import re
+import subprocess
+import sys
+
+import tracing
+from output_capture import OutputTail, iter_lines
+
+# 可选的进程内解压支持（如果安装了 py7zr）；py7zr 导入开销较大，只在创建进程内后端时才真正导入
+PY7ZR_AVAILABLE = importlib.util.find_spec('py7zr') is not None
+py7zr = None
+
+
+# 流式模式下单个嵌套压缩包允许放入内存的上限；超过时回退到落盘解压
+STREAM_MEMORY_LIMIT = 256 * 1024 * 1024
+# 从 7z 标准输出读取时的分块大小
+STREAM_CHUNK_SIZE = 1024 * 1024
+# 7z 的退出码：0 成功，1 警告（例如部分文件被占用），2 致命错误（打不开、密码错误、数据错误），7 命令行错误
+SEVEN_ZIP_FATAL = 2
+# 7z 在密码错误时的输出；数据加密的 7z 包在密码错误与数据损坏时都报告 "Data Error in encrypted file. Wrong password?"，
+# 无法区分，按密码错误处理
+WRONG_PASSWORD_MARKERS = ('Wrong password', 'Cannot open encrypted archive', 'Can not open encrypted archive')
+FAILURE_LABELS = {'password': '密码错误', 'open': '无法打开', 'data': '数据错误', 'other': '其他错误'}
+
+
+def find_seven_zip():
+    """定位 7z.exe，支持打包后的相对路径；非 Windows 系统上回退到 PATH 中的 7-Zip。"""
+    # 计算基目录：优先使用 _MEIPASS（PyInstaller），其次使用模块 __file__，最后回退到当前工作目录
+    if getattr(sys, 'frozen', False):
+        return os.path.join(sys._MEIPASS, '7z.exe')
+    try:
+        module_dir = os.path.dirname(os.path.abspath(__file__))
+    except NameError:
+        module_dir = os.getcwd()
+    bundled = os.path.join(module_dir, '7z.exe')
+    if os.name != 'nt' and not os.path.exists(bundled):
+        # Linux/macOS 上没有随附的 7z.exe 时使用 PATH 中的 7-Zip（7zz 为官方构建，7z/7za 为 p7zip）
+        import shutil
+        for name in ('7zz', '7z', '7za'):
+            found = shutil.which(name)
+            if found:
+                return found
+    return bundled
+
+
+def hidden_window_kwargs():
+    """在 Windows 上运行外部 7z.exe 时避免弹出额外的控制台窗口。"""
+    if os.name != 'nt':
+        return {}
+    # 使用 CREATE_NO_WINDOW 避免创建新的控制台
+    kwargs = {'creationflags': subprocess.CREATE_NO_WINDOW}
+    # 也可以设置 STARTUPINFO 以隐藏窗口
+    try:
+        si = subprocess.STARTUPINFO()
+        si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        si.wShowWindow = subprocess.SW_HIDE
+        kwargs['startupinfo'] = si
+    except Exception:
+        pass
+    return kwargs
+
+
+class Extractor:
+    """解压后端基类：extract() 成功返回 True，失败打印原因并返回 False。
+
+    流式模式额外使用 list_members()/iter_members() 从外层压缩包读取成员，
+    以及 extract_fileobj() 直接从内存中的文件对象解压嵌套压缩包。"""
+    name = ''
+
+    def extract(self, file_path, out_dir, password=None, threads=None, progress=None, log=None):
+        """threads: 解压线程数（7z 的 -mmt），None 表示由后端自行决定。
+        progress: 可选回调 progress(done_bytes, total_bytes)，按压缩包大小折算已处理的字节数。
+        log: 可选的日志文件路径，解压过程的完整输出逐行追加写入；内存中只保留最后几行用作错误信息。"""
+        raise NotImplementedError
+
+    def list_members(self, file_path, password=None):
+        """返回成员列表 [{'path', 'size', 'is_dir'}]；失败返回 None。"""
+        raise NotImplementedError
+
+    def iter_members(self, file_path, members, password=None, threads=None, log=None):
+        """按归档顺序逐个产出 (member, bytes)，内容只经过内存；出错时抛出 RuntimeError。"""
+        raise NotImplementedError
+
+    def extract_fileobj(self, fileobj, out_dir, password=None, name=''):
+        """从可寻址的文件对象解压；不支持的后端抛出 NotImplementedError。"""
+        raise NotImplementedError
+
+    def probe_password(self, file_path, password):
+        """不做完整解压地测试密码：只读头部，再测试一个加密成员（固实包取第一个，否则取最小的）。
+
+        返回 True（密码正确或无需密码）、False（密码错误）或 None（无法判断，例如不是压缩包或已损坏）。"""
+        raise NotImplementedError
+
+    # 是否支持 extract_batch()：一次调用解压多个压缩包
+    supports_batch = False
+
+    def extract_batch(self, file_paths, out_root, password=None, threads=None, log=None):
+        """把多个压缩包分别解压到 out_root 下以各自文件名命名的目录。
+
+        返回 {file_path: 输出目录}，只包含确认解压成功的压缩包；其余由调用方逐个重新解压以得到准确的错误信息。"""
+        raise NotImplementedError
+
+
+def batch_output_name(file_path):
+    """7z 的 -o<目录>/* 为每个压缩包创建的子目录名：去掉最后一个扩展名；没有扩展名时追加 ~，避免与压缩包本身重名。"""
+    stem, ext = os.path.splitext(os.path.basename(file_path))
+    return stem if ext else stem + '~'
+
+
+class BatchOutputParser:
+    """逐行解析一次解压多个压缩包时 7z 的输出；results 为 {压缩包路径: 是否成功}。
+
+    每个压缩包的输出以 "Extracting archive: <路径>" 开始，成功时以 "Everything is Ok" 结束；
+    出现 ERROR 行（打不开、密码错误、数据错误等）的压缩包视为失败。"""
+
+    def __init__(self):
+        self.results = {}
+        self._current = None
+
+    def feed(self, line):
+        line = line.strip()
+        if line.startswith('Extracting archive: '):
+            self._current = line[len('Extracting archive: '):]
+            self.results[self._current] = False
+        elif self._current is None:
+            return
+        elif line.startswith('ERROR') or line.startswith('Cannot open') or line.startswith('Can not open'):
+            self.results[self._current] = False
+            self._current = None
+        elif line == 'Everything is Ok':
+            self.results[self._current] = True
+            self._current = None
+
+
+def classify_failure(returncode, output):
+    """按 7z 的退出码与错误输出归类失败原因，返回 FAILURE_LABELS 中的键；成功时返回 None。"""
+    if returncode == 0:
+        return None
+    if returncode == SEVEN_ZIP_FATAL:
+        if any(marker in output for marker in WRONG_PASSWORD_MARKERS):
+            return 'password'
+        if 'Cannot open the file as' in output or 'Can not open the file as' in output:
+            return 'open'
+        if 'Data Error' in output or 'CRC Failed' in output or 'Unexpected end of archive' in output:
+            return 'data'
+    return 'other'
+
+
+def probe_member(lines):
+    """从 `7z l -slt` 的输出行中选出测试密码用的加密成员：固实包解码必须从块首开始，取第一个；否则取最小的。
+
+    没有加密成员时返回 None；逐行处理，只保留两个候选。"""
+    header = {}
+    first = smallest = None
+    for m in iter_slt_members(lines, header):
+        if not m['encrypted'] or m['is_dir']:
+            continue
+        if first is None:
+            first = m
+        if smallest is None or m['size'] < smallest['size']:
+            smallest = m
+    return first if header.get('Solid') == '+' else smallest
+
+
+def _slt_member(fields):
+    if 'Path' not in fields:
+        return None
+    try:
+        size = int(fields.get('Size') or 0)
+    except ValueError:
+        size = 0
+    is_dir = fields.get('Folder') == '+' or 'D' in fields.get('Attributes', '')[:1]
+    return {'path': fields['Path'], 'size': size, 'is_dir': is_dir, 'encrypted': fields.get('Encrypted') == '+'}
+
+
+def iter_slt_members(lines, header=None):
+    """逐行解析 `7z l -slt` 的输出，依次产出成员 {'path', 'size', 'is_dir', 'encrypted'}。
+
+    header: 可选的字典，收集分隔线之前的压缩包属性（例如 Solid）。"""
+    # 成员信息位于 "----------" 分隔线之后，每个成员一个空行分隔的 "键 = 值" 块
+    started = False
+    fields = {}
+    for line in lines:
+        if not started:
+            if line == '----------':
+                started = True
+            elif header is not None:
+                key, eq, value = line.partition(' = ')
+                if eq:
+                    header[key.strip()] = value
+            continue
+        if not line.strip():
+            member = _slt_member(fields)
+            if member is not None:
+                yield member
+            fields = {}
+            continue
+        key, eq, value = line.partition(' = ')
+        if eq:
+            fields[key.strip()] = value
+    member = _slt_member(fields)
+    if member is not None:
+        yield member
+
+
+# 7z -bsp1 的进度以退格/回车覆盖同一行输出，形如 " 42% 13 - name"
+PROGRESS_RE = re.compile(r'(\d{1,3})%')
+_PROGRESS_SPLIT_RE = re.compile(r'[\b\r\n]')
+
+
+def iter_progress(stream):
+    """逐块读取 7z 输出，产出 (percent 或 None, 非进度文本行)；不会等到进程结束才返回。"""
+    for part in iter_lines(stream, separators=_PROGRESS_SPLIT_RE):
+        match = PROGRESS_RE.search(part)
+        if match:
+            yield int(match.group(1)), ''
+        elif part.strip():
+            yield None, part
+
+
+class SevenZipExeExtractor(Extractor):
+    """默认后端：每个压缩包启动一个 7z.exe 子进程。
+
+    7z 的输出逐块读取、增量解码：内存中只保留最后几行作为错误信息，完整输出可选地写入日志文件。
+    -sccUTF-8 让 7z 以 UTF-8 输出（Windows 上默认为 OEM 代码页，中文文件名会变成乱码）。"""
+    name = '7z'
+
+    def __init__(self, seven_zip=None):
+        self.seven_zip = seven_zip or find_seven_zip()
+
+    def extract(self, file_path, out_dir, password=None, threads=None, progress=None, log=None):
+        cmd = [self.seven_zip, 'x', file_path, f'-o{out_dir}']
+        if password:
+            cmd.append(f'-p{password}')
+        if threads:
+            cmd.append(f'-mmt{threads}')
+        # 覆盖同名文件；-bsp1 把进度百分比输出到标准输出，便于逐步解析
+        cmd += ['-y', '-bsp1', '-sccUTF-8']
+        try:
+            total = os.path.getsize(file_path)
+        except OSError:
+            total = 0
+        try:
+            # 标准错误合并到标准输出，只用一个管道，避免另一个管道写满导致阻塞
+            with tracing.span('spawn', path=file_path):
+                proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, **hidden_window_kwargs())
+            with proc, OutputTail(log_path=log) as tail:
+                last_percent = -1
+                for percent, text in iter_progress(proc.stdout):
+                    if text:
+                        tail.add(text)
+                    if percent is not None and percent != last_percent:
+                        last_percent = percent
+                        if progress:
+                            progress(total * percent // 100, total)
+                returncode = proc.wait()
+            if returncode == 0:
+                if progress:
+                    progress(total, total)
+                return True
+            else:
+                output = tail.text()
+                reason = FAILURE_LABELS[classify_failure(returncode, output)]
+                error_msg = f"解压失败（{reason}）: {os.path.basename(file_path)}, 错误: {output}"
+                print(error_msg)
+                return False
+        except Exception as e:
+            error_msg = f"解压异常: {os.path.basename(file_path)}, 错误: {e}"
+            print(error_msg)
+            return False
+
+    supports_batch = True
+
+    def extract_batch(self, file_paths, out_root, password=None, threads=None, log=None):
+        # 压缩包清单通过列表文件（-ai@）传入，-an 表示命令行中没有单独的压缩包名；
+        # -o<out_root>/* 让 7z 为每个压缩包建立独立的子目录；错误信息输出到标准输出（-bse1），与各压缩包的段落保持顺序
+        os.makedirs(out_root, exist_ok=True)
+        list_path = os.path.join(out_root, '.titizz_batch_list.txt')
+        with open(list_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(os.path.abspath(p) for p in file_paths) + '\n')
+        cmd = [self.seven_zip, 'x', '-an', f'-ai@{list_path}', '-scsUTF-8', '-sccUTF-8',
+               f'-o{os.path.join(out_root, "*")}', f'-p{password or ""}', '-y', '-bse1', '-bsp0']
+        if threads:
+            cmd.append(f'-mmt{threads}')
+        parser = BatchOutputParser()
+        try:
+            with tracing.span('spawn', path=out_root):
+                proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, **hidden_window_kwargs())
+            # 边读边解析每个压缩包的段落，不在内存中保留整段输出
+            with proc, OutputTail(log_path=log) as tail:
+                for line in tail.feed(iter_lines(proc.stdout)):
+                    parser.feed(line)
+                proc.wait()
+        except Exception as e:
+            print(f"批量解压异常: {len(file_paths)} 个压缩包, 错误: {e}")
+            return {}
+        finally:
+            try:
+                os.remove(list_path)
+            except OSError:
+                pass
+        status = {os.path.normcase(os.path.abspath(path)): ok for path, ok in parser.results.items()}
+        done = {}
+        for file_path in file_paths:
+            out_dir = os.path.join(out_root, batch_output_name(file_path))
+            if status.get(os.path.normcase(os.path.abspath(file_path))) and os.path.isdir(out_dir):
+                done[file_path] = out_dir
+        return done
+
+    def _run_lines(self, args, consume):
+        """运行一条 7z 命令（标准错误并入标准输出），把输出行交给 consume 逐行处理。
+
+        返回 (退出码, consume 的返回值, 最后几行输出)；consume 没有读完的输出在这里读完，避免 7z 阻塞在管道上。"""
+        tail = OutputTail()
+        # 开关紧跟在命令之后：args 中可能含有 "--"，其后的参数都按文件名解析
+        cmd = [self.seven_zip, args[0], '-sccUTF-8'] + args[1:]
+        with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, **hidden_window_kwargs()) as proc:
+            lines = tail.feed(iter_lines(proc.stdout))
+            result = consume(lines)
+            for _line in lines:
+                pass
+            returncode = proc.wait()
+        return returncode, result, tail.text()
+
+    def list_members(self, file_path, password=None):
+        # 仅读取头部信息，不解压数据；密码用于加密头部的压缩包；清单逐行解析，不保留原始输出
+        try:
+            returncode, members, output = self._run_lines(['l', '-slt', file_path, f'-p{password or ""}'],
+                                                          lambda lines: list(iter_slt_members(lines)))
+        except Exception as e:
+            print(f"列出成员异常: {os.path.basename(file_path)}, 错误: {e}")
+            return None
+        if returncode != 0:
+            print(f"列出成员失败: {os.path.basename(file_path)}, 错误: {output}")
+            return None
+        return members
+
+    def probe_password(self, file_path, password):
+        # 第一步只读头部：加密了头部的压缩包在这一步就能判断密码
+        try:
+            returncode, member, output = self._run_lines(['l', '-slt', f'-p{password or ""}', '--', file_path],
+                                                         probe_member)
+        except Exception:
+            return None
+        if returncode != 0:
+            return False if classify_failure(returncode, output) == 'password' else None
+        if member is None:
+            return True
+        # 第二步只测试（t）一个加密成员，数据写入空设备；"--" 之后的参数不再按开关解析
+        try:
+            returncode, _result, output = self._run_lines(
+                ['t', f'-p{password or ""}', '-y', '-bso0', '-bsp0', '--', file_path, member['path']], lambda lines: None)
+        except Exception:
+            return None
+        if returncode == 0:
+            return True
+        return False if classify_failure(returncode, output) == 'password' else None
+
+    def iter_members(self, file_path, members, password=None, threads=None, log=None):
+        # 单个 7z 进程用 -so 把所选成员按归档顺序连续写到标准输出，
+        # 再按头部中记录的大小切分，成员内容经管道进入内存而不落盘
+        members = [m for m in members if not m['is_dir']]
+        if not members:
+            return
+        cmd = [self.seven_zip, 'e', '-so', file_path, f'-p{password or ""}', '-y', '-sccUTF-8']
+        if threads:
+            cmd.append(f'-mmt{threads}')
+        cmd += [m['path'] for m in members]
+        with tracing.span('spawn', path=file_path):
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **hidden_window_kwargs())
+        # 标准错误由后台线程读入环形缓冲区，避免它写满管道时 7z 停在标准输出上
+        tail = OutputTail(log_path=log)
+        drainer = tail.drain(proc.stderr)
+        try:
+            for m in members:
+                chunks = []
+                remaining = m['size']
+                while remaining > 0:
+                    chunk = proc.stdout.read(min(remaining, STREAM_CHUNK_SIZE))
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                    remaining -= len(chunk)
+                if remaining > 0:
+                    break
+                yield m, b''.join(chunks)
+        finally:
+            proc.stdout.close()
+            returncode = proc.wait()
+            drainer.join()
+            proc.stderr.close()
+            tail.close()
+        if returncode != 0 or remaining > 0:
+            raise RuntimeError(f"读取成员失败: {os.path.basename(file_path)}, 错误: {tail.text()}")
+
+
+_Py7zrProgress = None
+
+
+def _import_py7zr():
+    """首次创建进程内后端时导入 py7zr，并定义依赖它的进度回调类；导入失败时抛出 RuntimeError。"""
+    global py7zr, _Py7zrProgress
+    if py7zr is not None:
+        return
+    try:
+        import py7zr as module
+    except Exception as e:
+        raise RuntimeError(f"无法导入 py7zr: {e}")
+
+    class _Progress(module.callbacks.ExtractCallback):
+        """把 py7zr 的解压回调折算为与 7z 后端一致的压缩包字节进度。"""
+
+        def __init__(self, progress, total, uncompressed):
+            self.progress = progress
+            self.total = total
+            self.uncompressed = uncompressed or 0
+            self.written = 0
+
+        def report_start_preparation(self):
+            pass
+
+        def report_start(self, processing_file_path, processing_bytes):
+            pass
+
+        def report_update(self, decompressed_bytes):
+            pass
+
+        def report_end(self, processing_file_path, wrote_bytes):
+            self.written += int(wrote_bytes)
+            if self.uncompressed:
+                self.progress(min(self.total, self.total * self.written // self.uncompressed), self.total)
+
+        def report_warning(self, message):
+            pass
+
+        def report_postprocess(self):
+            pass
+
+    _Py7zrProgress = _Progress
+    py7zr = module
+
+
+class Py7zrExtractor(Extractor):
+    """进程内后端：使用 py7zr 直接解压，省去每个压缩包的进程创建/销毁开销。"""
+    name = 'py7zr'
+
+    def __init__(self):
+        if not PY7ZR_AVAILABLE:
+            raise RuntimeError("未安装 py7zr，无法使用进程内解压后端（pip install py7zr）")
+        _import_py7zr()
+
+    def extract(self, file_path, out_dir, password=None, threads=None, progress=None, log=None):
+        try:
+            with py7zr.SevenZipFile(file_path, mode='r', password=password) as archive:
+                if progress:
+                    total = os.path.getsize(file_path)
+                    callback = _Py7zrProgress(progress, total, archive.archiveinfo().uncompressed)
+                    archive.extract(path=out_dir, callback=callback)
+                    progress(total, total)
+                else:
+                    archive.extractall(path=out_dir)
+            return True
+        except Exception as e:
+            error_msg = f"解压失败: {os.path.basename(file_path)}, 错误: {e}"
+            print(error_msg)
+            if log:
+                # 进程内解压没有逐文件输出，日志中只记录错误
+                with OutputTail(log_path=log) as tail:
+                    tail.add(error_msg)
+            return False
+
+    def list_members(self, file_path, password=None):
+        try:
+            with py7zr.SevenZipFile(file_path, mode='r', password=password) as archive:
+                return [{'path': info.filename, 'size': info.uncompressed or 0, 'is_dir': info.is_directory}
+                        for info in archive.list()]
+        except Exception as e:
+            print(f"列出成员失败: {os.path.basename(file_path)}, 错误: {e}")
+            return None
+
+    def probe_password(self, file_path, password):
+        # file_path 也可以是可寻址的文件对象（流式模式中内存里的嵌套压缩包）
+        try:
+            with py7zr.SevenZipFile(file_path, mode='r', password=password) as archive:
+                if not archive.needs_password():
+                    return True
+                infos = [info for info in archive.list() if not info.is_directory]
+                if not infos:
+                    return True
+                # archiveinfo() 需要文件名，内存中的压缩包只能用 _is_solid() 判断是否固实
+                target = infos[0] if archive._is_solid() else min(infos, key=lambda info: info.uncompressed or 0)
+                archive.extract(targets=[target.filename], factory=py7zr.io.BytesIOFactory(limit=STREAM_MEMORY_LIMIT))
+            return True
+        except (lzma.LZMAError, py7zr.exceptions.CrcError, py7zr.exceptions.PasswordRequired):
+            # 密码错误时 py7zr 在解码阶段报告 LZMA 数据错误或 CRC 不符（加密头部在打开时即失败）
+            return False
+        except Exception:
+            return None
+
+    def iter_members(self, file_path, members, password=None, threads=None, log=None):
+        # 按累计大小分组，每组一次性解码到内存，避免对固实压缩包逐个成员重复解码
+        group, group_size = [], 0
+        groups = []
+        for m in members:
+            if m['is_dir']:
+                continue
+            if group and group_size + m['size'] > STREAM_MEMORY_LIMIT:
+                groups.append(group)
+                group, group_size = [], 0
+            group.append(m)
+            group_size += m['size']
+        if group:
+            groups.append(group)
+        for group in groups:
+            factory = py7zr.io.BytesIOFactory(limit=STREAM_MEMORY_LIMIT)
+            try:
+                with py7zr.SevenZipFile(file_path, mode='r', password=password) as archive:
+                    archive.extract(targets=[m['path'] for m in group], factory=factory)
+            except Exception as e:
+                raise RuntimeError(f"读取成员失败: {os.path.basename(file_path)}, 错误: {e}")
+            for m in group:
+                stream = factory.get(m['path'])
+                stream.seek(0)
+                yield m, stream.read()
+
+    def extract_fileobj(self, fileobj, out_dir, password=None, name=''):
+        try:
+            with py7zr.SevenZipFile(fileobj, mode='r', password=password) as archive:
+                archive.extractall(path=out_dir)
+            return True
+        except Exception as e:
+            print(f"解压失败: {name}, 错误: {e}")
+            return False
+
+
+BACKENDS = {
+    SevenZipExeExtractor.name: SevenZipExeExtractor,
+    Py7zrExtractor.name: Py7zrExtractor,
+}
+DEFAULT_BACKEND = SevenZipExeExtractor.name
+
+
+def get_stream_reader():
+    """流式模式中解码嵌套压缩包的进程内读取器。
+
+    7z 格式需要可寻址的输入，7z.exe 的 -si 无法直接解码 7z，
+    因此内层解码始终使用 py7zr 读取内存中的数据；不可用时抛出 RuntimeError。"""
+    return Py7zrExtractor()
+
+
+def get_extractor(name=None):
+    """按名称创建解压后端；未知名称抛出 ValueError，依赖缺失抛出 RuntimeError。"""
+    name = name or DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"未知的解压后端: {name}（可选: {', '.join(BACKENDS)}）")
+    return BACKENDS[name]()
@@ -0,0 +1,228 @@
+# 并发调节器：同时控制 7z 进程数与每个进程的 -mmt 线程数，按 CPU 利用率和磁盘吞吐动态调整
+import importlib.util
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# 可选的系统指标采集（如果安装了 psutil）；Linux 下没有 psutil 时读取 /proc。
+# psutil 在创建采样器时才导入（位于后台调节线程中），不占用启动时间
+PSUTIL_AVAILABLE = importlib.util.find_spec('psutil') is not None
+psutil = None
+
+
+def _import_psutil():
+    global psutil, PSUTIL_AVAILABLE
+    if psutil is None and PSUTIL_AVAILABLE:
+        try:
+            import psutil as module
+        except Exception:
+            PSUTIL_AVAILABLE = False
+            return
+        psutil = module
+
+# 采样间隔（秒）
+SAMPLE_INTERVAL = 1.0
+# CPU 利用率阈值：高于上限说明线程过多，低于下限说明还有余量
+CPU_HIGH = 0.95
+CPU_LOW = 0.60
+# 增加并发后磁盘吞吐下降超过该比例时回退（随机 I/O 变多的信号）
+THROUGHPUT_DROP = 0.8
+
+
+def _read_proc_cpu():
+    """返回 (busy, total) 的 jiffies 计数；不可用时返回 None。"""
+    try:
+        with open('/proc/stat') as f:
+            fields = [int(x) for x in f.readline().split()[1:]]
+    except (OSError, ValueError):
+        return None
+    idle = fields[3] + (fields[4] if len(fields) > 4 else 0)
+    total = sum(fields)
+    return total - idle, total
+
+
+def _read_proc_disk_bytes():
+    """返回所有物理磁盘的累计读写字节数；不可用时返回 None。"""
+    try:
+        # 只统计 /sys/block 下的整盘，避免分区重复计数
+        disks = {name for name in os.listdir('/sys/block') if not name.startswith(('loop', 'ram', 'dm-'))}
+        total = 0
+        with open('/proc/diskstats') as f:
+            for line in f:
+                parts = line.split()
+                if parts[2] in disks:
+                    total += (int(parts[5]) + int(parts[9])) * 512
+        return total
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class SystemSampler:
+    """采集 CPU 利用率（0~1）与磁盘吞吐（字节/秒）。"""
+
+    def __init__(self):
+        self._last_cpu = None
+        self._last_disk = None
+        self._last_time = None
+        _import_psutil()
+        if PSUTIL_AVAILABLE:
+            psutil.cpu_percent(None)
+        self.available = PSUTIL_AVAILABLE or _read_proc_cpu() is not None
+
+    def _disk_bytes(self):
+        if PSUTIL_AVAILABLE:
+            try:
+                io = psutil.disk_io_counters()
+                return io.read_bytes + io.write_bytes if io else None
+            except Exception:
+                return None
+        return _read_proc_disk_bytes()
+
+    def sample(self):
+        """返回 (cpu_util, disk_bytes_per_sec)；首次调用或不可用的指标返回 None。"""
+        now = time.monotonic()
+        cpu = None
+        if PSUTIL_AVAILABLE:
+            cpu = psutil.cpu_percent(None) / 100.0
+        else:
+            cur = _read_proc_cpu()
+            if cur and self._last_cpu:
+                busy = cur[0] - self._last_cpu[0]
+                total = cur[1] - self._last_cpu[1]
+                cpu = busy / total if total > 0 else None
+            self._last_cpu = cur
+        disk = self._disk_bytes()
+        rate = None
+        if disk is not None and self._last_disk is not None and self._last_time is not None and now > self._last_time:
+            rate = (disk - self._last_disk) / (now - self._last_time)
+        self._last_disk = disk
+        self._last_time = now
+        return cpu, rate
+
+
+class ConcurrencyGovernor:
+    """限制同时运行的 7z 进程数（slot()），并给出每个进程的 -mmt 线程数（mmt）。
+
+    未固定的参数由后台线程按 CPU 利用率与磁盘吞吐做简单爬山调节：
+    CPU 饱和时先减少 -mmt 再减少进程数；CPU 有余量且吞吐未下降时增加进程数；
+    增加进程后吞吐明显下降则回退。"""
+
+    def __init__(self, cpu_count=None, jobs=None, mmt=None, sampler=None):
+        self.cpu_count = cpu_count or os.cpu_count() or 4
+        self.pinned_jobs = jobs is not None
+        self.pinned_mmt = mmt is not None
+        # 默认总线程预算约等于 CPU 核数：一半核数的进程，每个 2 线程
+        self.jobs = max(1, jobs if jobs is not None else self.cpu_count // 2)
+        self.max_jobs = max(self.jobs, self.cpu_count)
+        self.mmt = max(1, mmt if mmt is not None else self.cpu_count // self.jobs)
+        self.adjustments = 0
+        self.min_jobs_seen = self.max_jobs_seen = self.jobs
+        self._active = 0
+        self._cond = threading.Condition()
+        self._held = threading.local()
+        self._sampler = sampler
+        self._stop = threading.Event()
+        self._thread = None
+        self._sampling = False
+        self._last_rate = None
+        self._last_action = None
+
+    @property
+    def auto(self):
+        return not (self.pinned_jobs and self.pinned_mmt)
+
+    @contextmanager
+    def slot(self):
+        """占用一个 7z 进程名额，超过当前上限时阻塞等待。
+
+        同一线程内可重入：流式模式下父任务的 7z 进程阻塞在管道上时，
+        在该线程内直接处理的子任务不会再次等待名额（否则 jobs=1 时会死锁）。"""
+        depth = getattr(self._held, 'depth', 0)
+        if depth:
+            self._held.depth = depth + 1
+            try:
+                yield self.mmt
+            finally:
+                self._held.depth = depth
+            return
+        with self._cond:
+            while self._active >= self.jobs:
+                self._cond.wait()
+            self._active += 1
+        self._held.depth = 1
+        try:
+            yield self.mmt
+        finally:
+            self._held.depth = 0
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    def start(self):
+        """启动后台调节线程；参数全部固定时不启动，没有可用指标时线程立即退出。"""
+        if not self.auto:
+            return
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=SAMPLE_INTERVAL * 2)
+
+    def _loop(self):
+        # 采样器（及 psutil 的导入）在后台线程中创建，不推迟第一个解压任务的启动
+        if self._sampler is None:
+            self._sampler = SystemSampler()
+        if not self._sampler.available:
+            return
+        self._sampling = True
+        self._sampler.sample()
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            cpu, rate = self._sampler.sample()
+            if cpu is not None:
+                self.adjust(cpu, rate)
+
+    def adjust(self, cpu, rate):
+        """根据一次采样调整参数，返回本次执行的动作（便于测试与日志）。"""
+        action = None
+        with self._cond:
+            if cpu > CPU_HIGH and self.jobs * self.mmt > self.cpu_count:
+                if not self.pinned_mmt and self.mmt > 1:
+                    self.mmt -= 1
+                    action = 'mmt-'
+                elif not self.pinned_jobs and self.jobs > 1:
+                    self.jobs -= 1
+                    action = 'jobs-'
+            elif (self._last_action == 'jobs+' and rate is not None and self._last_rate
+                  and rate < self._last_rate * THROUGHPUT_DROP and not self.pinned_jobs and self.jobs > 1):
+                # 增加进程反而让磁盘吞吐下降：回退，并把当前值作为之后的上限
+                self.jobs -= 1
+                self.max_jobs = self.jobs
+                action = 'jobs-'
+            elif cpu < CPU_LOW and not self.pinned_jobs and self.jobs < self.max_jobs:
+                self.jobs += 1
+                action = 'jobs+'
+            elif cpu < CPU_LOW and not self.pinned_mmt and self.jobs * self.mmt < self.cpu_count:
+                self.mmt += 1
+                action = 'mmt+'
+            if action:
+                self.adjustments += 1
+                self.min_jobs_seen = min(self.min_jobs_seen, self.jobs)
+                self.max_jobs_seen = max(self.max_jobs_seen, self.jobs)
+                self._cond.notify_all()
+            self._last_action = action
+            if rate is not None:
+                self._last_rate = rate
+        return action
+
+    def describe(self):
+        """统计信息中的一行描述。"""
+        if not self.auto:
+            mode = '固定'
+        elif not self._sampling:
+            mode = '无系统指标，未调节'
+        else:
+            mode = f"自动调节 {self.adjustments} 次，进程数范围 {self.min_jobs_seen}~{self.max_jobs_seen}"
+        return f"7z 进程 {self.jobs} 个 × -mmt{self.mmt}（{mode}）"
@@ -0,0 +1,210 @@
+# 已处理压缩包台账：按内容指纹记录每个输入的处理阶段，崩溃后重跑可跳过已完成的输入并续做未完成的
+import json
+import os
+import threading
+import time
+
+LEDGER_NAME = '.titizz_ledger.json'
+RUN_LOCK_NAME = '.titizz_run.lock'
+LEDGER_VERSION = 1
+# 两次落盘之间的最短间隔（秒）；阶段完成等关键节点会立即落盘
+FLUSH_INTERVAL = 1.0
+
+# 处理阶段
+STAGE_STARTED = 'started'
+STAGE_DONE = 'done'
+STAGE_FAILED = 'failed'
+
+
+def pid_alive(pid):
+    """进程是否仍在运行；无法确定时按仍在运行处理，避免误删其他运行的暂存目录。"""
+    if not pid or pid <= 0:
+        return False
+    if os.name == 'nt':
+        # Windows 上 os.kill(pid, 0) 会结束目标进程，改用 OpenProcess + GetExitCodeProcess 查询
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return kernel32.GetLastError() == 5  # ERROR_ACCESS_DENIED：进程存在但无权查询
+        try:
+            code = ctypes.c_ulong()
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)):
+                return True
+            return code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+class RunLock:
+    """目标目录下的运行锁文件（内容为 PID）：同一目录同时只有一个运行写台账、清理暂存目录。
+
+    持有进程已退出的锁文件视为过期并接管；同一进程重复获取（监视模式、基准测试多次调用）直接成功。
+    acquire() 失败时 owner 为仍在运行的持有进程 PID；无法创建锁文件时 owner 为 None。"""
+
+    def __init__(self, root_dir):
+        self.path = os.path.join(root_dir, RUN_LOCK_NAME)
+        self.owner = None
+        self.held = False
+
+    def _read_owner(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return None
+
+    def acquire(self):
+        for _attempt in range(2):
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                owner = self._read_owner()
+                if owner == os.getpid():
+                    self.held = True
+                    return True
+                if owner and pid_alive(owner):
+                    self.owner = owner
+                    return False
+                # 过期的锁：持有进程已退出（或锁文件损坏）
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+                continue
+            except OSError as e:
+                print(f"⚠️ 无法创建运行锁 {self.path}: {e}")
+                return False
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(str(os.getpid()))
+            self.held = True
+            return True
+        return False
+
+    def release(self):
+        if not self.held:
+            return
+        self.held = False
+        if self._read_owner() == os.getpid():
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+class Ledger:
+    """目标目录下的 JSON 台账，条目以输入的内容指纹（大小 + 采样哈希）为键。
+
+    每个条目记录阶段（started/done/failed）、最近一次的文件名与已完成的嵌套压缩包列表；
+    进行中的条目另外记录所属进程的 PID 与暂存目录，供之后的运行判断并清理中断遗留的目录。
+    写入先落到临时文件再 os.replace，保证任意时刻崩溃都不会留下半个文件。"""
+
+    def __init__(self, root_dir):
+        self.path = os.path.join(root_dir, LEDGER_NAME)
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dirty = False
+        self._last_flush = 0.0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == LEDGER_VERSION:
+                self._entries = data.get('entries', {})
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def stage(self, fingerprint):
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            return entry['stage'] if entry else None
+
+    def nested_done(self, fingerprint):
+        """返回该输入中已完成收集的嵌套压缩包名称集合（用于续做）。"""
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            return set(entry.get('nested_done', [])) if entry else set()
+
+    def start(self, fingerprint, name, staging=None):
+        with self._lock:
+            entry = self._entries.setdefault(fingerprint, {'nested_done': []})
+            entry['name'] = name
+            entry['stage'] = STAGE_STARTED
+            entry['pid'] = os.getpid()
+            if staging:
+                entry['staging'] = staging
+            entry['updated'] = time.time()
+            self._dirty = True
+        self.flush()
+
+    def mark_nested(self, fingerprint, nested_name):
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is None:
+                return
+            if nested_name not in entry['nested_done']:
+                entry['nested_done'].append(nested_name)
+            entry['updated'] = time.time()
+            self._dirty = True
+        self.flush(force=False)
+
+    def finish(self, fingerprint, ok):
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is None:
+                return
+            entry['stage'] = STAGE_DONE if ok else STAGE_FAILED
+            entry['updated'] = time.time()
+            # 暂存目录已由本次运行清理
+            entry.pop('staging', None)
+            if ok:
+                # 完成后不再需要续做信息
+                entry['nested_done'] = []
+            self._dirty = True
+        self.flush()
+
+    def orphaned_staging(self):
+        """中断遗留的暂存目录：阶段仍为 started、所属进程已退出的条目记录的目录。返回 [(指纹, 路径)]。"""
+        with self._lock:
+            entries = [(fp, entry.get('pid'), entry.get('staging')) for fp, entry in self._entries.items()
+                       if entry.get('stage') == STAGE_STARTED and entry.get('staging')]
+        return [(fp, staging) for fp, pid, staging in entries if pid != os.getpid() and not pid_alive(pid)]
+
+    def forget_staging(self, fingerprint):
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is not None and entry.pop('staging', None) is not None:
+                self._dirty = True
+
+    def flush(self, force=True):
+        """原子地写回台账；force=False 时按 FLUSH_INTERVAL 限制写入频率。"""
+        with self._lock:
+            if not self._dirty:
+                return
+            now = time.time()
+            if not force and now - self._last_flush < FLUSH_INTERVAL:
+                return
+            data = json.dumps({'version': LEDGER_VERSION, 'entries': self._entries}, ensure_ascii=False)
+            self._dirty = False
+            self._last_flush = now
+            tmp_path = self.path + '.tmp'
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                self._dirty = True
+                print(f"⚠️ 无法写入台账 {self.path}: {e}")
@@ -0,0 +1,146 @@
+# 跨运行的图片库索引：SQLite 记录 内容哈希/大小/路径/来源压缩包，重复运行时跳过或硬链接已收集的内容
+import os
+import sqlite3
+import threading
+import time
+
+# 每累计多少条新记录提交一次事务
+LIBRARY_BATCH_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    path TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    source TEXT,
+    added_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_images_hash ON images(hash);
+CREATE INDEX IF NOT EXISTS idx_images_size ON images(size);
+"""
+
+
+class ImageLibrary:
+    """持久化的图片库索引。
+
+    screen() 在移动前检查暂存目录中的文件：已知内容删除（跳过）或替换为指向已有文件的硬链接；
+    新内容记入待提交表，move_images_console 移动完成后经 commit_moved() 以最终路径入库。
+    写入按批次合并为一个事务，线程安全。"""
+
+    def __init__(self, db_path, link=False, batch_size=LIBRARY_BATCH_SIZE):
+        self.db_path = os.path.abspath(db_path)
+        self.link = link
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        parent = os.path.dirname(self.db_path)
+        if parent and not os.path.exists(parent):
+            os.makedirs(parent)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._buffer = []  # 尚未提交的 (path, hash, size, source, added_at)
+        self._recent = {}  # 尚未提交记录的 hash -> path，保证同一批次内也能命中
+        self.skipped = 0
+        self.linked = 0
+        self.added = 0
+
+    def _known_path(self, digest, size):
+        """返回内容相同且仍存在的已收集文件路径；失效记录顺便删除。"""
+        with self._lock:
+            recent = self._recent.get(digest)
+            if recent and os.path.exists(recent):
+                return recent
+            rows = self._conn.execute('SELECT path FROM images WHERE hash = ? AND size = ?', (digest, size)).fetchall()
+        stale = []
+        found = None
+        for (path,) in rows:
+            if os.path.exists(path):
+                found = path
+                break
+            stale.append((path,))
+        if stale:
+            with self._lock:
+                self._conn.executemany('DELETE FROM images WHERE path = ?', stale)
+                self._conn.commit()
+        return found
+
+    def _size_known(self, size):
+        with self._lock:
+            if any(entry[2] == size for entry in self._buffer):
+                return True
+            return self._conn.execute('SELECT 1 FROM images WHERE size = ? LIMIT 1', (size,)).fetchone() is not None
+
+    def screen(self, staging_dir, source, dedup_index):
+        """检查暂存目录中的全部文件，返回待入库表 {暂存路径: (hash, size, source)}。
+
+        先按大小查库：没有同样大小的记录时不可能重复，无需查哈希（哈希仍需计算以便入库）。"""
+        pending = {}
+        for root, dirs, files in os.walk(staging_dir):
+            # 同一目录中的文件批量计算哈希（有 CPU 进程池时并行计算）
+            paths = [os.path.join(root, fname) for fname in files]
+            try:
+                digests = dedup_index.digest_many(paths)
+            except OSError:
+                digests = {}
+            for path in paths:
+                try:
+                    size = dedup_index.size(path)
+                    digest = digests.get(path) or dedup_index.digest(path)
+                except OSError:
+                    continue
+                known = self._known_path(digest, size) if self._size_known(size) else None
+                if known is None:
+                    pending[os.path.abspath(path)] = (digest, size, source)
+                    continue
+                try:
+                    os.remove(path)
+                    if self.link:
+                        os.link(known, path)
+                except OSError:
+                    continue
+                with self._lock:
+                    if self.link:
+                        self.linked += 1
+                    else:
+                        self.skipped += 1
+        return pending
+
+    def commit_moved(self, pending, src, dst):
+        """move_images_console 的移动回调：把已移动文件（或整个文件夹中的文件）以最终路径入库。"""
+        src = os.path.abspath(src)
+        dst = os.path.abspath(dst)
+        if src in pending:
+            self._add(dst, *pending.pop(src))
+            return
+        prefix = src + os.sep
+        for path in [p for p in pending if p.startswith(prefix)]:
+            self._add(os.path.join(dst, path[len(prefix):]), *pending.pop(path))
+
+    def _add(self, path, digest, size, source):
+        with self._lock:
+            self._buffer.append((path, digest, size, source, time.time()))
+            self._recent[digest] = path
+            self.added += 1
+            if len(self._buffer) >= self.batch_size:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        with self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO images (path, hash, size, source, added_at) VALUES (?, ?, ?, ?, ?)',
+                self._buffer)
+        self._buffer = []
+        self._recent = {}
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
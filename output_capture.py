@@ -0,0 +1,113 @@
+# 7z 输出的增量读取：按块读取并增量解码（UTF-8，跨块的多字节字符不会被截断，无法解码的字节替换为 �），
+# 只在环形缓冲区中保留最后若干行作为错误上下文，可选地把完整输出逐行写入每个任务的日志文件；
+# 内存占用与压缩包的成员数和输出总量无关
+import codecs
+import collections
+import os
+import re
+import threading
+
+# 环形缓冲区保留的行数：足以包含 7z 结尾的错误摘要
+TAIL_LINES = 40
+READ_CHUNK_SIZE = 4096
+# 不含换行的超长输出（异常情况）按此长度强制断行，保证单行也有上限
+MAX_LINE_CHARS = 8192
+_LINE_BREAK_RE = re.compile(r'\r\n|[\r\n]')
+_UNSAFE_NAME_RE = re.compile(r'[\\/:*?"<>|\x00-\x1f]+')
+
+
+def iter_text(stream, chunk_size=READ_CHUNK_SIZE):
+    """逐块读取字节流并增量解码为文本；不会等到进程结束才返回。"""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    while True:
+        chunk = stream.read1(chunk_size) if hasattr(stream, 'read1') else stream.read(chunk_size)
+        if not chunk:
+            break
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+
+def iter_lines(stream, chunk_size=READ_CHUNK_SIZE, separators=_LINE_BREAK_RE):
+    """按行产出解码后的输出（不含换行符）；只缓存当前未结束的一行。"""
+    pending = ''
+    for text in iter_text(stream, chunk_size):
+        pending += text
+        parts = separators.split(pending)
+        pending = parts.pop()
+        while len(pending) > MAX_LINE_CHARS:
+            parts.append(pending[:MAX_LINE_CHARS])
+            pending = pending[MAX_LINE_CHARS:]
+        yield from parts
+    if pending:
+        yield pending
+
+
+def log_file_name(label):
+    """任务名对应的日志文件名：路径分隔符等不能出现在文件名中的字符替换为 _。"""
+    return _UNSAFE_NAME_RE.sub('_', label).strip(' .') + '.log'
+
+
+class OutputTail:
+    """最近 max_lines 行输出的环形缓冲区，用作错误信息；指定 log_path 时每一行同时追加写入日志文件。
+
+    线程安全（读取标准错误的线程与主线程可以同时写入）；可作为上下文管理器使用，退出时关闭日志文件。"""
+
+    def __init__(self, max_lines=TAIL_LINES, log_path=None):
+        self._lines = collections.deque(maxlen=max_lines)
+        self._lock = threading.Lock()
+        self.dropped = 0
+        self._log = None
+        if log_path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+                self._log = open(log_path, 'a', encoding='utf-8', errors='replace')
+            except OSError as e:
+                print(f"⚠️ 无法写入日志 {log_path}: {e}")
+
+    def add(self, line):
+        with self._lock:
+            if len(self._lines) == self._lines.maxlen:
+                self.dropped += 1
+            self._lines.append(line)
+            if self._log is not None:
+                self._log.write(line + '\n')
+
+    def feed(self, lines):
+        """逐行记录并原样产出，便于在解析输出的同时保留错误上下文。"""
+        for line in lines:
+            self.add(line)
+            yield line
+
+    def drain(self, stream):
+        """在后台线程中读完 stream（例如单独的标准错误管道），避免管道写满导致 7z 阻塞。返回线程。"""
+        def run():
+            for line in iter_lines(stream):
+                self.add(line)
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def text(self):
+        with self._lock:
+            lines = [line for line in self._lines if line.strip()]
+            dropped = self.dropped
+        if dropped:
+            lines.insert(0, f"…（省略之前的 {dropped} 行）")
+        return '\n'.join(lines).strip()
+
+    def close(self):
+        with self._lock:
+            log, self._log = self._log, None
+        if log is not None:
+            log.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
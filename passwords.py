@@ -0,0 +1,184 @@
+# 多个候选密码（--password / --password-file）：用只读头部加测试单个加密成员的廉价探测找出正确的密码，
+# 不为试密码完整解压；确认的密码按压缩包指纹与来源缓存，同一来源的后续压缩包优先尝试，跨运行保存在目标目录下
+import hashlib
+import json
+import os
+import re
+import threading
+
+import tracing
+
+DEFAULT_PASSWORD = 'momo.moe'
+PASSWORD_CACHE_NAME = '.titizz_passwords.json'
+PASSWORD_CACHE_VERSION = 1
+# 来源前缀：去掉文件名末尾的编号与分隔符，例如 NO0012 → NO、pack_003.7zz → pack
+_SERIAL_SUFFIX_RE = re.compile(r'[\d\s._\-()\[\]]+$')
+
+
+class WrongPasswordError(Exception):
+    """探测确认全部候选密码都不正确；调用方直接判定失败，不再为此完整解压。"""
+
+
+def load_candidates(passwords=None, password_file=None):
+    """合并命令行与列表文件中的候选密码（保持顺序并去重）；都没有指定时使用默认密码。
+
+    列表文件每行一个密码，空行与 # 开头的行忽略；读取失败抛出 OSError。"""
+    candidates = list(passwords or [])
+    if password_file:
+        with open(password_file, 'r', encoding='utf-8-sig') as f:
+            for line in f:
+                line = line.rstrip('\r\n')
+                if line and not line.startswith('#'):
+                    candidates.append(line)
+    return list(dict.fromkeys(candidates)) or [DEFAULT_PASSWORD]
+
+
+def password_digest(password):
+    """缓存文件中代替明文保存的密码摘要。"""
+    return hashlib.sha256(password.encode('utf-8')).hexdigest()[:32]
+
+
+def source_prefix(name):
+    """文件名去掉扩展名与末尾编号后的前缀；去掉后为空时返回原文件名。"""
+    base = os.path.basename(name.replace('\\', '/'))
+    stem = os.path.splitext(base)[0] if '.' in base[1:] else base
+    return _SERIAL_SUFFIX_RE.sub('', stem) or base
+
+
+def source_key(path, root_dir):
+    """外层输入的来源：相对于目标目录的所在目录 + 文件名前缀。"""
+    rel = os.path.relpath(os.path.dirname(os.path.abspath(path)), root_dir).replace(os.sep, '/')
+    return f"{rel}/{source_prefix(path)}"
+
+
+class PasswordBook:
+    """候选密码与已确认密码的缓存，线程安全。
+
+    只有一个候选密码时不做任何探测，行为与开销都与单密码时相同。
+    缓存文件以摘要保存密码，只在候选列表中找到对应的密码时才使用；其他条目原样保留。"""
+
+    def __init__(self, candidates, cache_path=None):
+        self.candidates = list(dict.fromkeys(candidates)) or [DEFAULT_PASSWORD]
+        self.cache_path = cache_path
+        self._by_digest = {password_digest(pw): pw for pw in self.candidates}
+        self._lock = threading.Lock()
+        self._fingerprints = {}
+        self._sources = {}
+        # 本次运行中全部候选都被拒绝的压缩包（按指纹），重复查询时不再探测
+        self._rejected = set()
+        self._dirty = False
+        self.probes = 0
+        self.cached = 0
+        self.guessed = 0
+        self.resolved = 0
+        self.unresolved = 0
+        if cache_path and self.multiple:
+            self._load()
+
+    @property
+    def multiple(self):
+        return len(self.candidates) > 1
+
+    def _load(self):
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') == PASSWORD_CACHE_VERSION:
+            self._fingerprints = data.get('fingerprints', {})
+            self._sources = data.get('sources', {})
+
+    def _lookup(self, table, key):
+        if key is None:
+            return None
+        with self._lock:
+            return self._by_digest.get(table.get(key))
+
+    def _remember(self, fingerprint, source, password):
+        digest = password_digest(password)
+        with self._lock:
+            if fingerprint is not None:
+                self._fingerprints[fingerprint] = digest
+            if source is not None:
+                self._sources[source] = digest
+            self._dirty = True
+
+    def guess(self, fingerprint=None, source=None, hint=None):
+        """不探测地给出压缩包最可能的密码：按指纹缓存的密码、hint（外层的密码）、来源缓存的密码、第一个候选。
+
+        用于嵌套压缩包：绝大多数与外层同一密码，解压失败后才由调用方用 resolve 探测。"""
+        if not self.multiple:
+            return self.candidates[0]
+        known = self._lookup(self._fingerprints, fingerprint)
+        if known is None and hint is None:
+            known = self._lookup(self._sources, source)
+        if known is not None:
+            with self._lock:
+                self.cached += 1
+            return known
+        with self._lock:
+            self.guessed += 1
+        return hint if hint is not None else self.candidates[0]
+
+    def resolve(self, probe, fingerprint=None, source=None, hint=None, label=None):
+        """返回压缩包应使用的密码。probe(password) 为 Extractor.probe_password 的偏函数。
+
+        按指纹缓存过的压缩包直接返回；否则依次探测 hint（嵌套压缩包传入解压失败时使用的密码）、来源缓存的密码与其余候选。
+        探测无法判断（不是压缩包、已损坏）时返回第一个尝试的密码，由正式解压报告实际的错误；
+        全部候选都被拒绝时抛出 WrongPasswordError。"""
+        if not self.multiple:
+            return self.candidates[0]
+        if fingerprint is not None and fingerprint in self._rejected:
+            raise WrongPasswordError(f"全部 {len(self.candidates)} 个候选密码均不正确")
+        known = self._lookup(self._fingerprints, fingerprint)
+        if known is not None:
+            with self._lock:
+                self.cached += 1
+            return known
+        order = list(dict.fromkeys(pw for pw in (hint, self._lookup(self._sources, source)) if pw is not None))
+        order += [pw for pw in self.candidates if pw not in order]
+        undecided = False
+        with tracing.span('password', path=label):
+            for password in order:
+                with self._lock:
+                    self.probes += 1
+                result = probe(password)
+                if result is None:
+                    undecided = True
+                    break
+                if result:
+                    self._remember(fingerprint, source, password)
+                    with self._lock:
+                        self.resolved += 1
+                    return password
+        with self._lock:
+            self.unresolved += 1
+            if not undecided and fingerprint is not None:
+                self._rejected.add(fingerprint)
+        if undecided:
+            return order[0]
+        raise WrongPasswordError(f"全部 {len(self.candidates)} 个候选密码均不正确")
+
+    def flush(self):
+        """原子地写回缓存文件（只在有新确认的密码时写入）。"""
+        with self._lock:
+            if not self._dirty or not self.cache_path:
+                return
+            data = json.dumps({'version': PASSWORD_CACHE_VERSION, 'fingerprints': self._fingerprints,
+                               'sources': self._sources}, ensure_ascii=False)
+            self._dirty = False
+        tmp_path = self.cache_path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"⚠️ 无法写入密码缓存 {self.cache_path}: {e}")
+
+    def describe(self):
+        text = (f"{len(self.candidates)} 个候选，探测 {self.probes} 次，确认 {self.resolved} 个，缓存命中 {self.cached} 个，"
+                f"沿用外层密码 {self.guessed} 个")
+        if self.unresolved:
+            text += f"，未能确认 {self.unresolved} 个"
+        return text
@@ -0,0 +1,54 @@
+# 阶段耗时统计：按阶段累计各工作线程实际执行的时间、次数与处理的字节数，
+# 用于统计信息输出与基准测试（benchmarks/bench_pipeline.py）
+import contextlib
+import threading
+import time
+
+import tracing
+
+# 流水线的阶段：外层解压、嵌套解压、图片校验（--validate）、收集（移动到 all_images）、清理暂存目录
+PHASES = ('extract', 'nested', 'validate', 'move', 'cleanup')
+PHASE_LABELS = {'extract': '外层解压', 'nested': '嵌套解压', 'validate': '图片校验', 'move': '收集', 'cleanup': '清理'}
+
+
+class PhaseStats:
+    """线程安全的阶段计时器。
+
+    秒数是各线程耗时之和（并发执行时可能超过墙钟时间），不包含等待并发许可的时间。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._phases = {phase: {'seconds': 0.0, 'count': 0, 'bytes': 0} for phase in PHASES}
+
+    def add(self, phase, seconds, nbytes=0):
+        with self._lock:
+            entry = self._phases[phase]
+            entry['seconds'] += seconds
+            entry['count'] += 1
+            entry['bytes'] += nbytes
+
+    @contextlib.contextmanager
+    def measure(self, phase, nbytes=0, task=None):
+        """计时一个阶段；启用 --trace 时同时记录为追踪中的时间段。"""
+        started = time.perf_counter()
+        try:
+            with tracing.span(phase, task=task, bytes=nbytes or None):
+                yield
+        finally:
+            self.add(phase, time.perf_counter() - started, nbytes)
+
+    def snapshot(self):
+        """返回 {阶段: {seconds, count, bytes, bytes_per_sec}} 的副本。"""
+        with self._lock:
+            result = {phase: dict(entry) for phase, entry in self._phases.items()}
+        for entry in result.values():
+            entry['bytes_per_sec'] = entry['bytes'] / entry['seconds'] if entry['seconds'] > 0 else 0.0
+        return result
+
+    def describe(self):
+        """统计信息中的一行描述；没有任何记录时返回空字符串。"""
+        parts = []
+        for phase, entry in self.snapshot().items():
+            if entry['count']:
+                parts.append(f"{PHASE_LABELS[phase]} {entry['seconds']:.1f}s/{entry['count']} 次")
+        return '，'.join(parts)
@@ -0,0 +1,159 @@
+# 预扫描：并行读取每个输入的头部清单（7z l -slt），结果按 (路径, 大小, 修改时间) 缓存，
+# 用于 --plan 的解压量/耗时估算，以及正式运行时的任务排序与按字节计算的整体进度。
+# 缓存只由 --plan 写入（每次 --plan 删除已失效的条目），正式运行只读取
+import concurrent.futures
+import json
+import os
+import threading
+
+PLAN_CACHE_NAME = '.titizz_plan_cache.json'
+PLAN_CACHE_VERSION = 1
+# 尚未测得实际吞吐时，每个 7z 进程的估算解压速度（字节/秒）
+DEFAULT_THROUGHPUT = 64 * 1024 * 1024
+
+
+def summarize_members(members, is_nested):
+    """把成员列表汇总为元数据：成员数、解压后总字节数、根层级嵌套压缩包的数量与字节数。"""
+    files = [m for m in members if not m['is_dir']]
+    nested = [m for m in files if '/' not in m['path'].replace('\\', '/') and is_nested(m['path'])]
+    return {
+        'members': len(files),
+        'unpacked': sum(m['size'] for m in files),
+        'nested': len(nested),
+        'nested_bytes': sum(m['size'] for m in nested),
+    }
+
+
+class MetadataCache:
+    """目标目录下的 JSON 缓存：键为输入的绝对路径，条目中的大小与修改时间不匹配时视为失效。
+
+    另外记录最近一次正式运行测得的单进程吞吐，用于耗时估算。"""
+
+    def __init__(self, root_dir):
+        self.path = os.path.join(root_dir, PLAN_CACHE_NAME)
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.throughput = None
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == PLAN_CACHE_VERSION:
+                self._entries = data.get('entries', {})
+                self.throughput = data.get('throughput')
+        except (OSError, ValueError):
+            pass
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _stat_key(path):
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns
+
+    def get(self, path):
+        """返回缓存的元数据；没有缓存或文件已变化时返回 None。"""
+        try:
+            size, mtime_ns = self._stat_key(path)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entries.get(os.path.abspath(path))
+            if entry and entry['size'] == size and entry['mtime_ns'] == mtime_ns:
+                self.hits += 1
+                return entry['info']
+            self.misses += 1
+        return None
+
+    def put(self, path, info):
+        try:
+            size, mtime_ns = self._stat_key(path)
+        except OSError:
+            return
+        with self._lock:
+            self._entries[os.path.abspath(path)] = {'size': size, 'mtime_ns': mtime_ns, 'info': info}
+            self._dirty = True
+
+    def prune(self):
+        """删除已不存在或已变化的输入的条目。"""
+        with self._lock:
+            entries = list(self._entries.items())
+        stale = []
+        for path, entry in entries:
+            try:
+                key = self._stat_key(path)
+            except OSError:
+                key = None
+            if key != (entry['size'], entry['mtime_ns']):
+                stale.append(path)
+        if stale:
+            with self._lock:
+                for path in stale:
+                    self._entries.pop(path, None)
+                self._dirty = True
+        return len(stale)
+
+    def record_throughput(self, nbytes, seconds, jobs):
+        """记录一次正式运行的单进程吞吐（字节/秒）；数据量太小时不记录。"""
+        if nbytes < 1024 * 1024 or seconds <= 0 or jobs <= 0:
+            return
+        with self._lock:
+            self.throughput = nbytes / seconds / jobs
+            self._dirty = True
+
+    def flush(self):
+        """原子地写回缓存文件。"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps({'version': PLAN_CACHE_VERSION, 'throughput': self.throughput,
+                               'entries': self._entries}, ensure_ascii=False)
+            self._dirty = False
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ 无法写入预扫描缓存 {self.path}: {e}")
+
+
+def prescan(extractor, inputs, password_for, cache, is_nested, workers=4):
+    """并行读取各输入的头部清单，返回 [(path, filename, info or None)]（顺序与输入一致）。
+
+    password_for(path) 返回该输入使用的密码；已缓存且未变化的输入不再启动 7z，也不确定密码；
+    读取失败（例如密码错误）的输入 info 为 None。"""
+    def scan(item):
+        path, filename = item
+        info = cache.get(path)
+        if info is None:
+            members = extractor.list_members(path, password_for(path))
+            if members is not None:
+                info = summarize_members(members, is_nested)
+                cache.put(path, info)
+        return path, filename, info
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = list(executor.map(scan, inputs))
+    cache.prune()
+    cache.flush()
+    return results
+
+
+def planned_work(cache, path):
+    """返回 (预计工作量字节数, 是否来自预扫描)；没有缓存时以输入文件大小近似。"""
+    info = cache.get(path)
+    if info is not None:
+        return info['unpacked'] + info['nested_bytes'], True
+    try:
+        return os.path.getsize(path), False
+    except OSError:
+        return 0, False
+
+
+def estimate_seconds(total_bytes, throughput, jobs):
+    """按单进程吞吐与并发进程数估算解压耗时（秒）。"""
+    return total_bytes / max(1.0, (throughput or DEFAULT_THROUGHPUT) * max(1, jobs))
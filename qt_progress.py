@@ -1,16 +1,89 @@
-# 精简的 PyQt5 进度条窗口，仅包含一个进度条，尽量减少样式和布局
+# 精简的 PyQt5 进度条窗口，仅包含一个进度条，尽量减少样式和布局；
+# 可选的任务表格基于 model/view，工作线程通过信号推送更新，GUI 线程按帧合并后统一刷新
 from PyQt5 import QtWidgets, QtCore
 import sys
 
+# 合并刷新的帧间隔（毫秒）：两帧之间收到的多次更新只按最新状态刷新一次
+FRAME_INTERVAL_MS = 33
+
+
+class ProgressBridge(QtCore.QObject):
+    """工作线程到 GUI 线程的信号桥。
+
+    对象在 GUI 线程创建，信号可以在任意线程发射；跨线程时 Qt 自动使用队列连接，槽函数在 GUI 线程执行。"""
+    overall = QtCore.pyqtSignal(int, int, str)  # value, total, text
+    detail = QtCore.pyqtSignal(object)  # 进度条提示中的明细行 [str]
+    tasks = QtCore.pyqtSignal(object)  # 任务表格的行更新 {行号: (文件, 状态, 百分比, 信息)}
+    finished = QtCore.pyqtSignal()
+
+
+class TaskTableModel(QtCore.QAbstractTableModel):
+    """任务表格的数据模型：行数据只存元组，视图只为可见行取数据，上万行也不会拖慢刷新。"""
+    HEADERS = ('文件', '状态', '进度', '信息')
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if role != QtCore.Qt.DisplayRole or not index.isValid():
+            return None
+        value = self._rows[index.row()][index.column()]
+        if index.column() == 2:
+            return f"{value}%"
+        return value
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def apply(self, changes):
+        """合并一批行更新：新行一次性插入，已有行只发出一次覆盖最小到最大行号的 dataChanged。"""
+        if not changes:
+            return
+        existing = len(self._rows)
+        appended = [row for row in changes if row >= existing]
+        if appended:
+            last = max(appended)
+            self.beginInsertRows(QtCore.QModelIndex(), existing, last)
+            self._rows.extend([('', '', 0, '')] * (last - existing + 1))
+            for row in appended:
+                self._rows[row] = changes[row]
+            self.endInsertRows()
+        updated = [row for row in changes if row < existing]
+        if updated:
+            for row in updated:
+                self._rows[row] = changes[row]
+            self.dataChanged.emit(self.index(min(updated), 0), self.index(max(updated), len(self.HEADERS) - 1))
+
 
 class MinimalProgressWindow(QtWidgets.QWidget):
-    """一个极简进度窗口：只含 QProgressBar，去除额外标签和边距以加速渲染。"""
-    def __init__(self, title="Titizz 进度", total=100):
+    """一个极简进度窗口：只含 QProgressBar，去除额外标签和边距以加速渲染。
+
+    show_table=True 时在进度条下方显示任务表格（QTableView + TaskTableModel），窗口可调整大小。
+    指定 on_stop 时在进度条右侧显示停止按钮，点击或关闭窗口都会调用 on_stop（只调用一次）；
+    on_close 在窗口关闭后调用。"""
+    def __init__(self, title="Titizz 进度", total=100, show_table=False, on_stop=None, on_close=None):
         super().__init__()
+        self._on_close = on_close
         self.total = total
+        self.model = None
+        self.table = None
+        self.stop_button = None
+        self._on_stop = on_stop
         self.setWindowTitle(title)
-        # 稍微增大宽度并留出右侧内边距，避免进度条紧贴标题栏的关闭按钮
-        self.setFixedSize(340, 36)
+        if show_table:
+            self.resize(640, 420)
+        else:
+            # 稍微增大宽度并留出右侧内边距，避免进度条紧贴标题栏的关闭按钮
+            self.setFixedSize(500 if on_stop else 420, 36)
         # 使用工具窗口标志，避免额外装饰，置顶以便用户能立即看到
         flags = QtCore.Qt.Tool | QtCore.Qt.WindowStaysOnTopHint
         try:
@@ -19,11 +92,16 @@ class MinimalProgressWindow(QtWidgets.QWidget):
             pass
 
         # 极简布局：只包含进度条，去掉间距和边距
-        layout = QtWidgets.QHBoxLayout(self)
+        if show_table:
+            outer = QtWidgets.QVBoxLayout(self)
+            layout = QtWidgets.QHBoxLayout()
+            outer.addLayout(layout)
+        else:
+            layout = QtWidgets.QHBoxLayout(self)
         # 增加右侧内边距（第三个值），让控件与标题栏右上角的关闭按钮保持距离
         layout.setContentsMargins(8, 4, 8, 4)
         layout.setSpacing(0)
-        # 文本进度显示（n/m），放在进度条左侧，固定宽度以避免抖动
+        # 文本进度显示（n/m 或 “百分比 速率”），放在进度条左侧，固定宽度以避免抖动
         self.label = QtWidgets.QLabel(f"0/{total}")
         try:
             self.label.setAlignment(QtCore.Qt.AlignCenter)
@@ -34,7 +112,7 @@ class MinimalProgressWindow(QtWidgets.QWidget):
             self.label.setStyleSheet("font-size:10px;")
         except Exception:
             pass
-        self.label.setFixedWidth(72)
+        self.label.setFixedWidth(120)
         layout.addWidget(self.label)
 
         self.bar = QtWidgets.QProgressBar()
@@ -48,6 +126,43 @@ class MinimalProgressWindow(QtWidgets.QWidget):
         self.bar.setFixedHeight(24)
         layout.addWidget(self.bar)
 
+        if on_stop is not None:
+            self.stop_button = QtWidgets.QPushButton("停止监视")
+            self.stop_button.setFixedHeight(24)
+            self.stop_button.clicked.connect(self.request_stop)
+            layout.addSpacing(6)
+            layout.addWidget(self.stop_button)
+
+        if show_table:
+            self.model = TaskTableModel(self)
+            self.table = QtWidgets.QTableView()
+            self.table.setModel(self.model)
+            # 固定行高，视图无需逐行测量，大量行时滚动与刷新都保持流畅
+            self.table.verticalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Fixed)
+            self.table.verticalHeader().setDefaultSectionSize(20)
+            self.table.horizontalHeader().setStretchLastSection(True)
+            self.table.setColumnWidth(0, 220)
+            self.table.setColumnWidth(1, 80)
+            self.table.setColumnWidth(2, 60)
+            outer.setContentsMargins(8, 4, 8, 4)
+            outer.addWidget(self.table)
+
+    def request_stop(self):
+        """停止按钮：通知工作线程停止监视，按钮变为不可用，窗口保留到处理结束。"""
+        on_stop, self._on_stop = self._on_stop, None
+        if self.stop_button is not None:
+            self.stop_button.setEnabled(False)
+            self.stop_button.setText("正在停止…")
+        if on_stop is not None:
+            on_stop()
+
+    def closeEvent(self, event):
+        # 监视模式下关闭窗口同样停止监视，否则工作线程会一直等待新文件
+        self.request_stop()
+        super().closeEvent(event)
+        if self._on_close is not None:
+            self._on_close()
+
     def set_value(self, value, text=None):
         # 更新进度条值
         try:
@@ -55,19 +170,23 @@ class MinimalProgressWindow(QtWidgets.QWidget):
         except Exception:
             pass
 
-        # 更新左侧的 n/m 文本；优先使用传入的 text，否则使用当前最大值
+        # 更新左侧文本；优先使用传入的 text（例如 “42% 12.3 MB/s”），否则显示 n/m
         try:
             maxv = self.bar.maximum() if hasattr(self.bar, 'maximum') else getattr(self, 'total', 0)
             if text:
-                # 如果传入了自定义文本（例如 文件名），仍保留 n/m 显示在 label
-                self.label.setText(f"{value}/{maxv}  ")
+                self.label.setText(text)
             else:
                 self.label.setText(f"{value}/{maxv}")
         except Exception:
             pass
 
-        # 只处理必要的事件以保持响应
-        QtWidgets.QApplication.processEvents()
+
+    def set_detail(self, lines):
+        """把各任务的进度明细放到进度条的提示文本中（悬停查看）。"""
+        try:
+            self.bar.setToolTip('\n'.join(lines or []))
+        except Exception:
+            pass
 
 
 class QtProgressApp:
@@ -78,13 +197,26 @@ class QtProgressApp:
       create_app: 是否在构造时创建 QApplication
       compact: 使用精简窗口
       auto_close: 当进度达到 total 时，自动关闭并退出事件循环（默认 False）
+      show_table: 显示每个任务一行的表格
+      on_stop: 监视模式的停止回调；指定时窗口显示停止按钮，关闭窗口也会调用
+
+    工作线程通过 publish()/finish() 推送更新（内部经信号转到 GUI 线程），
+    GUI 线程只保存最新状态，由帧定时器每 FRAME_INTERVAL_MS 毫秒统一刷新一次。
     """
-    def __init__(self, total=100, create_app=False, compact=True, auto_close=False):
+    def __init__(self, total=100, create_app=False, compact=True, auto_close=False, show_table=False, on_stop=None):
         self.app = None
         self.win = None
+        self.bridge = None
         self.total = total
         self.compact = compact
         self.auto_close = auto_close
+        self.show_table = show_table
+        self.on_stop = on_stop
+        self._finished = False
+        self._pending_overall = None
+        self._pending_detail = None
+        self._pending_tasks = {}
+        self._frame_timer = None
         if create_app:
             self.init_app(total)
 
@@ -103,10 +235,83 @@ class QtProgressApp:
         self.app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
         # 选择精简窗口或回退到完整窗口
         if self.compact:
-            self.win = MinimalProgressWindow(total=self.total)
+            self.win = MinimalProgressWindow(total=self.total, show_table=self.show_table, on_stop=self.on_stop,
+                                             on_close=self._on_window_closed)
         else:
             # 回退：稍微大一点但仍保持简单
-            self.win = MinimalProgressWindow(total=self.total)
+            self.win = MinimalProgressWindow(total=self.total, show_table=self.show_table, on_stop=self.on_stop,
+                                             on_close=self._on_window_closed)
+        # 信号桥在 GUI 线程创建，工作线程发射的信号由 GUI 线程的事件循环处理
+        self.bridge = ProgressBridge()
+        self.bridge.overall.connect(self._on_overall)
+        self.bridge.detail.connect(self._on_detail)
+        self.bridge.tasks.connect(self._on_tasks)
+        self.bridge.finished.connect(self._on_finished)
+        self._frame_timer = QtCore.QTimer()
+        self._frame_timer.setInterval(FRAME_INTERVAL_MS)
+        self._frame_timer.timeout.connect(self._flush)
+        self._frame_timer.start()
+
+    # 以下槽函数在 GUI 线程执行，只记录最新状态，不直接重绘
+    def _on_overall(self, value, total, text):
+        self._pending_overall = (value, total, text)
+
+    def _on_detail(self, lines):
+        self._pending_detail = lines
+
+    def _on_tasks(self, changes):
+        self._pending_tasks.update(changes)
+
+    def _flush(self):
+        """每帧最多刷新一次：应用自上一帧以来收到的最新状态。"""
+        if self.win is None:
+            return
+        if self._pending_overall is not None:
+            value, total, text = self._pending_overall
+            self._pending_overall = None
+            if total != self.total:
+                self.win.bar.setRange(0, max(1, total))
+                self.total = total
+            self.set_value(value, text)
+        if self._pending_detail is not None:
+            self.win.set_detail(self._pending_detail)
+            self._pending_detail = None
+        if self._pending_tasks and self.win.model is not None:
+            self.win.model.apply(self._pending_tasks)
+            self._pending_tasks = {}
+
+    def _on_window_closed(self):
+        # 工具窗口（Qt.Tool）关闭时不会自动退出事件循环：处理已结束时由这里退出，
+        # 否则 exec_() 不返回、进程一直挂起；处理未结束时由 _on_finished 在结束后退出
+        if self._finished and self.app is not None:
+            self.app.quit()
+
+    def _on_finished(self):
+        self._finished = True
+        self._flush()
+        self.set_value(self.total, "100% 完成")
+        if self.win is not None and self.win.stop_button is not None:
+            self.win.stop_button.setText("已停止")
+        if not self.auto_close:
+            self._frame_timer.stop()
+            # 窗口已被关闭（例如监视模式下关闭窗口停止监视）时，处理结束后退出事件循环
+            if self.win is not None and not self.win.isVisible():
+                self.quit()
+
+    def publish(self, value, total, text='', detail=None, tasks=None):
+        """可在任意线程调用：把整体进度、明细与任务行更新交给 GUI 线程。"""
+        if self.bridge is None:
+            return
+        self.bridge.overall.emit(value, total, text)
+        if detail is not None:
+            self.bridge.detail.emit(detail)
+        if tasks:
+            self.bridge.tasks.emit(tasks)
+
+    def finish(self):
+        """可在任意线程调用：通知处理结束，进度条走满（auto_close 时随后退出事件循环）。"""
+        if self.bridge is not None:
+            self.bridge.finished.emit()
 
     def start(self):
         if self.win is None:
@@ -133,6 +338,10 @@ class QtProgressApp:
             except Exception:
                 pass
 
+    def set_detail(self, lines):
+        if self.win:
+            self.win.set_detail(lines)
+
     def exec_(self):
         if self.app:
             self.app.exec_()
@@ -0,0 +1,141 @@
+# 嵌套压缩包的全局任务调度：任意深度发现的压缩包都作为独立任务进入同一个线程池
+import threading
+
+
+class ArchiveNode:
+    """调度树中的一个压缩包。
+
+    path: 磁盘上的压缩包路径（流式子任务为 None，内容在 data 中）
+    staging_dir: 本节点的解压目录
+    root_idx: 所属外层输入在 task_states 中的序号
+    pending: 本节点自身处理 + 未完成子节点的数量，归零时节点完成"""
+
+    def __init__(self, path, staging_dir, root_idx, name, depth=0, parent=None, data=None, fingerprint=None):
+        self.path = path
+        self.staging_dir = staging_dir
+        self.root_idx = root_idx
+        self.name = name
+        self.depth = depth
+        self.parent = parent
+        self.data = data
+        self.fingerprint = fingerprint
+        # 祖先链上的指纹集合，用于发现“压缩包包含自身”一类的循环
+        self.ancestors = frozenset()
+        if parent is not None:
+            self.ancestors = parent.ancestors | ({parent.fingerprint} if parent.fingerprint else set())
+        self.pending = 1
+        # 外层节点在磁盘空间准入控制中预留的字节数，节点完成后归还
+        self.reserved = 0
+        # 已由父任务批量解压好的输出目录（--batch），处理时只需移动到 staging_dir
+        self.prepared = None
+        # 解压该节点使用的密码（多个候选密码时在首次需要时确定），子节点优先尝试
+        self.password = None
+        self.ok = True
+        self.error = None
+
+
+class NestedScheduler:
+    """把每个压缩包节点提交到共享线程池，并跟踪父子完成关系。
+
+    process(node, spawn): 处理单个节点；发现嵌套压缩包时调用 spawn(child) 加入队列。
+    on_finished(node): 节点及其全部子孙完成后调用（用于清理该节点的解压目录）。
+    max_depth: 允许的最大嵌套深度（外层输入为 0）。
+    inline_limit: 携带内存数据的子任务最多同时排队的数量，超过时在父任务线程内直接处理，
+                  既限制内存占用，又避免父任务阻塞等待造成线程池死锁。
+    admission: 可选的磁盘空间准入控制（SpaceAdmission）；外层节点在预留到空间后才进入线程池，
+               排队发生在准入线程中，不占用工作线程，已放行任务的嵌套子任务不会被饿死。"""
+
+    def __init__(self, executor, process, on_finished, max_depth=1, inline_limit=None, admission=None):
+        self.executor = executor
+        self.process = process
+        self.on_finished = on_finished
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+        self._roots_remaining = 0
+        self._all_done = threading.Event()
+        self._all_done.set()
+        self._inflight = threading.Semaphore(inline_limit) if inline_limit else None
+        self.admission = admission
+        self.rejected_depth = 0
+        self.rejected_cycle = 0
+
+    def submit_root(self, node, size_fn=None, on_wait=None, exact_fn=None):
+        """提交外层节点；启用准入控制时 size_fn() 给出需要预留的磁盘空间的估算，exact_fn() 给出准确值。"""
+        with self._lock:
+            self._roots_remaining += 1
+            self._all_done.clear()
+        if self.admission is None or size_fn is None:
+            self.executor.submit(self._run, node, False)
+            return
+
+        def start(nbytes):
+            node.reserved = nbytes
+            self.executor.submit(self._run, node, False)
+
+        def fail(error):
+            node.ok = False
+            node.error = error
+            self._release(node)
+
+        self.admission.submit(size_fn, start, fail, on_wait, exact_fn=exact_fn)
+
+    def spawn(self, parent, child):
+        """把子节点加入队列；超过最大深度或构成循环时拒绝并返回 False。"""
+        if child.depth > self.max_depth:
+            with self._lock:
+                self.rejected_depth += 1
+            return False
+        if child.fingerprint and (child.fingerprint in child.ancestors or child.fingerprint == parent.fingerprint):
+            with self._lock:
+                self.rejected_cycle += 1
+            return False
+        with self._lock:
+            parent.pending += 1
+        if child.data is not None and self._inflight is not None:
+            if not self._inflight.acquire(blocking=False):
+                self._run(child, False)
+                return True
+            self.executor.submit(self._run, child, True)
+            return True
+        self.executor.submit(self._run, child, False)
+        return True
+
+    def _run(self, node, holds_slot):
+        try:
+            self.process(node, lambda child: self.spawn(node, child))
+        except Exception as e:
+            node.ok = False
+            node.error = e
+        finally:
+            node.data = None
+            if holds_slot:
+                self._inflight.release()
+            self._release(node)
+
+    def _release(self, node):
+        while node is not None:
+            with self._lock:
+                node.pending -= 1
+                finished = node.pending == 0
+            if not finished:
+                return
+            try:
+                self.on_finished(node)
+            except Exception as e:
+                node.ok = False
+                node.error = node.error or e
+            if node.parent is None:
+                if node.reserved and self.admission is not None:
+                    self.admission.release(node.reserved)
+                with self._lock:
+                    self._roots_remaining -= 1
+                    if self._roots_remaining == 0:
+                        self._all_done.set()
+                return
+            node = node.parent
+
+    def done(self):
+        return self._all_done.is_set()
+
+    def wait(self, timeout=None):
+        return self._all_done.wait(timeout)
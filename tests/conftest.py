@@ -0,0 +1,5 @@
+# 测试直接导入仓库根目录下的扁平模块（与 python titizz_extract.py 运行时相同）
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,100 @@
+# 磁盘空间准入：放得下立即放行、永远放不下立即失败、空间不足时排队到其他任务释放预留
+import collections
+import queue
+
+import pytest
+
+from admission import DiskSpaceError, SpaceAdmission
+
+Usage = collections.namedtuple('Usage', 'free')
+TIMEOUT = 5
+
+
+def make_admission(free, margin=0):
+    return SpaceAdmission('/unused', margin=margin, disk_usage=lambda path: Usage(free))
+
+
+def submit(admission, nbytes, exact_fn=None):
+    """提交一个任务，返回记录 (事件, 参数) 的队列。"""
+    events = queue.Queue()
+    admission.submit(lambda: nbytes,
+                     start=lambda n: events.put(('start', n)),
+                     fail=lambda exc: events.put(('fail', exc)),
+                     on_wait=lambda n: events.put(('wait', n)),
+                     exact_fn=exact_fn)
+    return events
+
+
+def test_starts_when_it_fits():
+    admission = make_admission(1000)
+    try:
+        assert submit(admission, 600).get(timeout=TIMEOUT) == ('start', 600)
+        assert admission.peak_reserved == 600
+        assert admission.waited == admission.rejected == 0
+    finally:
+        admission.close()
+
+
+def test_fails_immediately_when_it_can_never_fit():
+    admission = make_admission(1000, margin=100)
+    try:
+        kind, exc = submit(admission, 950).get(timeout=TIMEOUT)
+        assert kind == 'fail'
+        assert isinstance(exc, DiskSpaceError)
+        assert admission.rejected == 1
+    finally:
+        admission.close()
+
+
+def test_waits_in_order_until_space_is_released():
+    admission = make_admission(1000)
+    try:
+        first = submit(admission, 700)
+        assert first.get(timeout=TIMEOUT) == ('start', 700)
+        second = submit(admission, 500)
+        third = submit(admission, 100)
+        assert second.get(timeout=TIMEOUT) == ('wait', 500)
+        # 排在后面的小任务不会越过队首
+        with pytest.raises(queue.Empty):
+            third.get(timeout=0.2)
+        admission.release(700)
+        assert second.get(timeout=TIMEOUT) == ('start', 500)
+        assert third.get(timeout=TIMEOUT) == ('start', 100)
+        assert second.empty()
+        assert admission.waited == 1
+    finally:
+        admission.close()
+
+
+def test_zero_size_and_unknown_free_space_start_unchecked():
+    admission = make_admission(0)
+    try:
+        assert submit(admission, 0).get(timeout=TIMEOUT) == ('start', 0)
+    finally:
+        admission.close()
+
+    def broken(path):
+        raise OSError('gone')
+    admission = SpaceAdmission('/unused', margin=0, disk_usage=broken)
+    try:
+        assert submit(admission, 10 ** 15).get(timeout=TIMEOUT) == ('start', 10 ** 15)
+    finally:
+        admission.close()
+
+
+def test_exact_size_is_read_only_when_the_estimate_does_not_fit():
+    calls = []
+
+    def exact():
+        calls.append(1)
+        return 400
+
+    admission = make_admission(1000)
+    try:
+        assert submit(admission, 500, exact_fn=exact).get(timeout=TIMEOUT) == ('start', 500)
+        assert calls == []
+        # 估算 800 放不下剩余的 500，读取头部后准确值 400 可以放行
+        assert submit(admission, 800, exact_fn=exact).get(timeout=TIMEOUT) == ('start', 400)
+        assert calls == [1]
+    finally:
+        admission.close()
@@ -0,0 +1,63 @@
+# 清单的文件头尺寸解析：各格式只读文件头取得宽高，无法解析时宽高为 None
+import struct
+
+import pytest
+
+from catalog import image_header_info
+
+
+def jpeg(width, height, sof=0xC0):
+    app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + b'\x00' * 9
+    dht = b'\xff\xc4' + struct.pack('>H', 5) + b'\x00\x00\x00'
+    frame = bytes([0xff, sof]) + struct.pack('>HBHHB', 11, 8, height, width, 1) + b'\x01\x11\x00'
+    return b'\xff\xd8' + app0 + dht + b'\xff' + frame + b'\xff\xda\x00\x02' + b'\xff\xd9'
+
+
+def png(width, height):
+    return b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + b'IHDR' + struct.pack('>II', width, height) + b'\x08' * 9
+
+
+def gif(width, height):
+    return b'GIF87a' + struct.pack('<HH', width, height) + b'\x00' * 4 + b'\x3b'
+
+
+def bmp(width, height, dib_size=40):
+    if dib_size == 12:
+        dib = struct.pack('<IHHHH', 12, width, height, 1, 24)
+    else:
+        dib = struct.pack('<IiiHH', dib_size, width, height, 1, 24) + b'\x00' * (dib_size - 16)
+    return b'BM' + struct.pack('<IHHI', 0, 0, 0, 14 + dib_size) + dib
+
+
+@pytest.mark.parametrize('name,data,expected', [
+    ('a.jpg', jpeg(640, 480), ('jpeg', 640, 480)),
+    ('a.JPEG', jpeg(17, 9, sof=0xC2), ('jpeg', 17, 9)),
+    ('a.png', png(1920, 1080), ('png', 1920, 1080)),
+    ('a.gif', gif(32, 16), ('gif', 32, 16)),
+    ('a.bmp', bmp(100, 50), ('bmp', 100, 50)),
+    # 自上而下存储的 BMP 高度为负数
+    ('a.bmp', bmp(100, -50), ('bmp', 100, 50)),
+    ('a.bmp', bmp(8, 4, dib_size=12), ('bmp', 8, 4)),
+])
+def test_dimensions_from_header(tmp_path, name, data, expected):
+    path = tmp_path / name
+    path.write_bytes(data)
+    assert image_header_info(str(path)) == expected
+
+
+@pytest.mark.parametrize('name,data,kind', [
+    ('a.jpg', jpeg(640, 480)[:30], 'jpeg'),
+    ('a.jpg', b'\xff\xd8\xff\xda\x00\x02', 'jpeg'),
+    ('a.png', b'\x89PNG\r\n\x1a\n', 'png'),
+    ('a.gif', b'GIF', 'gif'),
+    ('a.bmp', b'PK\x03\x04' + b'\x00' * 40, 'bmp'),
+])
+def test_unparseable_header_has_no_dimensions(tmp_path, name, data, kind):
+    path = tmp_path / name
+    path.write_bytes(data)
+    assert image_header_info(str(path)) == (kind, None, None)
+
+
+def test_non_image_and_missing_file(tmp_path):
+    assert image_header_info(str(tmp_path / 'notes.txt')) is None
+    assert image_header_info(str(tmp_path / 'missing.png')) == ('png', None, None)
@@ -0,0 +1,165 @@
+# 7z 输出与命令行约定的纯逻辑：批量解压的输出目录名与输出解析、失败归类、`l -slt` 成员解析与探测密码用的成员
+import pytest
+
+from extractors import (SEVEN_ZIP_FATAL, BatchOutputParser, batch_output_name, classify_failure, iter_slt_members,
+                        probe_member)
+
+# 7zz 一次解压三个压缩包的真实输出：打不开、密码错误、成功
+BATCH_OUTPUT = '''
+7-Zip (z) 26.03 (x64) : Copyright (c) 1999-2026 Igor Pavlov : 2026-09-03
+
+Scanning the drive for archives:
+3 files, 9143 bytes (9 KiB)
+
+Extracting archive: /tmp/nfw/bad.7zz
+ERROR: /tmp/nfw/bad.7zz
+Cannot open the file as archive
+
+Extracting archive: /tmp/prw/n1.7zz
+--
+Path = /tmp/prw/n1.7zz
+Type = 7z
+Physical Size = 3154
+Headers Size = 146
+Method = LZMA2:12 7zAES
+Solid = -
+Blocks = 1
+
+ERROR: Data Error in encrypted file. Wrong password? : i/a.jpg
+
+Sub items Errors: 1
+
+Extracting archive: /tmp/prw/n2.7zz
+--
+Path = /tmp/prw/n2.7zz
+Type = 7z
+Physical Size = 3154
+Headers Size = 146
+Method = LZMA2:12 7zAES
+Solid = -
+Blocks = 1
+
+Everything is Ok
+
+Archives: 3
+OK archives: 1
+Can't open as archive: 1
+Archives with Errors: 1
+'''
+
+# 7zz l -slt 的真实输出；值为空的字段（如目录的 CRC）保留行尾空格
+SLT_OUTPUT = '''
+Listing archive: n2.7zz
+
+--
+Path = n2.7zz
+Type = 7z
+Physical Size = 3196
+Headers Size = 188
+Method = LZMA2:12 7zAES
+Solid = -
+Blocks = 1
+
+----------
+Path = i
+Size = 0
+Packed Size = 0
+Modified = 2026-10-17 18:48:15.4652662
+Attributes = D drwxr-xr-x
+CRC = 
+Encrypted = -
+Method = 
+Block = 
+
+Path = i/b.jpg
+Size = 3000
+Packed Size = 3008
+Modified = 2026-10-17 18:48:15.4710970
+Attributes = A -rw-r--r--
+CRC = 52596AAF
+Encrypted = +
+Method = LZMA2:12 7zAES:19
+Block = 0
+'''
+
+
+def slt(solid, *members):
+    """拼出 `7z l -slt` 的输出行；members 为 (路径, 大小, 是否加密, 是否目录)。"""
+    lines = ['Path = t.7z', 'Type = 7z', f"Solid = {'+' if solid else '-'}", 'Blocks = 1', '', '----------']
+    for path, size, encrypted, is_dir in members:
+        lines += [f'Path = {path}', f'Size = {size}', f'Folder = {"+" if is_dir else "-"}',
+                  f'Encrypted = {"+" if encrypted else "-"}', '']
+    return lines
+
+
+@pytest.mark.parametrize('path,expected', [
+    ('/in/a.7z', 'a'),
+    ('/in/a.tar.gz', 'a.tar'),
+    ('/in/.hidden', '.hidden~'),
+    ('/in/noext', 'noext~'),
+    ('rel/b.ZIP', 'b'),
+])
+def test_batch_output_name(path, expected):
+    assert batch_output_name(path) == expected
+
+
+@pytest.mark.parametrize('returncode,output,expected', [
+    (0, 'ERROR: anything', None),
+    (SEVEN_ZIP_FATAL, 'ERROR: Data Error in encrypted file. Wrong password? : i/a.jpg', 'password'),
+    (SEVEN_ZIP_FATAL, 'ERROR: x.7z\nCannot open encrypted archive. Wrong password?', 'password'),
+    (SEVEN_ZIP_FATAL, 'ERROR: x.7z\nCannot open the file as archive', 'open'),
+    (SEVEN_ZIP_FATAL, 'ERROR: Data Error : a.jpg', 'data'),
+    (SEVEN_ZIP_FATAL, 'ERROR: CRC Failed : a.jpg', 'data'),
+    (SEVEN_ZIP_FATAL, 'ERROR: Unexpected end of archive', 'data'),
+    (SEVEN_ZIP_FATAL, 'ERROR: There is not enough space on the disk', 'other'),
+    (1, 'WARNING: Data Error : a.jpg', 'other'),
+    (255, '', 'other'),
+])
+def test_classify_failure(returncode, output, expected):
+    assert classify_failure(returncode, output) == expected
+
+
+def test_probe_member_prefers_smallest_encrypted_member():
+    lines = slt(False, ('big.jpg', 3000, True, False), ('plain.txt', 1, False, False),
+                ('dir', 0, True, True), ('small.jpg', 20, True, False))
+    assert probe_member(lines)['path'] == 'small.jpg'
+
+
+def test_probe_member_uses_first_encrypted_member_of_solid_archive():
+    lines = slt(True, ('plain.txt', 1, False, False), ('first.jpg', 3000, True, False),
+                ('small.jpg', 20, True, False))
+    assert probe_member(lines)['path'] == 'first.jpg'
+
+
+def test_probe_member_without_encrypted_members():
+    assert probe_member(slt(False, ('a.jpg', 10, False, False))) is None
+    assert probe_member([]) is None
+
+
+def test_batch_output_parser():
+    parser = BatchOutputParser()
+    for line in BATCH_OUTPUT.splitlines():
+        parser.feed(line)
+    assert parser.results == {'/tmp/nfw/bad.7zz': False, '/tmp/prw/n1.7zz': False, '/tmp/prw/n2.7zz': True}
+
+
+def test_batch_output_parser_treats_truncated_output_as_failure():
+    parser = BatchOutputParser()
+    for line in ['Extracting archive: /in/a.7z', 'Everything is Ok', 'Extracting archive: /in/b.7z', '- i/x.jpg']:
+        parser.feed(line)
+    assert parser.results == {'/in/a.7z': True, '/in/b.7z': False}
+
+
+def test_iter_slt_members():
+    header = {}
+    members = list(iter_slt_members(SLT_OUTPUT.splitlines(), header))
+    assert header['Solid'] == '-'
+    assert header['Type'] == '7z'
+    assert members == [
+        {'path': 'i', 'size': 0, 'is_dir': True, 'encrypted': False},
+        {'path': 'i/b.jpg', 'size': 3000, 'is_dir': False, 'encrypted': True},
+    ]
+
+
+def test_iter_slt_members_without_separator_yields_nothing():
+    assert list(iter_slt_members(['Path = a.7z', 'Type = 7z', ''])) == []
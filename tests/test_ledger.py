@@ -0,0 +1,125 @@
+# 台账的阶段转换、持久化与中断遗留目录的判断，以及运行锁
+import json
+import os
+import subprocess
+import sys
+
+from ledger import LEDGER_NAME, RUN_LOCK_NAME, STAGE_DONE, STAGE_FAILED, STAGE_STARTED, Ledger, RunLock, pid_alive
+
+
+def dead_pid():
+    """一个刚刚退出的进程的 PID。"""
+    proc = subprocess.Popen([sys.executable, '-c', 'pass'])
+    proc.wait()
+    return proc.pid
+
+
+def test_unknown_fingerprint_has_no_stage(tmp_path):
+    ledger = Ledger(str(tmp_path))
+    assert ledger.stage('fp') is None
+    assert ledger.nested_done('fp') == set()
+    # 没有 start 过的条目不会被 finish/mark_nested 创建
+    ledger.finish('fp', True)
+    ledger.mark_nested('fp', 'a.7zz')
+    assert ledger.stage('fp') is None
+
+
+def test_start_then_finish_ok_clears_resume_info(tmp_path):
+    ledger = Ledger(str(tmp_path))
+    ledger.start('fp', 'NO0001', staging=str(tmp_path / 'NO0001_extracted'))
+    assert ledger.stage('fp') == STAGE_STARTED
+    ledger.mark_nested('fp', 'a.7zz')
+    ledger.mark_nested('fp', 'a.7zz')
+    assert ledger.nested_done('fp') == {'a.7zz'}
+    ledger.finish('fp', True)
+    assert ledger.stage('fp') == STAGE_DONE
+    assert ledger.nested_done('fp') == set()
+
+
+def test_failed_input_keeps_nested_progress_for_retry(tmp_path):
+    ledger = Ledger(str(tmp_path))
+    ledger.start('fp', 'NO0001')
+    ledger.mark_nested('fp', 'good.7zz')
+    ledger.finish('fp', False)
+    assert ledger.stage('fp') == STAGE_FAILED
+    # 重试时重新进入 started，已完成的嵌套压缩包仍然保留
+    ledger.start('fp', 'NO0001')
+    assert ledger.stage('fp') == STAGE_STARTED
+    assert ledger.nested_done('fp') == {'good.7zz'}
+
+
+def test_stages_survive_reload(tmp_path):
+    ledger = Ledger(str(tmp_path))
+    ledger.start('done', 'NO0001')
+    ledger.finish('done', True)
+    ledger.start('running', 'NO0002')
+    ledger.mark_nested('running', 'x.7zz')
+    ledger.flush()
+    reloaded = Ledger(str(tmp_path))
+    assert reloaded.stage('done') == STAGE_DONE
+    assert reloaded.stage('running') == STAGE_STARTED
+    assert reloaded.nested_done('running') == {'x.7zz'}
+    assert not os.path.exists(str(tmp_path / LEDGER_NAME) + '.tmp')
+
+
+def test_corrupt_or_foreign_ledger_is_ignored(tmp_path):
+    (tmp_path / LEDGER_NAME).write_text('{not json', encoding='utf-8')
+    assert Ledger(str(tmp_path)).stage('fp') is None
+    (tmp_path / LEDGER_NAME).write_text(json.dumps({'version': -1, 'entries': {'fp': {'stage': 'done'}}}),
+                                        encoding='utf-8')
+    assert Ledger(str(tmp_path)).stage('fp') is None
+
+
+def write_entries(tmp_path, entries):
+    (tmp_path / LEDGER_NAME).write_text(json.dumps({'version': 1, 'entries': entries}), encoding='utf-8')
+
+
+def test_orphaned_staging_only_for_started_entries_of_dead_owners(tmp_path):
+    gone = dead_pid()
+    write_entries(tmp_path, {
+        'orphan': {'stage': STAGE_STARTED, 'pid': gone, 'staging': '/x/NO1_extracted', 'nested_done': []},
+        'live': {'stage': STAGE_STARTED, 'pid': os.getppid(), 'staging': '/x/NO2_extracted', 'nested_done': []},
+        'mine': {'stage': STAGE_STARTED, 'pid': os.getpid(), 'staging': '/x/NO3_extracted', 'nested_done': []},
+        'failed': {'stage': STAGE_FAILED, 'pid': gone, 'staging': '/x/NO4_extracted', 'nested_done': []},
+        'no_staging': {'stage': STAGE_STARTED, 'pid': gone, 'nested_done': []},
+    })
+    ledger = Ledger(str(tmp_path))
+    assert ledger.orphaned_staging() == [('orphan', '/x/NO1_extracted')]
+    ledger.forget_staging('orphan')
+    assert ledger.orphaned_staging() == []
+
+
+def test_finish_drops_recorded_staging(tmp_path):
+    ledger = Ledger(str(tmp_path))
+    ledger.start('fp', 'NO0001', staging='/x/NO0001_extracted')
+    ledger.finish('fp', False)
+    with open(tmp_path / LEDGER_NAME, encoding='utf-8') as f:
+        assert 'staging' not in json.load(f)['entries']['fp']
+
+
+def test_pid_alive():
+    assert pid_alive(os.getpid())
+    assert not pid_alive(dead_pid())
+    assert not pid_alive(0)
+    assert not pid_alive(None)
+
+
+def test_run_lock_is_reentrant_and_released(tmp_path):
+    lock = RunLock(str(tmp_path))
+    assert lock.acquire()
+    assert RunLock(str(tmp_path)).acquire()
+    lock.release()
+    assert not (tmp_path / RUN_LOCK_NAME).exists()
+
+
+def test_run_lock_refuses_live_owner_and_takes_over_stale(tmp_path):
+    (tmp_path / RUN_LOCK_NAME).write_text(str(os.getppid()), encoding='utf-8')
+    lock = RunLock(str(tmp_path))
+    assert not lock.acquire()
+    assert lock.owner == os.getppid()
+
+    (tmp_path / RUN_LOCK_NAME).write_text(str(dead_pid()), encoding='utf-8')
+    lock = RunLock(str(tmp_path))
+    assert lock.acquire()
+    assert (tmp_path / RUN_LOCK_NAME).read_text(encoding='utf-8') == str(os.getpid())
+    lock.release()
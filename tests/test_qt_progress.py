@@ -0,0 +1,67 @@
+# QtProgressApp 的事件循环退出：窗口关闭与处理结束的先后顺序都不能让 exec_() 挂起（offscreen 平台，无需显示器）
+import os
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+pytest.importorskip('PyQt5')
+
+from PyQt5 import QtCore  # noqa: E402
+
+from qt_progress import QtProgressApp  # noqa: E402
+
+LOOP_TIMEOUT_MS = 5000
+
+
+def run_loop(progress, actions):
+    """启动事件循环，按 50 ms 间隔依次执行 actions；返回事件循环是否在超时前自行退出。"""
+    timed_out = []
+    timers = []
+
+    def add_timer(delay, callback):
+        timer = QtCore.QTimer()
+        timer.setSingleShot(True)
+        timer.timeout.connect(callback)
+        timer.start(delay)
+        timers.append(timer)
+
+    def on_timeout():
+        timed_out.append(True)
+        progress.app.quit()
+
+    for i, action in enumerate(actions, 1):
+        add_timer(50 * i, action)
+    add_timer(LOOP_TIMEOUT_MS, on_timeout)
+    progress.exec_()
+    # 停止剩余的定时器，避免在下一个测试的事件循环中触发
+    for timer in timers:
+        timer.stop()
+    return not timed_out
+
+
+def make_app(**kwargs):
+    progress = QtProgressApp(total=10, create_app=True, **kwargs)
+    progress.start()
+    return progress
+
+
+def test_table_window_closed_after_finish_quits():
+    progress = make_app(show_table=True)
+    assert run_loop(progress, [progress.finish, progress.win.close])
+
+
+def test_table_window_closed_before_finish_quits():
+    progress = make_app(show_table=True)
+    assert run_loop(progress, [progress.win.close, progress.finish])
+
+
+def test_auto_close_quits_on_finish():
+    progress = make_app(auto_close=True)
+    assert run_loop(progress, [progress.finish])
+
+
+def test_watch_window_close_requests_stop():
+    stopped = []
+    progress = make_app(on_stop=lambda: stopped.append(True))
+    assert run_loop(progress, [progress.win.close, progress.finish])
+    assert stopped == [True]
@@ -0,0 +1,98 @@
+# 图片结构校验：各格式的完整文件通过，截断或损坏的文件给出原因；以及整棵目录的检查与隔离
+import struct
+import zlib
+
+import pytest
+
+from validate import check_image, quarantine, validate_tree
+
+
+def png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+
+def make_png():
+    ihdr = struct.pack('>IIBBBBB', 1, 1, 8, 0, 0, 0, 0)
+    idat = zlib.compress(b'\x00\x00')
+    return (b'\x89PNG\r\n\x1a\n' + png_chunk(b'IHDR', ihdr) + png_chunk(b'IDAT', idat)
+            + png_chunk(b'IEND', b''))
+
+
+def make_jpeg():
+    return b'\xff\xd8\xff\xe0' + b'\x00' * 100 + b'\xff\xd9'
+
+
+def make_gif():
+    return b'GIF89a' + b'\x01\x00\x01\x00\x00\x00\x00' + b'\x00' * 20 + b'\x3b'
+
+
+def make_bmp(width=2, height=2, bpp=24):
+    stride = (width * bpp + 31) // 32 * 4
+    pixels = b'\x00' * (stride * height)
+    offset = 14 + 40
+    size = offset + len(pixels)
+    return (b'BM' + struct.pack('<IHHI', size, 0, 0, offset)
+            + struct.pack('<IiiHHIIiiII', 40, width, height, 1, bpp, 0, len(pixels), 0, 0, 0, 0) + pixels)
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.mark.parametrize('name,data', [
+    ('a.jpg', make_jpeg()),
+    ('a.JPEG', make_jpeg() + b'\x00' * 10),
+    ('a.png', make_png()),
+    ('a.gif', make_gif()),
+    ('a.bmp', make_bmp()),
+])
+def test_intact_images_pass(tmp_path, name, data):
+    assert check_image(write(tmp_path, name, data)) is None
+
+
+@pytest.mark.parametrize('name,data,reason', [
+    ('a.jpg', make_jpeg()[:-2], 'EOI'),
+    ('a.jpg', b'GIF89a' + make_jpeg(), 'SOI'),
+    ('a.png', make_png()[:-12], 'IEND'),
+    ('a.png', make_png()[:25], '截断'),
+    ('a.png', make_png()[:30], 'CRC'),
+    ('a.gif', make_gif()[:-1], 'GIF 结束标记'),
+    ('a.bmp', make_bmp()[:-4], '截断'),
+    ('a.bmp', b'XX' + make_bmp()[2:], 'BMP 文件头无效'),
+    ('a.jpg', b'', '空文件'),
+])
+def test_broken_images_report_a_reason(tmp_path, name, data, reason):
+    result = check_image(write(tmp_path, name, data))
+    assert result is not None and reason in result
+
+
+def test_png_crc_mismatch(tmp_path):
+    data = bytearray(make_png())
+    data[8 + 8] ^= 0xff  # IHDR 数据的第一个字节
+    assert 'CRC' in check_image(write(tmp_path, 'a.png', bytes(data)))
+
+
+def test_non_image_is_not_checked(tmp_path):
+    assert check_image(write(tmp_path, 'notes.txt', b'')) is None
+
+
+def test_validate_tree_and_quarantine(tmp_path):
+    staging = tmp_path / 'NO0001_extracted'
+    (staging / 'sub').mkdir(parents=True)
+    write(staging, 'ok.png', make_png())
+    bad = write(staging / 'sub', 'bad.jpg', make_jpeg()[:-2])
+    write(staging, 'readme.txt', b'x')
+
+    checked, failures = validate_tree(str(staging))
+    assert checked == 2
+    assert [path for path, _reason in failures] == [bad]
+
+    quarantine_dir = tmp_path / 'quarantine'
+    first = quarantine(bad, str(staging), str(quarantine_dir), 'NO0001')
+    assert first == str(quarantine_dir / 'NO0001' / 'sub' / 'bad.jpg')
+    # 同名文件再次隔离时追加序号，不覆盖
+    bad = write(staging / 'sub', 'bad.jpg', b'')
+    second = quarantine(bad, str(staging), str(quarantine_dir), 'NO0001')
+    assert second == str(quarantine_dir / 'NO0001' / 'sub' / 'bad_1.jpg')
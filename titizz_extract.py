@@ -1,60 +1,103 @@
 # 批量解压 7z 和 7zz 文件脚本
 # 使用方法：在虚拟环境中运行此脚本
+import argparse
+import functools
+import importlib.util
+import io
 import os
-import subprocess
 import sys
+import threading
 from datetime import datetime
 
-# 可选的 Qt 进度条支持（如果安装了 PyQt5）
-try:
-    from qt_progress import QtProgressApp
-    QT_AVAILABLE = True
-except Exception:
-    QtProgressApp = None
-    QT_AVAILABLE = False
+from admission import DiskSpaceError, SpaceAdmission
+from catalog import CATALOG_FORMATS, ImageCatalog
+from console_render import ConsoleRenderer
+from cpu_pool import CpuPool, default_workers
+from dedup import DedupIndex, bytes_fingerprint, sample_fingerprint
+from discovery import (MATCH_MODES, SNIFF_SIZE, input_matches, is_input_candidate, iter_inputs, skip_dir, sniff_archive,
+                       sniff_bytes)
+from extractors import (BACKENDS, DEFAULT_BACKEND, STREAM_MEMORY_LIMIT, SevenZipExeExtractor, batch_output_name,
+                        get_extractor, get_stream_reader)
+from governor import ConcurrencyGovernor
+from ledger import LEDGER_NAME, STAGE_DONE, Ledger, RunLock
+from library import ImageLibrary
+from output_capture import log_file_name
+from passwords import (DEFAULT_PASSWORD, PASSWORD_CACHE_NAME, PasswordBook, WrongPasswordError, load_candidates, source_key,
+                       source_prefix)
+from phases import PhaseStats
+from plan import DEFAULT_THROUGHPUT, MetadataCache, estimate_seconds, planned_work, prescan, summarize_members
+from scheduler import ArchiveNode, NestedScheduler
+import tracing
+from validate import QUARANTINE_SUFFIX, quarantine, validate_tree
+from watcher import InboxWatcher
 
-def extract_7z_with_7zexe(file_path, out_dir, password=None):
-    # 7z.exe 路径，支持打包后的相对路径
-    import sys
-    # 计算基目录：优先使用 _MEIPASS（PyInstaller），其次使用模块 __file__，最后回退到当前工作目录
-    if getattr(sys, 'frozen', False):
-        seven_zip = os.path.join(sys._MEIPASS, '7z.exe')
-    else:
+# 可选的 Qt 进度条支持（如果安装了 PyQt5）；导入 PyQt5 开销较大，只在 GUI 模式下按需导入
+QT_AVAILABLE = importlib.util.find_spec('PyQt5') is not None
+QtProgressApp = None
+
+
+def load_qt():
+    """按需导入 qt_progress；返回是否可用。"""
+    global QtProgressApp, QT_AVAILABLE
+    if QtProgressApp is None and QT_AVAILABLE:
         try:
-            module_dir = os.path.dirname(os.path.abspath(__file__))
-        except NameError:
-            module_dir = os.getcwd()
-        seven_zip = os.path.join(module_dir, '7z.exe')
-    cmd = [seven_zip, 'x', file_path, f'-o{out_dir}']
-    if password:
-        cmd.append(f'-p{password}')
-    # 覆盖同名文件
-    cmd.append('-y')
-    try:
-        # 在 Windows 上运行外部 7z.exe 时避免弹出额外的控制台窗口
-        if os.name == 'nt':
-            # 使用 CREATE_NO_WINDOW 避免创建新的控制台
-            creationflags = subprocess.CREATE_NO_WINDOW
-            # 也可以设置 STARTUPINFO 以隐藏窗口
-            try:
-                si = subprocess.STARTUPINFO()
-                si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                si.wShowWindow = subprocess.SW_HIDE
-            except Exception:
-                si = None
-            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, encoding='utf-8', creationflags=creationflags, startupinfo=si)
-        else:
-            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, encoding='utf-8')
-        if result.returncode == 0:
-            return True
-        else:
-            error_msg = f"解压失败: {os.path.basename(file_path)}, 错误: {result.stderr}"
-            print(error_msg)
+            from qt_progress import QtProgressApp as app_class
+        except Exception:
+            QT_AVAILABLE = False
             return False
-    except Exception as e:
-        error_msg = f"解压异常: {os.path.basename(file_path)}, 错误: {e}"
-        print(error_msg)
-        return False
+        QtProgressApp = app_class
+    return QtProgressApp is not None
+
+
+class DeferredGui:
+    """GUI 构建完成前的占位：工作线程立即开始发现与解压，窗口就绪（attach）后才开始接收推送。
+
+    窗口就绪前的推送不会丢失：保留最新的整体进度，任务行的变化按行合并，attach 时一次性补发
+    （调用方只推送变化的行，丢掉的行之后不会再发）。
+    stop_event 由窗口的停止按钮（或关闭窗口）设置，监视模式据此停止等待新文件。"""
+
+    def __init__(self, show_table=False):
+        self.show_table = show_table
+        self.stop_event = threading.Event()
+        self._app = None
+        self._finished = False
+        self._latest = None
+        self._pending_tasks = {}
+        self._lock = threading.Lock()
+
+    def attach(self, app):
+        with self._lock:
+            self._app = app
+            latest, self._latest = self._latest, None
+            tasks, self._pending_tasks = self._pending_tasks, {}
+            finished = self._finished
+            # 在锁内补发，保证之后的推送不会被较早的状态覆盖
+            if latest is not None or tasks:
+                value, total, text, detail = latest or (0, 1, '', None)
+                app.publish(value, total, text, detail=detail, tasks=tasks)
+        if finished:
+            app.finish()
+
+    def publish(self, value, total, text='', detail=None, tasks=None):
+        with self._lock:
+            app = self._app
+            if app is None:
+                self._latest = (value, total, text, detail)
+                if tasks:
+                    self._pending_tasks.update(tasks)
+                return
+            app.publish(value, total, text, detail=detail, tasks=tasks)
+
+    def finish(self):
+        with self._lock:
+            self._finished = True
+            app = self._app
+        if app is not None:
+            app.finish()
+
+def extract_7z_with_7zexe(file_path, out_dir, password=None):
+    """使用外部 7z.exe 解压（默认后端），保留原函数名以兼容旧调用。"""
+    return SevenZipExeExtractor().extract(file_path, out_dir, password)
 
 
 
@@ -69,7 +112,8 @@ def force_remove_directory(path):
             os.chmod(path, stat.S_IWRITE)
             func(path)
     
-    shutil.rmtree(path, onerror=remove_readonly)
+    with tracing.span('delete', path=path):
+        shutil.rmtree(path, onerror=remove_readonly)
 
 
 
@@ -99,6 +143,96 @@ def print_progress_bar(current, total, length=50):
     
     return f"[{bar}] {current}/{total} ({percentage:.1f}%)"
 
+# 直接放置模式下任务槽目录的名称前缀（位于 all_images 目录内）
+SLOT_PREFIX = '.titizz_slot_'
+# --scratch 目录中本次运行的暂存子目录前缀
+SCRATCH_PREFIX = '.titizz_scratch_'
+# 批量解压在外层解压目录中使用的临时输出目录前缀，以及参与批量解压的嵌套压缩包大小上限
+BATCH_DIR_PREFIX = '.titizz_batch_'
+BATCH_MAX_BYTES = 8 * 1024 * 1024
+# 准入控制估算预留空间时使用的倍数：外层解压约为压缩大小的一倍，嵌套压缩包再解压约再一倍
+RESERVE_EXPANSION = 2.0
+# --plan 输出中逐个列出的输入数量上限（按解压后大小从大到小）
+PLAN_DETAIL_LIMIT = 30
+
+
+def is_nested_archive_name(name):
+    """判断解压产物是否应作为嵌套压缩包再次解压（.7zz 或无扩展名）。"""
+    sub_ext = os.path.splitext(name)[1]
+    return sub_ext == '' or sub_ext.lower() == '.7zz'
+
+
+def is_nested_archive(name, path=None, head=None, match='name'):
+    """确认解压产物是否为嵌套压缩包：.7zz 按约定直接认定；无扩展名的条目需带有压缩包文件头，
+    避免对普通文件启动注定失败的 7z 进程。match='magic' 时任意带压缩包文件头的条目都会再次解压。
+
+    path 为磁盘上的文件，head 为内存中的文件头字节（二者给出其一）。"""
+    if os.path.splitext(name)[1].lower() == '.7zz':
+        return True
+    if match != 'magic' and not is_nested_archive_name(name):
+        return False
+    kind = sniff_bytes(head) if head is not None else sniff_archive(path)
+    return kind is not None
+
+
+_device_cache = {}
+
+
+def _device_of(path):
+    """返回路径所在文件系统的设备号（按目录缓存）；路径不存在时向上查找已存在的父目录。"""
+    path = os.path.abspath(path)
+    cached = _device_cache.get(path)
+    if cached is not None:
+        return cached
+    probe = path
+    while not os.path.exists(probe) and os.path.dirname(probe) != probe:
+        probe = os.path.dirname(probe)
+    try:
+        device = os.stat(probe).st_dev
+    except OSError:
+        return None
+    _device_cache[path] = device
+    return device
+
+
+def same_filesystem(path1, path2):
+    """判断两个路径是否位于同一文件系统（同一文件系统内的移动只是重命名）；无法判断时按是处理。"""
+    dev1, dev2 = _device_of(path1), _device_of(path2)
+    return dev1 is None or dev2 is None or dev1 == dev2
+
+
+def format_bytes(n):
+    """把字节数格式化为便于阅读的单位。"""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(n) < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+
+def format_duration(seconds):
+    """把秒数格式化为 时:分:秒。"""
+    seconds = int(round(seconds))
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def format_task_line(state):
+    """控制台中单个任务的进度行。"""
+    bar = print_progress_bar(state['progress'], state['total'], 30)
+    return f"{state['filename'][:30]:<30} {bar} [{state['status']}] {format_byte_progress(state)} {state['msg']}"
+
+
+def format_byte_progress(state):
+    """单个任务的字节级进度：百分比与平均速率；尚无字节进度时返回空串。"""
+    if not state.get('bytes_total'):
+        return ''
+    import time
+    percent = state['bytes_done'] * 100 / state['bytes_total']
+    elapsed = max(time.time() - state['started'], 1e-3) if state.get('started') else 0
+    rate = state['bytes_done'] / elapsed if elapsed else 0
+    return f"{percent:5.1f}% {format_bytes(rate)}/s"
+
+
 def make_timestamped_dir(path):
     """为新建文件夹添加时间戳后缀。"""
     parent, base = os.path.split(path)
@@ -106,22 +240,81 @@ def make_timestamped_dir(path):
     return os.path.join(parent, f"{base}_{timestamp}")
 
 
+def parse_args(argv=None):
+    """解析命令行参数；未知参数忽略，保证右键菜单等旧调用方式可用。"""
+    parser = argparse.ArgumentParser(prog='titizz_extract', description='Titizz 批量解压工具')
+    parser.add_argument('root_dir', nargs='?', default=None, help='目标目录（默认当前目录）')
+    # 默认启用 GUI（如果安装了 PyQt5），除非显式传入 --console
+    parser.add_argument('--console', action='store_true', help='强制控制台模式（不使用 GUI）')
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default=DEFAULT_BACKEND,
+                        help=f'解压后端（默认 {DEFAULT_BACKEND}；py7zr 为进程内解压）')
+    parser.add_argument('--stream', action='store_true',
+                        help='流式模式：嵌套压缩包经管道读入内存直接解压，不写入中间文件（需要 py7zr）')
+    parser.add_argument('--library', metavar='DB', default=None,
+                        help='跨运行图片库索引（SQLite 文件）；已收集过的内容不再重复收集')
+    parser.add_argument('--library-link', action='store_true',
+                        help='配合 --library：已知内容以硬链接放入本次收集目录，而不是跳过')
+    parser.add_argument('--password', action='append', default=None, metavar='PWD',
+                        help=f'解压密码，可重复指定多个候选（默认 {DEFAULT_PASSWORD}）')
+    parser.add_argument('--password-file', metavar='FILE', default=None,
+                        help='候选密码列表文件：每行一个，空行与 # 开头的行忽略；多个候选时先用廉价探测确定每个压缩包的密码')
+    parser.add_argument('--max-depth', type=int, default=1,
+                        help='嵌套压缩包的最大解压深度（默认 1：外层 + 一层嵌套）；更深层的 .7zz 也会作为独立任务解压')
+    parser.add_argument('--batch', type=int, default=0, metavar='N',
+                        help='每次 7z 调用最多解压 N 个较小（不超过 8 MB）的嵌套压缩包，减少进程创建开销（默认 0：逐个解压；仅 7z 后端）')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='固定同时运行的 7z 进程数（默认按 CPU 利用率与磁盘吞吐自动调节）')
+    parser.add_argument('--cpu-workers', type=int, default=None, metavar='N',
+                        help='计算哈希等 CPU 密集工作的进程数，与解压线程数无关（默认 CPU 核数的一半，最多 4；0 表示在解压线程中计算）')
+    parser.add_argument('--mmt', type=int, default=None,
+                        help='固定每个 7z 进程的解压线程数 -mmt（默认自动调节）')
+    parser.add_argument('--no-ledger', action='store_true',
+                        help=f'不使用目标目录下的处理台账（{LEDGER_NAME}），每次都重新处理全部输入')
+    parser.add_argument('--recursive', action='store_true',
+                        help='递归扫描子目录中的输入（跳过 all_images*、*_extracted 与隐藏目录）')
+    parser.add_argument('--match', choices=MATCH_MODES, default='name',
+                        help='输入匹配方式：name 为以 NO 开头的无扩展名文件（默认），magic 为任意带压缩包文件头的文件')
+    parser.add_argument('--scratch', metavar='DIR',
+                        help='暂存目录位置（例如 tmpfs 或本地 SSD）；与收集目录不在同一文件系统时会提示需要复制')
+    parser.add_argument('--no-space-check', action='store_true',
+                        help='关闭磁盘空间准入控制（默认按头部记录的解压后大小预留剩余空间，不足时排队）')
+    parser.add_argument('--plan', action='store_true',
+                        help='只预扫描：并行读取各输入的头部清单，打印解压量、嵌套情况与耗时估算，不解压')
+    parser.add_argument('--top', type=int, metavar='N',
+                        help='控制台最多显示的任务行数（默认按终端高度）；任务更多时只显示最活跃的 N 个')
+    parser.add_argument('--catalog', choices=CATALOG_FORMATS, default=None,
+                        help='收集时写出图片清单 all_images_*_catalog.<格式>（格式、宽高、字节数、哈希、来源压缩包），宽高只解析文件头')
+    parser.add_argument('--validate', action='store_true',
+                        help='收集前校验图片结构（JPEG/PNG/GIF/BMP 的文件头、尾部标记与 CRC），损坏的图片移到 all_images_*_quarantine')
+    parser.add_argument('--log-dir', metavar='DIR', default=None,
+                        help='把每个任务的 7z 完整输出逐行写入 DIR 下以任务命名的日志文件（默认只在内存中保留最后几行用作错误信息）')
+    parser.add_argument('--trace', metavar='FILE', default=None,
+                        help='按任务与阶段记录时间段，写出 Chrome trace-event 格式的 JSON，并在统计信息后打印最耗时的阶段')
+    parser.add_argument('--gui-table', action='store_true',
+                        help='GUI 模式下在进度条下方显示每个任务一行的表格（窗口保留到手动关闭）')
+    parser.add_argument('--watch', action='store_true',
+                        help='监视模式：处理完现有文件后持续等待新的 NO* 文件，收集到固定的 all_images 目录')
+    parser.add_argument('--direct', action='store_true',
+                        help='直接放置模式：在 all_images 目录内的任务槽中解压，完成后以重命名方式原子提交')
+    args, _unknown = parser.parse_known_args(sys.argv[1:] if argv is None else argv)
+    return args
+
+
 def run_with_console_progress():
     """使用控制台进度条模式运行"""
-    # 默认启用 GUI（如果安装了 PyQt5），除非显式传入 --console
-    use_gui = ('--console' not in sys.argv)
+    options = parse_args()
+    use_gui = not options.console
 
     # 解析目标目录（第一个非选项参数）
-    root_dir = None
-    for a in sys.argv[1:]:
-        if a.startswith('-'):
-            continue
-        root_dir = a
-        break
+    root_dir = options.root_dir
     if not root_dir:
         root_dir = os.getcwd()
     
-    password = "momo.moe"
+    try:
+        passwords = load_candidates(options.password, options.password_file)
+    except OSError as e:
+        print(f"❌ 无法读取密码列表 {options.password_file}: {e}")
+        return
     
     # 在控制台模式下清屏并显示横幅；GUI 模式不清屏以避免创建临时控制台窗口
     if not use_gui:
@@ -131,7 +324,11 @@ def run_with_console_progress():
             pass
         print_banner()
         print(f"📁 目标目录: {root_dir}")
-        print(f"🔑 解压密码: {password}")
+        if len(passwords) == 1:
+            print(f"🔑 解压密码: {passwords[0]}")
+        else:
+            print(f"🔑 候选密码: {len(passwords)} 个（按来源缓存，廉价探测后再解压）")
+        print(f"🧩 解压后端: {options.backend}{'（流式）' if options.stream else ''}")
         print("═" * 65)
     
     # 设置全局变量为None（可能会被 batch_extract_console 覆盖为 QtProgressApp 实例）
@@ -143,100 +340,39 @@ def run_with_console_progress():
         from threading import Thread
         import time
 
-        # 共享状态，以线程安全的方式在 worker 和主线程之间通信
+        # 共享状态：无 GUI 的调用方仍可读取；Qt 窗口改由信号推送更新，不再轮询
         global progress_state
         progress_state = {'value': 0, 'total': 1, 'text': '', 'done': False}
 
-        import importlib, time
-        # 预热 PyQt 子模块，尽量把导入开销放到现在（在创建 QApplication 之前）
-        try:
-            importlib.import_module('PyQt5.QtCore')
-            importlib.import_module('PyQt5.QtGui')
-            importlib.import_module('PyQt5.QtWidgets')
-        except Exception:
-            pass
+        # 先启动工作线程，文件发现与解压和 Qt 的导入、窗口构建并行进行
+        gui = DeferredGui(show_table=options.gui_table)
 
-        # 预先创建 QApplication（和一个最小窗口）以缩短后续显示延迟，并记录耗时
-        t0 = time.time()
-        # create_app=True 会创建 QApplication 和窗口；我们先创建一个最小的窗口
-        qt_app = QtProgressApp(total=1, create_app=True, compact=True, auto_close=False)
-        t1 = time.time()
-        print(f"⏱️ Qt init time: {(t1-t0)*1000:.0f} ms")
+        def work():
+            try:
+                batch_extract_console(root_dir, passwords, True, gui, options)
+            finally:
+                gui.finish()
 
-        # 启动后台工作线程，传入 None 为 qt_app（worker 不直接操作 GUI）
-        worker = Thread(target=batch_extract_console, args=(root_dir, password, True, None), daemon=True)
+        worker = Thread(target=work, daemon=True)
         worker.start()
-
-        # 主线程轮询共享状态并更新 GUI（主线程安全）
         try:
-            # 等待 worker 初始化 total
-            import importlib
-            # 等待 worker 初始化 total
-            while not progress_state.get('total', 1):
-                QtWidgets = importlib.import_module('PyQt5.QtWidgets')
-                QtWidgets.QApplication.processEvents()
-                time.sleep(0.01)
-
-            total = max(1, progress_state.get('total', 1))
-            # 更新进度条范围并启用 auto_close（完成时自动关闭并退出事件循环）
-            try:
-                qt_app.win.bar.setRange(0, total)
-                qt_app.total = total
-                qt_app.auto_close = True
-            except Exception:
-                pass
-            qt_app.start()
-            last_total = qt_app.total
-
-            while worker.is_alive():
-                val = progress_state.get('value', 0)
-                txt = progress_state.get('text', '')
-                try:
-                    qt_app.set_value(val, txt)
-                except Exception:
-                    pass
-                # 动态检测 total 变化（例如清理阶段把额外项加入 total），并更新进度条范围
-                try:
-                    current_total = progress_state.get('total', last_total)
-                    if current_total != last_total:
-                        qt_app.win.bar.setRange(0, max(1, current_total))
-                        qt_app.total = current_total
-                        last_total = current_total
-                except Exception:
-                    pass
-                import importlib
-                QtWidgets = importlib.import_module('PyQt5.QtWidgets')
-                QtWidgets.QApplication.processEvents()
-                time.sleep(0.05)
-
-            # 最终刷新一次，确保进度达到 total 以触发 auto_close
-            try:
-                qt_app.set_value(progress_state.get('value', 0), progress_state.get('text', ''))
-                # 确保到达 total
-                qt_app.set_value(total, f"{total}/{total} 完成")
-            except Exception:
-                pass
-
+            t0 = time.time()
+            if load_qt():
+                # 显示任务表格时窗口保留到用户关闭，便于查看每个任务的结果；
+                # 监视模式下总数不断增长，窗口不自动关闭，改由停止按钮（或关闭窗口）结束监视
+                qt_app = QtProgressApp(total=1000, create_app=True, compact=True,
+                                       auto_close=not (options.gui_table or options.watch), show_table=options.gui_table,
+                                       on_stop=gui.stop_event.set if options.watch else None)
+                print(f"⏱️ Qt init time: {(time.time()-t0)*1000:.0f} ms")
+                # 工作线程通过 publish() 发射信号，GUI 线程的事件循环按帧合并后刷新
+                gui.attach(qt_app)
+                qt_app.start()
+                qt_app.exec_()
         finally:
-            # 关闭窗口并退出应用（如果还在运行）
-            try:
-                if qt_app:
-                    try:
-                        qt_app.close()
-                    except Exception:
-                        pass
-                app = __import__('PyQt5.QtWidgets').QApplication.instance()
-                if app:
-                    try:
-                        app.quit()
-                    except Exception:
-                        pass
-            except Exception:
-                pass
-        # 等待 worker 结束（已经结束时瞬间返回）
-        worker.join()
+            # 提前关闭窗口不会中断处理：等待 worker 结束
+            worker.join()
     else:
-        batch_extract_console(root_dir, password, use_gui=use_gui)
+        batch_extract_console(root_dir, passwords, use_gui=use_gui, options=options)
     
     print("\n" + "=" * 60)
     print("✨ 处理完成！")
@@ -263,39 +399,147 @@ def run_with_console_progress():
             print("\n程序将在 3 秒后退出...")
             time.sleep(3)
 
-def batch_extract_console(root_dir, password, use_gui=False, qt_app=None):
-    """控制台模式的批量解压函数"""
-    # 统计需要处理的文件（仅根目录，不遍历子目录）
-    files_to_process = []
-    root_dir_abs = os.path.abspath(root_dir)
+def batch_extract_console(root_dir, password, use_gui=False, qt_app=None, options=None):
+    """控制台模式的批量解压函数
+
+    password: 解压密码，或按顺序尝试的候选密码列表。
+    options: parse_args() 返回的命令行选项；为 None 时使用全部默认值。
+    完成一批解压后返回汇总字典（收集目录、任务数、耗时与各阶段统计）；没有需要处理的输入或只做预扫描时返回 None。"""
+    if options is None:
+        options = parse_args([])
+    # 选择解压后端；进程内后端不可用时回退到 7z.exe 子进程
     try:
-        for filename in os.listdir(root_dir_abs):
-            file_path = os.path.join(root_dir_abs, filename)
-            # 仅处理根目录下的普通文件
-            if not os.path.isfile(file_path):
-                continue
-            # 跳过不应处理的目录或其内容（防护）
-            if '.venv' in file_path or 'all_images' in file_path:
-                continue
-            name, ext = os.path.splitext(filename)
-            if ext == '' and filename.startswith('NO'):
-                files_to_process.append((file_path, filename))
-    except FileNotFoundError:
+        extractor = get_extractor(options.backend)
+    except (ValueError, RuntimeError) as e:
+        print(f"⚠️ {e}，回退到 {DEFAULT_BACKEND} 后端")
+        extractor = get_extractor(DEFAULT_BACKEND)
+    # 流式模式需要进程内读取器解码内存中的嵌套压缩包
+    stream_reader = None
+    if options.stream:
+        try:
+            stream_reader = get_stream_reader()
+        except RuntimeError as e:
+            print(f"⚠️ {e}，流式模式不可用，改为落盘解压")
+    root_dir_abs = os.path.abspath(root_dir)
+    if not os.path.isdir(root_dir_abs):
         print(f"❌ 目录不存在: {root_dir}")
         return
-    
-    total_files = len(files_to_process)
-    print(f"\n📋 发现 {total_files} 个需要处理的文件")
-    
-    if total_files == 0:
-        print("❌ 未找到符合条件的文件（根目录下以NO开头的无扩展名文件）")
+    # 监视模式：处理完现有文件后继续等待新文件，收集到固定的 all_images 目录
+    watch = options.watch
+    # 候选密码：多于一个时按缓存与廉价探测为每个压缩包确定密码，确认的结果保存在目标目录下
+    password_book = PasswordBook([password] if isinstance(password, str) else password,
+                                 os.path.join(root_dir_abs, PASSWORD_CACHE_NAME))
+
+    def password_for_input(file_path):
+        """--plan 中读取头部使用的密码；全部候选都不正确时仍用第一个，由读取失败报告。"""
+        try:
+            return password_book.resolve(functools.partial(extractor.probe_password, file_path),
+                                         source=source_key(file_path, root_dir_abs), label=os.path.basename(file_path))
+        except WrongPasswordError:
+            return password_book.candidates[0]
+
+    # 台账：按内容指纹跳过已完成/重复的输入，续做上次未完成的输入
+    ledger = None
+    run_lock = None
+    skipped_done = 0
+    skipped_duplicate = 0
+    seen_fingerprints = set()
+    if not options.no_ledger:
+        ledger = Ledger(root_dir_abs)
+
+    # 本次已送入处理的路径及其 (大小, 修改时间)：监视器在初始扫描前启动，扫描期间到达的文件可能被两边同时发现
+    admitted_paths = {}
+
+    def admit(file_path):
+        """台账检查：返回 (是否处理, 内容指纹)；已完成或与本次其他输入重复的跳过。"""
+        nonlocal skipped_done, skipped_duplicate
+        try:
+            st = os.stat(file_path)
+            stat_key = (st.st_size, st.st_mtime_ns)
+        except OSError:
+            stat_key = None
+        if stat_key is not None and admitted_paths.get(file_path) == stat_key:
+            skipped_duplicate += 1
+            return False, None
+        admitted_paths[file_path] = stat_key
+        if ledger is None:
+            return True, None
+        try:
+            fingerprint = sample_fingerprint(file_path)
+        except OSError:
+            return True, None
+        if fingerprint in seen_fingerprints:
+            skipped_duplicate += 1
+            return False, fingerprint
+        if ledger.stage(fingerprint) == STAGE_DONE:
+            skipped_done += 1
+            return False, fingerprint
+        seen_fingerprints.add(fingerprint)
+        return True, fingerprint
+
+    def admitted_inputs():
+        for file_path, filename in iter_inputs(root_dir_abs, recursive=options.recursive, match=options.match):
+            ok, fingerprint = admit(file_path)
+            if ok:
+                yield file_path, filename, fingerprint
+
+    # 流式发现输入：先找到第一个需要处理的输入，其余的在线程池启动后边扫描边提交
+    pending_inputs = admitted_inputs()
+    plan_cache = MetadataCache(root_dir_abs)
+    if options.plan:
+        run_plan(extractor, [item[:2] for item in pending_inputs], password_for_input, plan_cache, options)
+        password_book.flush()
+        return
+    if ledger is not None:
+        # 运行锁：同一目录同时只允许一个运行；持有锁后才清理上次中断留下的暂存目录
+        run_lock = RunLock(root_dir_abs)
+        if run_lock.acquire():
+            removed = cleanup_orphaned_staging(ledger)
+            if removed:
+                print(f"🧹 清理上次中断遗留的暂存目录: {removed} 个")
+        elif run_lock.owner is not None:
+            print(f"❌ 另一个运行（PID {run_lock.owner}）正在处理该目录，请等待其结束后再运行")
+            return
+        else:
+            print("⚠️ 未能获取运行锁，跳过遗留暂存目录的清理")
+    # 监视器在初始扫描之前启动：已存在的文件交给扫描，扫描期间才到达（或仍在写入）的文件由监视器报告
+    watcher = make_inbox_watcher(root_dir_abs, options.match, options.recursive) if watch else None
+    if len(plan_cache):
+        # 此前运行过 --plan（缓存只由 --plan 写入）时先完成扫描，按预计工作量从大到小提交，大任务先开始以缩短整体耗时
+        pending_inputs = iter(sorted(pending_inputs, key=lambda item: -planned_work(plan_cache, item[0])[0]))
+    first_input = next(pending_inputs, None)
+    if first_input is None and not watch:
+        if skipped_done or skipped_duplicate:
+            print(f"⏭️ 跳过 {skipped_done} 个已完成的输入，{skipped_duplicate} 个内容重复的输入")
+            print("✅ 所有输入均已处理完成，无需重复解压")
+        elif options.match == 'magic':
+            print("❌ 未找到符合条件的文件（带压缩包文件头的文件）")
+        else:
+            print("❌ 未找到符合条件的文件（根目录下以NO开头的无扩展名文件）")
+        if run_lock is not None:
+            run_lock.release()
         return
     
-    # 只有在有文件需要处理时才创建 all_images 目录，并在目录名后追加时间戳
-    all_images_dir = make_timestamped_dir(os.path.join(root_dir, 'all_images'))
+    # 只有在有文件需要处理时才创建 all_images 目录，并在目录名后追加时间戳；监视模式使用固定目录
+    if watch:
+        all_images_dir = os.path.join(root_dir_abs, 'all_images')
+    else:
+        all_images_dir = make_timestamped_dir(os.path.join(root_dir, 'all_images'))
     if not os.path.exists(all_images_dir):
         os.makedirs(all_images_dir)
         print(f"📁 创建图片收集目录: {all_images_dir}")
+
+    # 暂存目录：指定 --scratch 时放在其中（例如 tmpfs 或本地 SSD），否则尽量与收集目录位于同一文件系统，
+    # 使最后移入 all_images 的一步只是重命名
+    scratch_dir = None
+    if options.scratch:
+        import tempfile
+        os.makedirs(options.scratch, exist_ok=True)
+        scratch_dir = tempfile.mkdtemp(prefix=SCRATCH_PREFIX, dir=options.scratch)
+        print(f"🗂️ 暂存目录: {scratch_dir}")
+        if not same_filesystem(scratch_dir, all_images_dir):
+            print("⚠️ 暂存目录与收集目录不在同一文件系统，收集时每个文件都需要复制一次；"
+                  "如需避免，请把 --scratch 放在收集目录所在的磁盘上")
     
     to_delete = []
     processed = 0
@@ -306,118 +550,623 @@ def batch_extract_console(root_dir, password, use_gui=False, qt_app=None):
     created_qt_app = False
     global progress_state
     if use_gui:
-        # 初始化进度状态，主线程会轮询它以显示 GUI
-        progress_state = {'value': 0, 'total': max(1, total_files), 'text': '', 'done': False}
+        # 初始化进度状态：无 GUI 的调用方可以轮询它，Qt 窗口通过 qt_app.publish() 接收推送
+        progress_state = {'value': 0, 'total': 1000, 'text': '', 'done': False}
         if not QT_AVAILABLE:
             print("⚠️ 未安装或无法使用 PyQt5，回退到控制台进度")
     
     import concurrent.futures
     import threading
     import time
-    import sys as _sys
     cpu_count = os.cpu_count() or 4
-    task_states = []  # [{id, filename, status, progress, total, msg}]
+    task_states = []  # [{id, filename, status, progress, total, nested, msg, bytes_done, bytes_total, started, planned, planned_known}]
     state_lock = threading.Lock()
 
-    # 初始化任务状态
-    for idx, (file_path, filename) in enumerate(files_to_process):
-        task_states.append({'id': idx, 'filename': filename, 'status': '等待', 'progress': 0, 'total': 1, 'msg': ''})
+    # 每个外层输入的指纹与续做信息（与 task_states 按序号对应）
+    root_fingerprints = []
+    resume_done = []
+    resumed_nested = 0
 
-    def extract_task(args):
-        idx, (file_path, filename) = args
-        out_dir = file_path + '_extracted'
-        # 更新状态为进行中
+    def add_input(file_path, filename, fingerprint):
+        """登记一个外层输入的任务状态，返回其序号。"""
+        # 预计工作量（字节）：有预扫描缓存时为解压后大小，否则以输入文件大小近似
+        planned, planned_known = planned_work(plan_cache, file_path)
         with state_lock:
-            task_states[idx]['status'] = '解压中'
-            task_states[idx]['progress'] = 0
-            task_states[idx]['total'] = 1
-            task_states[idx]['msg'] = ''
-        # 实际解压
-        result = extract_7z_with_7zexe(file_path, out_dir, password)
-        # 处理子文件
-        sub_count = 0
-        sub_done = 0
-        if result:
+            idx = len(task_states)
+            task_states.append({'id': idx, 'filename': filename, 'status': '等待', 'progress': 0, 'total': 1, 'nested': 0, 'msg': '',
+                                'failed_nested': 0, 'bytes_done': 0, 'bytes_total': 0, 'started': None,
+                                'planned': planned, 'planned_known': planned_known})
+            root_fingerprints.append(fingerprint)
+            # 续做：上次运行中已完成收集的嵌套压缩包
+            resume_done.append(ledger.nested_done(fingerprint) if ledger is not None and fingerprint else set())
+        return idx
+
+    # CPU 密集阶段（哈希）的进程池，与解压线程池分开；第一次需要计算哈希时才启动
+    cpu_pool = CpuPool(default_workers(cpu_count) if options.cpu_workers is None else options.cpu_workers)
+    # 整批共享的去重索引：目标文件的哈希只计算一次
+    dedup_index = DedupIndex(pool=cpu_pool)
+    # 各阶段（外层解压、嵌套解压、收集、清理）的累计耗时
+    phase_stats = PhaseStats()
+    # 可选的跨运行图片库索引
+    library = None
+    if options.library:
+        try:
+            library = ImageLibrary(options.library, link=options.library_link)
+            print(f"📚 图片库索引: {library.db_path}")
+        except Exception as e:
+            print(f"⚠️ 无法打开图片库索引 {options.library}: {e}")
+
+    # 可选的图片清单：随收集增量写出，与收集目录放在一起
+    catalog = None
+    if options.catalog:
+        catalog_path = f"{all_images_dir}_catalog.{options.catalog}"
+        try:
+            catalog = ImageCatalog(catalog_path, all_images_dir, options.catalog, dedup_index)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 无法创建图片清单 {catalog_path}: {e}")
+
+    # 并发调节器：限制同时运行的 7z 进程数与每个进程的 -mmt，未固定的参数按系统负载自动调节
+    governor = ConcurrencyGovernor(cpu_count, jobs=options.jobs, mmt=options.mmt)
+
+    # 图片校验（--validate）：收集前检查结构，损坏的图片移到收集目录旁的隔离目录
+    quarantine_dir = all_images_dir + QUARANTINE_SUFFIX
+    validated = 0
+    quarantined = 0
+
+    def validate_staged(node):
+        nonlocal validated, quarantined
+        label = task_label(node)
+        with phase_stats.measure('validate', task=label):
+            checked, failures = validate_tree(node.staging_dir, cpu_pool)
+        logs = []
+        moved = 0
+        for path, reason in failures:
+            rel = os.path.relpath(path, node.staging_dir)
             try:
-                subfiles = [subfile for subfile in os.listdir(out_dir) if os.path.isfile(os.path.join(out_dir, subfile)) or os.path.isdir(os.path.join(out_dir, subfile))]
-                sub_count = len(subfiles)
-                for subfile in subfiles:
-                    subfile_path = os.path.join(out_dir, subfile)
-                    sub_name, sub_ext = os.path.splitext(subfile)
-                    if sub_ext == '.7zz' or sub_ext == '' or subfile.lower().endswith('.7zz'):
-                        sub_out_dir = subfile_path + '_extracted'
-                        with state_lock:
-                            task_states[idx]['status'] = '二次解压'
-                            task_states[idx]['total'] = sub_count
-                            task_states[idx]['progress'] = sub_done
-                            task_states[idx]['msg'] = f"{subfile}"
-                        # 只有二次解压成功才移动
-                        if extract_7z_with_7zexe(subfile_path, sub_out_dir, password):
-                            logs = move_images_console(sub_out_dir, all_images_dir, collect_logs=True)
-                            if logs:
-                                with state_lock:
-                                    move_logs.extend(logs)
-                        else:
-                            with state_lock:
-                                move_logs.append(f"    ⚠️ 二次解压失败，未移动: {sub_out_dir}")
-                        sub_done += 1
-                        with state_lock:
-                            task_states[idx]['progress'] = sub_done
-                # 仅移动二次解压生成的目录，第一次解压的产物直接清理
-                # 清理 out_dir
-                force_remove_directory(out_dir)
-                with state_lock:
-                    task_states[idx]['status'] = '完成'
-                    task_states[idx]['progress'] = sub_count
-                    task_states[idx]['msg'] = '全部完成'
-            except Exception as e:
-                with state_lock:
-                    task_states[idx]['status'] = '错误'
-                    task_states[idx]['msg'] = f"处理子文件时出错: {e}"
+                quarantine(path, node.staging_dir, quarantine_dir, label)
+            except OSError as e:
+                logs.append(f"    ⚠️ 无法隔离损坏的图片 {label}/{rel}: {e}")
+                continue
+            moved += 1
+            logs.append(f"    🩹 隔离损坏的图片: {label}/{rel}（{reason}）")
+        with state_lock:
+            validated += checked
+            quarantined += moved
+            move_logs.extend(logs)
+
+    # 嵌套深度上限（外层输入为 0，默认只解压一层嵌套）
+    max_depth = max(1, options.max_depth)
+
+    # 直接放置模式：每个任务在收集目录内使用隐藏的槽目录，与最终位置同盘，提交只是重命名
+    commit_lock = threading.Lock()
+
+    def staging_dir_for(idx, file_path):
+        if scratch_dir:
+            return os.path.join(scratch_dir, f"{idx}_{os.path.basename(file_path)}_extracted")
+        # 输入与收集目录不在同一文件系统（例如递归扫描进了其他挂载点）时，改用收集目录内的任务槽
+        if options.direct or not same_filesystem(os.path.dirname(file_path), all_images_dir):
+            return os.path.join(all_images_dir, f"{SLOT_PREFIX}{idx}")
+        return file_path + '_extracted'
+
+    def collect_extracted(sub_out_dir, source):
+        callbacks = []
+        if library is not None:
+            # 已收集过的内容在移动前跳过/硬链接，新内容在移动后以最终路径入库
+            pending = library.screen(sub_out_dir, source, dedup_index)
+            callbacks.append(functools.partial(library.commit_moved, pending))
+        if catalog is not None:
+            callbacks.append(functools.partial(catalog.on_moved, source))
+        on_moved = None
+        if callbacks:
+            def on_moved(src, dst):
+                for callback in callbacks:
+                    callback(src, dst)
+        if options.direct:
+            return commit_staged_dir(sub_out_dir, all_images_dir, commit_lock, dedup_index, on_moved)
+        return move_images_console(sub_out_dir, all_images_dir, collect_logs=True, dedup_index=dedup_index, on_moved=on_moved)
+
+    def byte_progress(idx):
+        """为一次解压创建 progress 回调：把该 7z 进程的字节进度累加到所属外层任务。"""
+        seen = {'done': 0, 'total': 0}
+
+        def report(done, total):
+            with state_lock:
+                state = task_states[idx]
+                if state['started'] is None:
+                    state['started'] = time.time()
+                state['bytes_total'] += total - seen['total']
+                state['bytes_done'] += done - seen['done']
+                seen['done'], seen['total'] = done, total
+        return report
+
+    def archive_size(path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def task_label(node):
+        """追踪中的任务名：外层输入为文件名，嵌套压缩包为“外层文件名/成员名”。"""
+        if node.depth == 0:
+            return node.name
+        return f"{task_states[node.root_idx]['filename']}/{node.name}"
+
+    log_dir = os.path.abspath(options.log_dir) if options.log_dir else None
+
+    def log_path(node):
+        """--log-dir：任务的日志文件，外层输入与每个嵌套压缩包各一个；未指定时为 None。"""
+        if log_dir is None:
+            return None
+        return os.path.join(log_dir, log_file_name(task_label(node)))
+
+    def fingerprint_of(path=None, data=None):
+        try:
+            return bytes_fingerprint(data) if data is not None else sample_fingerprint(path)
+        except OSError:
+            return None
+
+    def password_source(node):
+        """密码缓存的来源键：外层输入为所在目录 + 文件名前缀，嵌套压缩包在外层的来源后追加自身的前缀。"""
+        if node.depth == 0:
+            return source_key(node.path, root_dir_abs)
+        return f"{password_source(node.parent)}>{source_prefix(node.name)}"
+
+    def password_for(node):
+        """节点使用的密码：只有一个候选时直接使用；否则在首次需要时确定。
+
+        外层输入经探测确定，全部候选都被拒绝时抛出 WrongPasswordError；嵌套压缩包不探测，
+        直接沿用缓存的密码或外层的密码，解压失败后才由 retry_password 探测。"""
+        if node.password is None:
+            if node.depth > 0:
+                node.password = password_book.guess(fingerprint=node.fingerprint, source=password_source(node),
+                                                    hint=node.parent.password)
+            else:
+                node.password = password_book.resolve(functools.partial(extractor.probe_password, node.path),
+                                                      fingerprint=node.fingerprint, source=password_source(node),
+                                                      label=task_label(node))
+        return node.password
+
+    def retry_password(node, tried, data=None):
+        """嵌套压缩包用沿用的密码解压失败后：先探测该密码确认是否为密码错误，是则探测其余候选。
+
+        返回需要重试的新密码；失败与密码无关、或全部候选都不正确时返回 None。"""
+        if not password_book.multiple:
+            return None
+        if data is not None:
+            probe = lambda pw: stream_reader.probe_password(io.BytesIO(data), pw)
         else:
+            probe = functools.partial(extractor.probe_password, node.path)
+        try:
+            password = password_book.resolve(probe, fingerprint=node.fingerprint, source=password_source(node),
+                                             hint=tried, label=task_label(node))
+        except WrongPasswordError:
+            return None
+        if password == tried:
+            return None
+        node.password = password
+        return password
+
+    def spawn_nested(node, spawn, name, path=None, staging_dir=None, data=None, prepared=None):
+        """登记一个嵌套压缩包为子任务；被深度/循环保护拒绝时记录日志。
+
+        prepared: 已由批量解压得到的输出目录，子任务只需把它移到自己的解压目录。"""
+        nonlocal resumed_nested
+        idx = node.root_idx
+        if node.depth == 0 and name in resume_done[idx]:
+            with state_lock:
+                resumed_nested += 1
+            return False
+        child = ArchiveNode(path, staging_dir or path + '_extracted', idx, name, depth=node.depth + 1,
+                            parent=node, data=data, fingerprint=fingerprint_of(path, data))
+        child.prepared = prepared
+        if prepared is not None:
+            # 批量解压成功说明外层的密码同样适用
+            child.password = node.password
+        if spawn(child):
             with state_lock:
+                task_states[idx]['nested'] += 1
+                task_states[idx]['total'] = task_states[idx]['nested']
+                task_states[idx]['status'] = '二次解压'
+            return True
+        if child.depth > max_depth:
+            reason = f"超过最大嵌套深度 {max_depth}"
+        else:
+            reason = "检测到循环嵌套"
+        with state_lock:
+            move_logs.append(f"    ⚠️ {reason}，已跳过: {task_states[idx]['filename']}/{name}")
+        return False
+
+    def stream_outer(node, spawn):
+        """流式处理外层压缩包：嵌套压缩包经 -so 管道读入内存，作为携带数据的子任务解压。
+
+        返回 False 表示需要回退到落盘解压（例如成员超过内存上限）。"""
+        with governor.slot():
+            members = extractor.list_members(node.path, node.password)
+        if members is None:
+            node.ok = False
+            return True
+        # 与落盘模式一致：只处理根层级的成员，其余第一次解压的产物本来就会被清理；
+        # 按名称匹配时只读取 .7zz / 无扩展名成员，--match magic 时读取全部根层级成员，按文件头确认
+        nested = [m for m in members
+                  if not m['is_dir'] and '/' not in m['path'].replace('\\', '/')
+                  and (options.match == 'magic' or is_nested_archive_name(m['path']))]
+        # 单个成员超过内存上限时整体回退到落盘模式
+        if any(m['size'] > STREAM_MEMORY_LIMIT for m in nested):
+            return False
+        # 字节进度与落盘模式一致按压缩包大小折算：以已读入内存的成员字节占所选成员总字节的比例计算
+        size = archive_size(node.path)
+        selected = sum(m['size'] for m in nested)
+        report = byte_progress(node.root_idx)
+        report(0, size)
+        consumed = 0
+        with governor.slot() as threads, phase_stats.measure('extract', size, task_label(node)):
+            for member, data in extractor.iter_members(node.path, nested, node.password, threads=threads, log=log_path(node)):
+                consumed += member['size']
+                report(size * consumed // selected if selected else size, size)
+                subfile = member['path']
+                if not is_nested_archive(subfile, head=data[:SNIFF_SIZE], match=options.match):
+                    del data
+                    continue
+                spawn_nested(node, spawn, subfile, staging_dir=os.path.join(node.staging_dir, subfile + '_extracted'), data=data)
+                del data
+        report(size, size)
+        return True
+
+    # 批量解压（--batch）：较小的嵌套压缩包按组交给同一个 7z 进程，省去每个压缩包的进程创建开销
+    batch_size = options.batch if extractor.supports_batch and stream_reader is None else 0
+    batch_calls = 0
+    batch_archives = 0
+    batch_retried = 0
+
+    def batch_extract_nested(node, nested):
+        """在外层任务中批量解压嵌套压缩包，返回 {压缩包路径: 输出目录}。
+
+        只处理不超过 BATCH_MAX_BYTES 的压缩包；每组内输出目录名互不相同。
+        7z 输出中没有确认成功的压缩包不在结果中，由各自的子任务单独解压，错误仍记在对应的文件上。"""
+        nonlocal batch_calls, batch_archives, batch_retried
+        idx = node.root_idx
+        groups = []
+        for subfile, subfile_path in nested:
+            if subfile in resume_done[idx] or archive_size(subfile_path) > BATCH_MAX_BYTES:
+                continue
+            out_name = batch_output_name(subfile_path)
+            for group in groups:
+                if len(group) < batch_size and out_name not in group:
+                    group[out_name] = subfile_path
+                    break
+            else:
+                groups.append({out_name: subfile_path})
+        prepared = {}
+        for k, group in enumerate(groups):
+            if len(group) < 2:
+                continue
+            paths = list(group.values())
+            out_root = os.path.join(node.staging_dir, f"{BATCH_DIR_PREFIX}{k}")
+            nbytes = sum(archive_size(path) for path in paths)
+            with governor.slot() as threads, phase_stats.measure('nested', nbytes, f"{task_label(node)} 批量 {len(paths)} 个"):
+                done = extractor.extract_batch(paths, out_root, password_for(node), threads=threads, log=log_path(node))
+            prepared.update(done)
+            with state_lock:
+                batch_calls += 1
+                batch_archives += len(done)
+                batch_retried += len(paths) - len(done)
+        return prepared
+
+    def extract_task(node, spawn):
+        """处理调度树中的一个压缩包节点：解压、登记嵌套压缩包为子任务、收集内容。"""
+        idx = node.root_idx
+        filename = task_states[idx]['filename']
+        if node.depth == 0:
+            # 更新状态为进行中
+            with state_lock:
+                task_states[idx]['status'] = '解压中'
+                task_states[idx]['progress'] = 0
+                task_states[idx]['total'] = 1
+                task_states[idx]['nested'] = 0
+                task_states[idx]['failed_nested'] = 0
+                task_states[idx]['msg'] = ''
+            if ledger is not None and node.fingerprint:
+                ledger.start(node.fingerprint, filename, staging=node.staging_dir)
+            try:
+                password = password_for(node)
+            except WrongPasswordError as e:
+                print(f"解压失败（密码错误）: {filename}, {e}")
+                node.ok = False
+                return
+            if stream_reader is not None and stream_outer(node, spawn):
+                return
+            # 实际解压（受并发调节器限制同时运行的 7z 进程数）
+            with governor.slot() as threads, phase_stats.measure('extract', archive_size(node.path), task_label(node)):
+                ok = extractor.extract(node.path, node.staging_dir, password, threads=threads, progress=byte_progress(idx),
+                                       log=log_path(node))
+            if not ok:
+                node.ok = False
+                return
+            # 外层产物中的 .7zz / 无扩展名条目作为子任务进入共享队列；其余产物在节点完成时随目录清理
+            nested = []
+            for subfile in os.listdir(node.staging_dir):
+                subfile_path = os.path.join(node.staging_dir, subfile)
+                if is_nested_archive(subfile, path=subfile_path, match=options.match):
+                    nested.append((subfile, subfile_path))
+            prepared = batch_extract_nested(node, nested) if batch_size > 1 else {}
+            for subfile, subfile_path in nested:
+                spawn_nested(node, spawn, subfile, path=subfile_path, prepared=prepared.get(subfile_path))
+            return
+
+        with state_lock:
+            task_states[idx]['msg'] = node.name
+        password = password_for(node)
+        if node.prepared is not None:
+            # 已在父任务的批量解压中完成，只需移到本节点的解压目录（同一文件系统内重命名）
+            try:
+                os.replace(node.prepared, node.staging_dir)
+                ok = True
+            except OSError:
+                with governor.slot() as threads, phase_stats.measure('nested', archive_size(node.path), task_label(node)):
+                    ok = extractor.extract(node.path, node.staging_dir, password, threads=threads, log=log_path(node))
+            size = archive_size(node.path)
+            byte_progress(idx)(size, size)
+        else:
+            data, node.data = node.data, None
+            report = byte_progress(idx)
+
+            def extract_with(password):
+                if data is not None:
+                    with phase_stats.measure('nested', len(data), task_label(node)):
+                        return stream_reader.extract_fileobj(io.BytesIO(data), node.staging_dir, password, name=node.name)
+                with governor.slot() as threads, phase_stats.measure('nested', archive_size(node.path), task_label(node)):
+                    return extractor.extract(node.path, node.staging_dir, password, threads=threads, progress=report,
+                                             log=log_path(node))
+
+            ok = extract_with(password)
+            if not ok:
+                # 沿用的密码可能不适用于这个嵌套压缩包：确认是密码错误后换用探测到的密码重试一次
+                retry = retry_password(node, password, data)
+                if retry is not None:
+                    if os.path.exists(node.staging_dir):
+                        force_remove_directory(node.staging_dir)
+                    ok = extract_with(retry)
+            if data is not None:
+                report(len(data), len(data))
+        # 只有二次解压成功才移动
+        if not ok:
+            node.ok = False
+            with state_lock:
+                move_logs.append(f"    ⚠️ 二次解压失败，未移动: {node.staging_dir}")
+            return
+        # 更深层的嵌套：与外层使用同一判断（.7zz、带文件头的无扩展名条目，--match magic 时任意压缩包），
+        # 先把它们移出内容目录，作为子任务处理，其余内容照常收集
+        if node.depth < max_depth:
+            nested_dir = node.staging_dir + '_nested'
+            for root, dirs, files in os.walk(node.staging_dir):
+                for fname in files:
+                    src = os.path.join(root, fname)
+                    if is_nested_archive(fname, path=src, match=options.match):
+                        if not os.path.exists(nested_dir):
+                            os.makedirs(nested_dir)
+                        rel = os.path.relpath(src, node.staging_dir)
+                        dst = os.path.join(nested_dir, rel.replace(os.sep, '_'))
+                        os.replace(src, dst)
+                        spawn_nested(node, spawn, f"{node.name}/{rel}", path=dst)
+        if options.validate:
+            validate_staged(node)
+        with phase_stats.measure('move', task=task_label(node)):
+            logs = collect_extracted(node.staging_dir, f"{filename}/{node.name}")
+        if logs:
+            with state_lock:
+                move_logs.extend(logs)
+
+    def estimate_reserve_bytes(node):
+        """外层任务需要预留的磁盘空间的廉价估算：有 --plan 的缓存时直接使用，否则按压缩大小的固定倍数估算。"""
+        info = plan_cache.get(node.path)
+        if info is not None:
+            return info['unpacked'] + info['nested_bytes']
+        return int(os.path.getsize(node.path) * RESERVE_EXPANSION)
+
+    def reserve_bytes(node):
+        """准确的预留空间：头部记录的解压后大小，加上嵌套压缩包再解压的大小（按其压缩大小近似）。
+        只在估算值放不下时由准入线程调用；结果不写入预扫描缓存（缓存只由 --plan 维护）。"""
+        info = plan_cache.get(node.path)
+        if info is None:
+            try:
+                members = extractor.list_members(node.path, password_for(node))
+            except WrongPasswordError:
+                members = None
+            if members is None:
+                # 读不到头部（损坏或密码错误）时解压多半也会失败，只按输入大小预留
+                return os.path.getsize(node.path)
+            info = summarize_members(members, is_nested_archive_name)
+        return info['unpacked'] + info['nested_bytes']
+
+    def wait_for_space(idx, nbytes):
+        with state_lock:
+            task_states[idx]['status'] = '等待空间'
+            task_states[idx]['msg'] = f"需要 {format_bytes(nbytes)}，等待其他任务释放"
+
+    def on_node_finished(node):
+        """节点及其全部子任务完成：清理该节点拥有的解压目录，并更新外层任务状态。"""
+        idx = node.root_idx
+        owned = node.staging_dir if node.depth == 0 else node.staging_dir + '_nested'
+        if os.path.exists(owned):
+            with phase_stats.measure('cleanup', task=task_label(node)):
+                force_remove_directory(owned)
+        if node.depth > 0:
+            with state_lock:
+                task_states[idx]['progress'] += 1
+                if not node.ok or node.error is not None:
+                    task_states[idx]['failed_nested'] += 1
+            if node.depth == 1 and node.ok and node.error is None and ledger is not None and root_fingerprints[idx]:
+                ledger.mark_nested(root_fingerprints[idx], node.name)
+            return
+        with state_lock:
+            failed_nested = task_states[idx]['failed_nested']
+        if ledger is not None and node.fingerprint:
+            # 有嵌套压缩包失败时记为失败：下次运行重试，已完成的嵌套压缩包按台账跳过
+            ledger.finish(node.fingerprint, node.ok and node.error is None and not failed_nested)
+        with state_lock:
+            if isinstance(node.error, DiskSpaceError):
+                task_states[idx]['status'] = '失败'
+                task_states[idx]['msg'] = f"磁盘空间不足: {node.error}"
+            elif node.error is not None:
+                task_states[idx]['status'] = '错误'
+                task_states[idx]['msg'] = f"处理子文件时出错: {node.error}"
+            elif not node.ok:
                 task_states[idx]['status'] = '失败'
                 task_states[idx]['msg'] = '解压失败'
-        return result
+            elif failed_nested:
+                task_states[idx]['status'] = '失败'
+                task_states[idx]['msg'] = f"{failed_nested} 个嵌套压缩包解压失败（下次运行将重试）"
+            else:
+                task_states[idx]['status'] = '完成'
+                task_states[idx]['progress'] = task_states[idx]['total']
+                task_states[idx]['msg'] = '全部完成'
 
-    def render_all_progress():
+    def progress_snapshot(rows):
+        """生成一帧进度：汇总行 + 任务行。任务数不超过 rows 时全部显示，否则只显示最活跃的 rows 个
+        （按当前速率排序，其后是失败的任务）。锁内只做计数与挑选，格式化在锁外进行。"""
+        now = time.time()
+        counts = {}
+        rate = 0.0
+        active = []
+        failed = []
         with state_lock:
-            lines = []
+            total = len(task_states)
+            show_all = total <= rows
             for t in task_states:
-                bar = print_progress_bar(t['progress'], t['total'], 30)
-                # 每行末尾加\033[K，清除行尾残留
-                lines.append(f"{t['filename'][:30]:<30} {bar} [{t['status']}] {t['msg']}\033[K")
-            return lines
+                status = t['status']
+                counts[status] = counts.get(status, 0) + 1
+                task_rate = 0.0
+                if t['started'] and status not in ('完成', '失败', '错误'):
+                    task_rate = t['bytes_done'] / max(now - t['started'], 1e-3)
+                    rate += task_rate
+                if show_all:
+                    active.append((0, dict(t)))
+                elif status in ('失败', '错误'):
+                    failed.append(t)
+                elif status not in ('完成', '等待'):
+                    active.append((task_rate, dict(t)))
+            failed = [dict(t) for t in failed[-rows:]]
+        if not show_all:
+            active.sort(key=lambda item: -item[0])
+        shown = [t for _rate, t in active[:rows]]
+        shown += failed[:max(0, rows - len(shown))]
+        finished = counts.get('完成', 0)
+        errors = counts.get('失败', 0) + counts.get('错误', 0)
+        waiting = counts.get('等待', 0) + counts.get('等待空间', 0)
+        running = total - finished - errors - waiting
+        lines = [f"批量解压进度：共 {total} 个 | 完成 {finished} | 失败 {errors} | 进行中 {running} | 等待 {waiting}"
+                 f" | {format_bytes(rate)}/s"]
+        lines.extend(format_task_line(t) for t in shown)
+        if total > len(shown):
+            lines.append(f"… 另有 {total - len(shown)} 个任务未显示")
+        return lines
+
+    gui_rows_sent = {}
 
+    def update_gui_progress():
+        """把整体进度与实时速率写入 progress_state，供 GUI 主线程轮询显示。
+
+        各任务按预计工作量（字节）加权；进度条仍使用千分比（QProgressBar 的范围是 32 位整数），
+        实际字节数写入 bytes_done / bytes_total。"""
+        now = time.time()
+        table = qt_app is not None and qt_app.show_table
+        rows = []
+        with state_lock:
+            done_bytes = 0.0
+            total_bytes = 0
+            rate = 0.0
+            active = []
+            for t in task_states:
+                if table:
+                    percent = t['progress'] * 100 // t['total'] if t['total'] else 0
+                    rows.append((t['filename'], t['status'], percent, t['msg']))
+                weight = max(1, t['planned'])
+                total_bytes += weight
+                if t['status'] in ('完成', '失败', '错误'):
+                    done_bytes += weight
+                elif t['bytes_total']:
+                    done_bytes += weight * t['bytes_done'] / t['bytes_total']
+                    active.append(f"{t['filename']} {t['bytes_done'] * 100 // t['bytes_total']}%")
+                if t['started'] and t['status'] not in ('完成', '失败', '错误'):
+                    rate += t['bytes_done'] / max(now - t['started'], 1e-3)
+        progress_state['bytes_done'] = int(done_bytes)
+        progress_state['bytes_total'] = total_bytes
+        progress_state['value'] = int(1000 * done_bytes / max(1, total_bytes))
+        progress_state['total'] = 1000
+        progress_state['text'] = f"{progress_state['value'] / 10:.0f}% {format_bytes(rate)}/s"
+        progress_state['tasks'] = [f"{format_bytes(done_bytes)} / {format_bytes(total_bytes)}"] + active
+        if qt_app is not None:
+            # 任务表格只推送自上次以来变化的行
+            changes = {}
+            for row, values in enumerate(rows):
+                if gui_rows_sent.get(row) != values:
+                    changes[row] = gui_rows_sent[row] = values
+            qt_app.publish(progress_state['value'], progress_state['total'], progress_state['text'],
+                           detail=progress_state['tasks'], tasks=changes)
+
+    renderer = ConsoleRenderer(max_rows=options.top)
+    if options.trace:
+        tracing.start(options.trace)
     # 启动线程池
-    with concurrent.futures.ThreadPoolExecutor(max_workers=cpu_count) as executor:
-        futures = [executor.submit(extract_task, (idx, files_to_process[idx])) for idx in range(len(files_to_process))]
-        # 主线程定时刷新进度
-        progress_lines = len(task_states)  # 进度条行数（不含标题）
-        is_windows = os.name == 'nt'
-        # 首次输出标题和进度条
-        print("批量解压进度：")
-        for l in render_all_progress():
-            print(l)
-        _sys.stdout.flush()
-        while True:
-            all_done = all(f.done() for f in futures)
-            lines = render_all_progress()
-            if is_windows:
-                # Windows 终端降级：每次清屏重绘
-                os.system('cls')
-                print("批量解压进度：")
-                for l in lines:
-                    print(l)
-            else:
-                # 尝试用ANSI上移光标
-                print(f"\033[{progress_lines}F", end="")
-                for l in lines:
-                    print(l)
-            _sys.stdout.flush()
-            if all_done:
-                break
-            time.sleep(0.2)
+    run_started = time.time()
+    governor.start()
+    # 磁盘空间准入控制：暂存目录与收集目录位于同一文件系统，按其剩余空间预留
+    admission = None if options.no_space_check else SpaceAdmission(scratch_dir or all_images_dir)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(cpu_count, governor.max_jobs)) as executor:
+        # 所有层级的压缩包共用一个队列：外层输入先入队，嵌套压缩包在发现时入队
+        scheduler = NestedScheduler(executor, extract_task, on_node_finished, max_depth=max_depth, inline_limit=cpu_count,
+                                    admission=admission)
+
+        def submit_input(file_path, filename, fingerprint):
+            idx = add_input(file_path, filename, fingerprint)
+            node = ArchiveNode(file_path, staging_dir_for(idx, file_path), idx, filename,
+                               fingerprint=fingerprint or fingerprint_of(file_path))
+            scheduler.submit_root(node, size_fn=functools.partial(estimate_reserve_bytes, node),
+                                  exact_fn=functools.partial(reserve_bytes, node),
+                                  on_wait=functools.partial(wait_for_space, idx))
+
+        # 第一个输入立即开始解压，扫描继续进行
+        if first_input is not None:
+            submit_input(*first_input)
+            for item in pending_inputs:
+                submit_input(*item)
+        print(f"\n📋 发现 {len(task_states)} 个需要处理的文件")
+        if skipped_done or skipped_duplicate:
+            print(f"⏭️ 跳过 {skipped_done} 个已完成的输入，{skipped_duplicate} 个内容重复的输入")
+        if watch:
+            run_watch_loop(watcher, scheduler, admit, submit_input, task_states, state_lock, use_gui and update_gui_progress,
+                           match=options.match, stop_event=getattr(qt_app, 'stop_event', None))
+        else:
+            # 主线程定时刷新进度：只重写变化的行，任务行数受终端高度限制
+            while True:
+                all_done = scheduler.done()
+                renderer.refresh(progress_snapshot, force=all_done)
+                if use_gui:
+                    update_gui_progress()
+                if all_done:
+                    break
+                time.sleep(renderer.interval)
+    run_seconds = time.time() - run_started
+    governor.stop()
+    cpu_pool.close()
+    if admission is not None:
+        admission.close()
+    if scratch_dir and os.path.exists(scratch_dir):
+        force_remove_directory(scratch_dir)
+    if not watch:
+        # 记录本次实测的单进程吞吐，供之后 --plan 估算耗时
+        measured = sum(t['planned'] for t in task_states if t['status'] == '完成' and t['planned_known'])
+        plan_cache.record_throughput(measured, run_seconds, governor.jobs)
+    plan_cache.flush()
+    if ledger is not None:
+        ledger.flush()
+    if run_lock is not None:
+        run_lock.release()
+    password_book.flush()
+    if library is not None:
+        library.close()
+    if catalog is not None:
+        catalog.close()
     # 进度条结束后统一打印所有移动日志
     if move_logs:
         print("\n图片/文件收集日志：")
@@ -436,12 +1185,44 @@ def batch_extract_console(root_dir, password, use_gui=False, qt_app=None):
     print(f"  ├─ 📁 处理文件: {total} 个")
     print(f"  ├─ ✅ 成功: {finished} 个")
     print(f"  ├─ ❌ 失败: {failed} 个")
+    print(f"  ├─ 🔁 去重哈希: {dedup_index.hashed_files} 个文件 ({dedup_index.hashed_bytes / 1048576:.1f} MB)")
+    if skipped_done or skipped_duplicate or resumed_nested:
+        print(f"  ├─ ⏭️ 台账跳过: 已完成 {skipped_done} 个，重复 {skipped_duplicate} 个，续做时跳过嵌套包 {resumed_nested} 个")
+    print(f"  ├─ ⚙️ 并发: {governor.describe()}")
+    if cpu_pool.submitted or not cpu_pool.workers:
+        print(f"  ├─ 🧮 CPU 进程池: {cpu_pool.describe()}")
+    if renderer.frames:
+        print(f"  ├─ 🖥️ 进度刷新: {renderer.describe()}")
+    if phase_stats.describe():
+        print(f"  ├─ ⏱️ 阶段耗时: {phase_stats.describe()}")
+    if admission is not None and (admission.waited or admission.rejected):
+        print(f"  ├─ 💽 磁盘空间: 排队等待 {admission.waited} 个，空间不足失败 {admission.rejected} 个，"
+              f"峰值预留 {format_bytes(admission.peak_reserved)}")
+    if password_book.multiple:
+        print(f"  ├─ 🔑 密码: {password_book.describe()}")
+    if batch_calls:
+        print(f"  ├─ 📦 批量解压: {batch_calls} 次 7z 调用解压 {batch_archives} 个嵌套压缩包，单独重试 {batch_retried} 个")
+    if options.validate:
+        suffix = f" → {os.path.basename(quarantine_dir)}" if quarantined else ''
+        print(f"  ├─ 🩹 图片校验: 检查 {validated} 张，隔离损坏 {quarantined} 张{suffix}")
+    if log_dir is not None:
+        print(f"  ├─ 📝 7z 日志: {log_dir}")
+    if catalog is not None:
+        print(f"  ├─ 🗂️ 图片清单: {catalog.entries} 条 → {os.path.basename(catalog.path)}")
+    if library is not None:
+        print(f"  ├─ 📚 图片库: 新增 {library.added} 个，跳过 {library.skipped} 个，硬链接 {library.linked} 个")
     print(f"  └─ 📂 图片目录: {os.path.basename(all_images_dir)}")
     print("═" * 65)
+    tracer = tracing.stop()
+    if tracer is not None:
+        print(f"🔬 追踪文件: {tracer.path}（可在 chrome://tracing 或 ui.perfetto.dev 中打开）")
+        for line in tracer.summary_lines():
+            print(line)
+        print("═" * 65)
 
 
     # 处理完成后，如果我们在此函数内创建了 qt_app，退出事件循环
-    if use_gui and QT_AVAILABLE and created_qt_app and qt_app:
+    if use_gui and QtProgressApp is not None and created_qt_app and qt_app:
         try:
             # 关闭窗口并退出 Qt loop
             qt_app.win.close()
@@ -455,12 +1236,168 @@ def batch_extract_console(root_dir, password, use_gui=False, qt_app=None):
                 pass
         except Exception:
             pass
+    return {'all_images_dir': all_images_dir, 'total': total, 'finished': finished, 'failed': failed,
+            'seconds': run_seconds, 'phases': phase_stats.snapshot()}
+
+def run_plan(extractor, inputs, password_for, plan_cache, options):
+    """--plan：并行读取各输入的头部清单，打印解压量、成员数、嵌套情况与耗时估算，不做任何解压。"""
+    if not inputs:
+        print("❌ 未找到需要处理的输入")
+        return
+    jobs = ConcurrencyGovernor(jobs=options.jobs, mmt=options.mmt).jobs
+    workers = options.jobs or os.cpu_count() or 4
+    print(f"\n🔍 预扫描 {len(inputs)} 个输入（{workers} 路并行读取头部）…")
+    results = prescan(extractor, inputs, password_for, plan_cache, is_nested_archive_name, workers=workers)
+    ok = [(name, info) for _path, name, info in results if info is not None]
+    failed = [name for _path, name, info in results if info is None]
+    ok.sort(key=lambda item: -item[1]['unpacked'])
+    for name, info in ok[:PLAN_DETAIL_LIMIT]:
+        print(f"  {name:<30} 成员 {info['members']:>6} 个  解压后 {format_bytes(info['unpacked']):>10}"
+              f"  嵌套包 {info['nested']} 个 ({format_bytes(info['nested_bytes'])})")
+    if len(ok) > PLAN_DETAIL_LIMIT:
+        print(f"  … 另有 {len(ok) - PLAN_DETAIL_LIMIT} 个输入")
+    for name in failed:
+        print(f"  ⚠️ 无法读取头部（损坏或密码错误）: {name}")
+    members = sum(info['members'] for _name, info in ok)
+    unpacked = sum(info['unpacked'] for _name, info in ok)
+    nested = sum(info['nested'] for _name, info in ok)
+    nested_bytes = sum(info['nested_bytes'] for _name, info in ok)
+    # 嵌套压缩包会再解压一次，按其压缩大小近似计入工作量
+    seconds = estimate_seconds(unpacked + nested_bytes, plan_cache.throughput, jobs)
+    source = '实测' if plan_cache.throughput else '默认'
+    throughput = plan_cache.throughput or DEFAULT_THROUGHPUT
+    print("═" * 65)
+    print(f"📊 预扫描结果（缓存命中 {plan_cache.hits} 个）:")
+    print(f"  ├─ 📁 输入: {len(ok)} 个可读，{len(failed)} 个无法读取")
+    print(f"  ├─ 📄 成员: {members} 个，解压后共 {format_bytes(unpacked)}")
+    print(f"  ├─ 📦 嵌套压缩包: {nested} 个 ({format_bytes(nested_bytes)})")
+    print(f"  └─ ⏱️ 预计耗时: {format_duration(seconds)}"
+          f"（7z 进程 {jobs} 个 × {format_bytes(throughput)}/s，{source}吞吐）")
+    print("═" * 65)
+
+
+def make_inbox_watcher(root_dir, match='name', recursive=False):
+    """监视模式的收件监视器；recursive=True 时与发现阶段一致，同时监视子目录。"""
+    # 按签名匹配时文件名无法预先筛选，停止增长后再读取文件头判断
+    return InboxWatcher(root_dir, is_input_candidate if match == 'name' else (lambda name: not name.startswith('.')),
+                        recursive=recursive, skip_dir=skip_dir)
+
+
+def run_watch_loop(watcher, scheduler, admit, submit_input, task_states, state_lock, on_tick=None, match='name',
+                   stop_event=None):
+    """监视模式主循环：新文件停止增长后送入同一个线程池；按 Ctrl+C（或 GUI 的停止按钮设置 stop_event）
+    停止监视并等待已提交任务完成。watcher 由 make_inbox_watcher 在初始扫描之前创建，扫描期间到达的文件不会遗漏。
 
-def move_images_console(src_dir, dest_dir, collect_logs=False):
+    该模式下任务数不断增长，不再整屏重绘，而是逐行输出每个输入的最终状态。"""
+    import time
+    scope = '（含子目录）' if watcher.recursive else ''
+    print(f"👀 监视模式（{watcher.backend}）：等待新文件{scope}… 按 Ctrl+C 停止")
+    try:
+        while stop_event is None or not stop_event.is_set():
+            for file_path, filename in watcher.poll():
+                if match != 'name' and not input_matches(file_path, filename, match):
+                    continue
+                ok, fingerprint = admit(file_path)
+                if ok:
+                    print(f"📥 新文件: {filename}")
+                    submit_input(file_path, filename, fingerprint)
+                else:
+                    print(f"⏭️ 已处理过相同内容，跳过: {filename}")
+            _report_finished(task_states, state_lock)
+            if on_tick:
+                on_tick()
+            time.sleep(0.2)
+        print("\n⏹️ 停止监视，等待已提交的任务完成…")
+    except KeyboardInterrupt:
+        print("\n⏹️ 停止监视，等待已提交的任务完成…")
+    finally:
+        watcher.close()
+    while not scheduler.wait(0.2):
+        _report_finished(task_states, state_lock)
+    _report_finished(task_states, state_lock)
+
+
+def _report_finished(task_states, state_lock):
+    """逐行打印新进入最终状态（且尚未打印过）的任务。"""
+    with state_lock:
+        finished = [t for t in task_states if t['status'] in ('完成', '失败', '错误') and not t.get('reported')]
+        for t in finished:
+            t['reported'] = True
+    for t in finished:
+        icon = '✅' if t['status'] == '完成' else '❌'
+        print(f"{icon} {t['filename']} [{t['status']}] {t['msg']}")
+
+
+def cleanup_orphaned_staging(ledger):
+    """删除中断的运行遗留的暂存目录：台账中仍为进行中、所属进程已退出的输入记录的解压目录
+    （包括 --recursive 找到的子目录中的输入）。只删除名称符合暂存目录约定的路径。返回删除数量。"""
+    removed = 0
+    for fingerprint, staging in ledger.orphaned_staging():
+        name = os.path.basename(staging.rstrip('/\\'))
+        if not (name.endswith('_extracted') or name.startswith(SLOT_PREFIX)):
+            ledger.forget_staging(fingerprint)
+            continue
+        for target in (staging, staging + '_nested'):
+            if not os.path.isdir(target):
+                continue
+            try:
+                force_remove_directory(target)
+                removed += 1
+            except Exception as e:
+                print(f"⚠️ 无法清理暂存目录 {target}: {e}")
+        ledger.forget_staging(fingerprint)
+    return removed
+
+
+def commit_staged_dir(src_dir, dest_dir, commit_lock, dedup_index=None, on_moved=None):
+    """直接放置模式的提交：把槽目录的顶层条目以 os.rename 原子地放入 dest_dir。
+
+    槽目录位于 dest_dir 内（同一文件系统），不冲突的条目只需一次重命名；
+    与已有条目重名的少数情况交给 move_images_console 做合并。返回日志列表。
+    on_moved 回调（入库、编目、哈希）在释放提交锁之后才调用，各任务的提交不会排在最慢的哈希之后。"""
+    logs = []
+    moved = []
+    with commit_lock:
+        for item in os.listdir(src_dir):
+            item_path = os.path.join(src_dir, item)
+            target = os.path.join(dest_dir, item)
+            if os.path.exists(target):
+                continue
+            try:
+                os.rename(item_path, target)
+            except OSError:
+                # 重命名失败的条目留给下面的合并逻辑处理
+                continue
+            moved.append((item, item_path, target))
+    for item, item_path, target in moved:
+        if on_moved:
+            on_moved(item_path, target)
+        if os.path.isdir(target):
+            logs.append(f"    📁 收集文件夹: {item} (已提交)")
+        elif item.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp', '.gif')):
+            logs.append(f"    🖼️ 收集图片: {item}")
+        else:
+            logs.append(f"    📄 收集文件: {item} (非图片)")
+    # 剩余条目与目标重名，按原有规则合并/去重
+    if os.listdir(src_dir):
+        logs.extend(move_images_console(src_dir, dest_dir, collect_logs=True, dedup_index=dedup_index, on_moved=on_moved))
+    try:
+        os.rmdir(src_dir)
+    except OSError:
+        pass
+    return logs
+
+
+def move_images_console(src_dir, dest_dir, collect_logs=False, dedup_index=None, on_moved=None):
     """控制台模式的图片移动函数：不再仅在包含图片时移动文件夹，而是把 src_dir 下的所有内容都转移到 dest_dir。
-    collect_logs: True 时返回日志列表，False 时直接打印。"""
+    collect_logs: True 时返回日志列表，False 时直接打印。
+    dedup_index: 重名时判断内容是否一致的 DedupIndex；整批共享同一个实例可避免重复读取目标文件。
+    on_moved: 可选回调 on_moved(src, dst)，每次移动文件或整个文件夹后调用（例如图片库入库）。"""
     import shutil
 
+    if dedup_index is None:
+        dedup_index = DedupIndex()
+
     moved_count = 0
     logs = []
     # 确保目标目录存在
@@ -495,31 +1432,13 @@ def move_images_console(src_dir, dest_dir, collect_logs=False):
                 continue
             new_folder = os.path.join(dest_dir, os.path.basename(item_path))
             try:
-                def dir_content_equal(dir1, dir2):
-                    # 递归判断两个文件夹内容是否完全一致
-                    import filecmp
-                    cmp = filecmp.dircmp(dir1, dir2)
-                    if cmp.left_only or cmp.right_only or cmp.funny_files:
-                        return False
-                    for fname in cmp.common_files:
-                        f1 = os.path.join(dir1, fname)
-                        f2 = os.path.join(dir2, fname)
-                        try:
-                            with open(f1, 'rb') as ff1, open(f2, 'rb') as ff2:
-                                if ff1.read() != ff2.read():
-                                    return False
-                        except Exception:
-                            return False
-                    for subdir in cmp.common_dirs:
-                        if not dir_content_equal(os.path.join(dir1, subdir), os.path.join(dir2, subdir)):
-                            return False
-                    return True
-
                 if not os.path.exists(new_folder):
                     shutil.move(item_path, new_folder)
+                    if on_moved:
+                        on_moved(item_path, new_folder)
                 else:
                     # 如果两个文件夹内容完全一致，跳过整个移动
-                    if dir_content_equal(item_path, new_folder):
+                    if dedup_index.dir_content_equal(item_path, new_folder):
                         try:
                             force_remove_directory(item_path)
                         except Exception:
@@ -534,11 +1453,10 @@ def move_images_console(src_dir, dest_dir, collect_logs=False):
                             try:
                                 # 只对文件做内容比对，文件夹递归比对
                                 if os.path.isfile(child_src) and os.path.isfile(child_dst):
-                                    with open(child_src, 'rb') as f1, open(child_dst, 'rb') as f2:
-                                        if f1.read() == f2.read():
-                                            continue
+                                    if dedup_index.files_equal(child_src, child_dst):
+                                        continue
                                 elif os.path.isdir(child_src) and os.path.isdir(child_dst):
-                                    if dir_content_equal(child_src, child_dst):
+                                    if dedup_index.dir_content_equal(child_src, child_dst):
                                         try:
                                             force_remove_directory(child_src)
                                         except Exception:
@@ -555,6 +1473,9 @@ def move_images_console(src_dir, dest_dir, collect_logs=False):
                                 new_name = f"{base}_{i}{ext}"
                             child_dst = os.path.join(new_folder, new_name)
                         shutil.move(child_src, child_dst)
+                        dedup_index.moved(child_src, child_dst)
+                        if on_moved:
+                            on_moved(child_src, child_dst)
 
                 # 尝试删除已空的原目录
                 try:
@@ -590,9 +1511,8 @@ def move_images_console(src_dir, dest_dir, collect_logs=False):
                     # 如果目标已存在且内容完全一致则跳过移动
                     try:
                         if os.path.isfile(item_path) and os.path.isfile(target):
-                            with open(item_path, 'rb') as f1, open(target, 'rb') as f2:
-                                if f1.read() == f2.read():
-                                    continue
+                            if dedup_index.files_equal(item_path, target):
+                                continue
                     except Exception:
                         pass
                     base, ext = os.path.splitext(item)
@@ -603,6 +1523,9 @@ def move_images_console(src_dir, dest_dir, collect_logs=False):
                         new_name = f"{base}_{i}{ext}"
                     target = os.path.join(dest_dir, new_name)
                 shutil.move(item_path, target)
+                dedup_index.moved(item_path, target)
+                if on_moved:
+                    on_moved(item_path, target)
                 moved_count += 1
                 if item.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp', '.gif')):
                     logs.append(f"    🖼️ 收集图片: {os.path.basename(target)}")
@@ -619,4 +1542,7 @@ def move_images_console(src_dir, dest_dir, collect_logs=False):
         return moved_count
 
 if __name__ == "__main__":
+    # 打包为单个可执行文件时，CPU 进程池的子进程需要在这里接管启动
+    import multiprocessing
+    multiprocessing.freeze_support()
     run_with_console_progress()
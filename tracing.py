@@ -0,0 +1,113 @@
+# 运行追踪（--trace）：按任务与阶段记录时间段（线程号、字节数等参数），写出 Chrome trace-event 格式的 JSON，
+# 可在 chrome://tracing 或 https://ui.perfetto.dev 中打开；未启用时 span() 返回空上下文，几乎没有开销
+import contextlib
+import json
+import os
+import threading
+import time
+
+# 汇总中列出的最慢时间段数量
+TOP_SPANS = 10
+# 各阶段的显示名称
+SPAN_LABELS = {
+    'spawn': '启动 7z 进程',
+    'password': '密码探测',
+    'extract': '外层解压',
+    'nested': '嵌套解压',
+    'validate': '图片校验',
+    'move': '收集',
+    'dedup': '去重比较',
+    'delete': '删除目录',
+    'cleanup': '清理暂存目录',
+}
+
+_NULL_SPAN = contextlib.nullcontext()
+_active = None
+
+
+class Tracer:
+    """线程安全地收集完整事件（ph='X'），时间戳为相对于开始追踪时刻的微秒数。"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._events = []
+        self._threads = {}
+        self._origin = time.perf_counter()
+
+    @contextlib.contextmanager
+    def span(self, name, **args):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            ended = time.perf_counter()
+            thread = threading.current_thread()
+            event = {'name': name, 'cat': 'titizz', 'ph': 'X', 'pid': os.getpid(), 'tid': thread.ident,
+                     'ts': (started - self._origin) * 1e6, 'dur': (ended - started) * 1e6,
+                     'args': {k: v for k, v in args.items() if v is not None}}
+            with self._lock:
+                self._events.append(event)
+                self._threads.setdefault(thread.ident, thread.name)
+
+    def events(self):
+        with self._lock:
+            return list(self._events)
+
+    def write(self):
+        """写出 trace 文件（带线程名元数据）；失败时打印警告。"""
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+        pid = os.getpid()
+        meta = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+                for tid, name in threads.items()]
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump({'traceEvents': meta + events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+        except OSError as e:
+            print(f"⚠️ 无法写入追踪文件 {self.path}: {e}")
+
+    def summary_lines(self, top=TOP_SPANS):
+        """最耗时的阶段（按累计耗时）与最慢的单个时间段。"""
+        events = self.events()
+        if not events:
+            return []
+        totals = {}
+        for event in events:
+            entry = totals.setdefault(event['name'], [0.0, 0, 0])
+            entry[0] += event['dur']
+            entry[1] += 1
+            entry[2] += event['args'].get('bytes', 0)
+        lines = ["阶段累计（各线程耗时之和，外层阶段包含其内部的阶段）:"]
+        for name, (dur, count, nbytes) in sorted(totals.items(), key=lambda item: -item[1][0]):
+            extra = f"，{nbytes / 1048576:.1f} MB" if nbytes else ''
+            lines.append(f"  {SPAN_LABELS.get(name, name):<8} {dur / 1e6:9.3f}s  {count:>6} 次{extra}")
+        lines.append(f"最慢的 {min(top, len(events))} 个时间段:")
+        for event in sorted(events, key=lambda e: -e['dur'])[:top]:
+            target = event['args'].get('task') or event['args'].get('path') or ''
+            lines.append(f"  {event['dur'] / 1e6:9.3f}s  {SPAN_LABELS.get(event['name'], event['name']):<8} {target}")
+        return lines
+
+
+def start(path):
+    """开始追踪；之后各模块的 span() 都记录到这个 Tracer。"""
+    global _active
+    _active = Tracer(path)
+    return _active
+
+
+def stop():
+    """停止追踪并写出文件，返回 Tracer（未启用时返回 None）。"""
+    global _active
+    tracer, _active = _active, None
+    if tracer is not None:
+        tracer.write()
+    return tracer
+
+
+def span(name, **args):
+    """记录一个时间段；参数（task、bytes、path 等）写入事件的 args，值为 None 的参数省略。"""
+    if _active is None:
+        return _NULL_SPAN
+    return _active.span(name, **args)
@@ -0,0 +1,139 @@
+# 图片完整性校验：只检查文件结构（文件头、尾部标记、PNG 数据块 CRC、BMP 大小字段），不解码像素；
+# 用于收集前把截断/损坏的图片隔离到旁边的目录，而不是混入 all_images
+import os
+import shutil
+import struct
+import zlib
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif')
+QUARANTINE_SUFFIX = '_quarantine'
+# 检查尾部标记时读取的字节数；尾部的 0x00 填充会被忽略
+TAIL_SIZE = 64
+_CRC_BUFFER_SIZE = 1024 * 1024
+
+
+def _read_tail(f, size):
+    f.seek(max(0, size - TAIL_SIZE))
+    return f.read(TAIL_SIZE).rstrip(b'\x00')
+
+
+def _check_jpeg(f, size):
+    if f.read(3) != b'\xff\xd8\xff':
+        return '缺少 JPEG 起始标记 (SOI)'
+    if not _read_tail(f, size).endswith(b'\xff\xd9'):
+        return '缺少 JPEG 结束标记 (EOI)，文件可能被截断'
+    return None
+
+
+def _check_png(f, size):
+    if f.read(8) != b'\x89PNG\r\n\x1a\n':
+        return 'PNG 文件头无效'
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return '缺少 IEND 数据块，文件可能被截断'
+        length, chunk_type = struct.unpack('>I4s', header)
+        if length > size:
+            return f"数据块 {chunk_type!r} 长度超出文件大小，文件可能被截断"
+        crc = zlib.crc32(chunk_type)
+        remaining = length
+        while remaining:
+            data = f.read(min(remaining, _CRC_BUFFER_SIZE))
+            if not data:
+                return f"数据块 {chunk_type!r} 被截断"
+            crc = zlib.crc32(data, crc)
+            remaining -= len(data)
+        stored = f.read(4)
+        if len(stored) < 4:
+            return f"数据块 {chunk_type!r} 缺少 CRC"
+        if struct.unpack('>I', stored)[0] != crc:
+            return f"数据块 {chunk_type!r} CRC 校验失败"
+        if chunk_type == b'IEND':
+            return None
+
+
+def _check_gif(f, size):
+    if f.read(6) not in (b'GIF87a', b'GIF89a'):
+        return 'GIF 文件头无效'
+    if not _read_tail(f, size).endswith(b'\x3b'):
+        return '缺少 GIF 结束标记，文件可能被截断'
+    return None
+
+
+def _check_bmp(f, size):
+    header = f.read(30)
+    if len(header) < 30 or header[:2] != b'BM':
+        return 'BMP 文件头无效'
+    file_size, offset, dib_size = struct.unpack('<I4xII', header[2:18])
+    if file_size and file_size > size:
+        return f"BMP 记录的大小 {file_size} 超过实际大小 {size}，文件可能被截断"
+    if offset >= size or dib_size < 12:
+        return 'BMP 像素数据偏移无效'
+    if dib_size >= 40:
+        width, height, _planes, bpp, compression = struct.unpack('<iiHHI', header[18:30] + f.read(4))
+        # 未压缩（BI_RGB / BI_BITFIELDS）时可以按宽高与位深计算像素数据的大小
+        if compression in (0, 3) and width > 0 and bpp:
+            stride = (width * bpp + 31) // 32 * 4
+            if offset + stride * abs(height) > size:
+                return '像素数据不完整，文件可能被截断'
+    return None
+
+
+_CHECKERS = {
+    '.jpg': _check_jpeg,
+    '.jpeg': _check_jpeg,
+    '.png': _check_png,
+    '.gif': _check_gif,
+    '.bmp': _check_bmp,
+}
+
+
+def check_image(path):
+    """检查一张图片的结构；正常时返回 None，否则返回原因。非图片扩展名不检查。
+
+    可在 CPU 进程池的子进程中运行：按路径读取，只返回简短的字符串。"""
+    checker = _CHECKERS.get(os.path.splitext(path)[1].lower())
+    if checker is None:
+        return None
+    try:
+        size = os.path.getsize(path)
+        if size == 0:
+            return '空文件'
+        with open(path, 'rb') as f:
+            return checker(f, size)
+    except (OSError, struct.error) as e:
+        return f"无法读取: {e}"
+
+
+def validate_tree(root_dir, pool=None):
+    """检查 root_dir 下的全部图片，返回 (检查的图片数, [(路径, 原因)])；提供 CpuPool 时并行检查。"""
+    paths = []
+    for root, dirs, files in os.walk(root_dir):
+        for fname in files:
+            if fname.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(root, fname))
+    if pool is not None:
+        results = pool.map(check_image, paths)
+    else:
+        results = [check_image(path) for path in paths]
+    failures = []
+    for path, result in zip(paths, results):
+        if isinstance(result, Exception):
+            result = f"检查失败: {result}"
+        if result:
+            failures.append((path, result))
+    return len(paths), failures
+
+
+def quarantine(path, staging_dir, quarantine_dir, label):
+    """把损坏的图片移到隔离目录的 label/相对路径 下（重名时追加序号），返回新路径。"""
+    rel = os.path.relpath(path, staging_dir)
+    target = os.path.join(quarantine_dir, label, rel)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    base, ext = os.path.splitext(target)
+    counter = 1
+    while os.path.exists(target):
+        target = f"{base}_{counter}{ext}"
+        counter += 1
+    shutil.move(path, target)
+    return target
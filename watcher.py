@@ -0,0 +1,206 @@
+# 收件目录监视：Linux 下使用 inotify，其他平台回退为定时扫描；文件停止增长后才交给解压流程。
+# 递归监视时为每个子目录添加 inotify 监视，新建的子目录在出现时加入
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+import time
+
+# inotify 事件掩码
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK if hasattr(os, 'O_NONBLOCK') else 0
+_EVENT_HEADER = struct.Struct('iIII')
+
+# 文件大小与修改时间保持不变多久（秒）才认为写入完成
+SETTLE_SECONDS = 2.0
+# 回退扫描的间隔（秒）
+POLL_INTERVAL = 1.0
+
+
+class _Inotify:
+    """对 libc inotify 的最小封装（非阻塞读取）；不可用时构造函数抛出 OSError。"""
+
+    def __init__(self):
+        if not sys.platform.startswith('linux'):
+            raise OSError('inotify 仅在 Linux 上可用')
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise OSError('找不到 libc')
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 失败')
+        self._dirs = {}  # 监视描述符 -> 目录路径
+
+    def add(self, path):
+        """添加对一个目录的监视；失败（例如超过 max_user_watches）时抛出 OSError。"""
+        mask = IN_CREATE | IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_add_watch 失败')
+        self._dirs[wd] = path
+
+    def read_events(self):
+        """读取当前已到达的全部事件，返回 [(所在目录, 名称, 是否为目录)]。"""
+        events = []
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not buf:
+                break
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(buf):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(buf, offset)
+                offset += _EVENT_HEADER.size
+                name = buf[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if mask & IN_IGNORED:
+                    # 目录已删除或移走，监视随之失效
+                    self._dirs.pop(wd, None)
+                    continue
+                parent = self._dirs.get(wd)
+                if name and parent is not None:
+                    events.append((parent, os.fsdecode(name), bool(mask & IN_ISDIR)))
+        return events
+
+    def close(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+class InboxWatcher:
+    """监视目录中新出现的输入文件，poll() 返回已经停止增长的文件列表 [(path, filename)]。
+
+    is_candidate(filename) 决定哪些文件名需要关注；启动前已存在的文件由调用方自行处理，
+    监视器只报告之后新出现或内容发生变化的文件。recursive=True 时同时监视子目录
+    （skip_dir(name) 为真的子目录除外），内部以相对于 root_dir 的路径区分同名文件。"""
+
+    def __init__(self, root_dir, is_candidate, settle_seconds=SETTLE_SECONDS, poll_interval=POLL_INTERVAL,
+                 recursive=False, skip_dir=None):
+        self.root_dir = os.path.abspath(root_dir)
+        self.is_candidate = is_candidate
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.recursive = recursive
+        self.skip_dir = skip_dir or (lambda name: False)
+        self._pending = {}  # 相对路径 -> (size, mtime_ns, stable_since)
+        self._reported = {}  # 相对路径 -> (size, mtime_ns)
+        self._last_scan = 0.0
+        try:
+            self._inotify = _Inotify()
+            self.backend = 'inotify'
+            for path in self._dirs(self.root_dir):
+                self._inotify.add(path)
+        except OSError:
+            if getattr(self, '_inotify', None) is not None:
+                self._inotify.close()
+            self._inotify = None
+            self.backend = 'polling'
+        # 启动时已存在的文件视为已报告，避免重复处理
+        for rel, st in self._scan(self.root_dir):
+            self._reported[rel] = (st.st_size, st.st_mtime_ns)
+
+    def _dirs(self, top):
+        """top 及（递归时）其下需要监视的全部子目录。"""
+        yield top
+        if not self.recursive:
+            return
+        pending = [top]
+        while pending:
+            current = pending.pop()
+            try:
+                with os.scandir(current) as it:
+                    subdirs = [entry.path for entry in it
+                               if entry.is_dir(follow_symlinks=False) and not self.skip_dir(entry.name)]
+            except OSError:
+                continue
+            for path in subdirs:
+                yield path
+            pending.extend(subdirs)
+
+    def _scan(self, top):
+        """产出 top 下（递归时包括子目录）的候选文件 (相对路径, stat)。"""
+        for current in self._dirs(top):
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        if self.is_candidate(entry.name) and entry.is_file(follow_symlinks=False):
+                            yield os.path.relpath(entry.path, self.root_dir), entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+
+    def _watch_new_dir(self, path):
+        """新出现的子目录：加入监视，并检查监视生效前已经写入其中的文件。"""
+        touched = set()
+        for current in self._dirs(path):
+            try:
+                self._inotify.add(current)
+            except OSError:
+                # 监视数量达到上限：改为定时扫描
+                self._inotify.close()
+                self._inotify = None
+                self.backend = 'polling'
+                return touched
+        touched.update(rel for rel, _st in self._scan(path))
+        return touched
+
+    def _touched(self):
+        """本轮需要检查的文件（相对路径）：inotify 事件涉及的文件，或回退模式下的全目录扫描结果。"""
+        now = time.monotonic()
+        if self._inotify is not None:
+            touched = set()
+            for parent, name, is_dir in self._inotify.read_events():
+                path = os.path.join(parent, name)
+                if is_dir:
+                    if self.recursive and not self.skip_dir(name):
+                        touched |= self._watch_new_dir(path)
+                        if self._inotify is None:
+                            break
+                elif self.is_candidate(name):
+                    touched.add(os.path.relpath(path, self.root_dir))
+            return touched
+        if now - self._last_scan < self.poll_interval:
+            return set()
+        self._last_scan = now
+        return {rel for rel, _st in self._scan(self.root_dir)}
+
+    def poll(self):
+        now = time.monotonic()
+        for name in self._touched():
+            self._pending.setdefault(name, None)
+        settled = []
+        for name in list(self._pending):
+            path = os.path.join(self.root_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                self._pending.pop(name, None)
+                continue
+            key = (st.st_size, st.st_mtime_ns)
+            if self._reported.get(name) == key:
+                self._pending.pop(name, None)
+                continue
+            previous = self._pending[name]
+            if previous is None or previous[:2] != key:
+                # 仍在增长（或刚出现）：重新开始计时
+                self._pending[name] = key + (now,)
+                continue
+            if now - previous[2] >= self.settle_seconds:
+                self._pending.pop(name, None)
+                self._reported[name] = key
+                settled.append((path, os.path.basename(name)))
+        return settled
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()